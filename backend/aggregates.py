@@ -0,0 +1,214 @@
+"""
+Per-user transaction aggregates for FinFamily
+Monthly series and breakdowns are GROUP BY queries inside SQLite; rollups that
+need the rows in Python load them as slotted TransactionRecords. Results are
+cached per user and validated against the data version
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RESERVE_CATEGORY_NAME = 'Reserva de Emergência'
+
+# One row per (month, user): 'YYYY-MM' is the prefix of the ISO date column
+MONTHLY_SERIES_SQL = '''
+    SELECT
+        substr(date, 1, 7) AS month,
+        COUNT(*) AS count,
+        COALESCE(SUM(CASE WHEN type = 'receita' THEN amount END), 0) AS income,
+        COALESCE(SUM(CASE WHEN type = 'despesa' THEN amount END), 0) AS expenses,
+        SUM(CASE WHEN category_id IS NULL THEN 1 ELSE 0 END) AS uncategorized,
+        COALESCE(SUM(CASE
+            WHEN is_reserve_deposit = 1 OR (category_id = :reserve AND type = 'receita') THEN amount
+        END), 0) AS reserve_in,
+        COALESCE(SUM(CASE
+            WHEN is_reserve_withdrawal = 1
+                AND NOT (is_reserve_deposit = 1 OR (category_id = :reserve AND type = 'receita')) THEN amount
+        END), 0) AS reserve_out,
+        SUM(CASE
+            WHEN is_reserve_deposit = 1 OR (category_id = :reserve AND is_reserve_withdrawal = 0) THEN 1 ELSE 0
+        END) AS reserve_deposits,
+        SUM(CASE WHEN type = 'despesa' AND description LIKE '%juros%' THEN 1 ELSE 0 END) AS interest_charges,
+        COUNT(DISTINCT CASE WHEN type = 'receita' THEN member_id END) AS contributing_members
+    FROM transactions
+    WHERE user_id = :user_id
+    GROUP BY month
+    ORDER BY month
+'''
+
+def month_key(year: int, month: int) -> str:
+    """Format a (year, month) pair the way the monthly series keys it"""
+    return f"{year:04d}-{month:02d}"
+
+def shift_month(year: int, month: int, offset: int) -> tuple:
+    """Move (year, month) by offset months, e.g. offset=-1 is the previous month"""
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+async def get_reserve_category_id(db, user_id: str) -> Optional[str]:
+    """Id of the fixed emergency reserve category, if the user has one"""
+    cursor = await db.execute(
+        "SELECT id FROM categories WHERE user_id = ? AND name = ? LIMIT 1",
+        (user_id, RESERVE_CATEGORY_NAME)
+    )
+    row = await cursor.fetchone()
+    return row['id'] if row else None
+
+async def get_monthly_series(db, user_id: str, reserve_category_id: Optional[str] = None) -> Dict[str, dict]:
+    """Per-month totals for a user, keyed by 'YYYY-MM' in chronological order"""
+    cursor = await db.execute(MONTHLY_SERIES_SQL, {"user_id": user_id, "reserve": reserve_category_id})
+    return {row['month']: dict(row) for row in await cursor.fetchall()}
+
+# Columns transactions can be broken down by, with the table naming their ids
+BREAKDOWN_FIELDS = {'member_id': 'family_members', 'bank_id': 'banks'}
+
+async def get_breakdown(db, user_id: str, field: str, start: Optional[date] = None,
+                        end: Optional[date] = None) -> Dict[Optional[str], Tuple[int, int]]:
+    """(income, expenses) in cents per member_id or bank_id, dated start..end inclusive.
+
+    Grouped inside SQLite along the covering idx_transactions_user_{member,bank} indexes.
+    """
+    if field not in BREAKDOWN_FIELDS:
+        raise ValueError(f"Cannot break down by {field!r}")
+    where = ["user_id = ?"]
+    params = [user_id]
+    if start:
+        where.append("date >= ?")
+        params.append(start.isoformat())
+    if end:
+        # Dates carry a time, so the last day is everything before the next one
+        where.append("date < ?")
+        params.append((end + timedelta(days=1)).isoformat())
+    cursor = await db.execute(f'''
+        SELECT {field} AS id,
+            COALESCE(SUM(CASE WHEN type = 'receita' THEN CAST(round(amount * 100) AS INTEGER) END), 0),
+            COALESCE(SUM(CASE WHEN type = 'despesa' THEN CAST(round(amount * 100) AS INTEGER) END), 0)
+        FROM transactions
+        WHERE {' AND '.join(where)}
+        GROUP BY {field}
+    ''', params)
+    return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+def reserve_balance(series: Dict[str, dict]) -> float:
+    """Emergency reserve balance: deposits minus withdrawals over the whole series"""
+    return sum(m['reserve_in'] - m['reserve_out'] for m in series.values())
+
+def average_monthly_expenses(series: Dict[str, dict]) -> float:
+    """Average expenses over the months that recorded any expense"""
+    months = [m['expenses'] for m in series.values() if m['expenses'] > 0]
+    return sum(months) / len(months) if months else 0.0
+
+# ==================== TRANSACTION RECORDS ====================
+
+# Columns a TransactionRecord is built from, in constructor order
+RECORD_COLUMNS = "date, amount, type, category_id, member_id, bank_id"
+# Rows converted per fetch, so raw rows never pile up next to the records
+RECORD_BATCH_ROWS = 2000
+
+def month_index(year: int, month: int) -> int:
+    """Months since year 0, so months compare and subtract as plain ints"""
+    return year * 12 + month - 1
+
+class TransactionRecord:
+    """A transaction reduced to what in-memory rollups read.
+
+    The ISO date is parsed once into a month index and day, the amount is
+    integer cents, and ids and types point at strings shared by the whole
+    load. Each record takes about a third of the memory of a row dict.
+    """
+    __slots__ = ('month', 'day', 'cents', 'type', 'category_id', 'member_id', 'bank_id')
+
+    def __init__(self, date: str, amount: float, type: str, category_id: Optional[str],
+                 member_id: Optional[str], bank_id: Optional[str]):
+        self.month = int(date[:4]) * 12 + int(date[5:7]) - 1
+        self.day = int(date[8:10])
+        self.cents = round(amount * 100)
+        self.type = type
+        self.category_id = category_id
+        self.member_id = member_id
+        self.bank_id = bank_id
+
+async def load_transaction_records(db, where: str, params) -> List[TransactionRecord]:
+    """Records of the transactions matching a WHERE clause"""
+    cursor = await db.execute(f"SELECT {RECORD_COLUMNS} FROM transactions WHERE {where}", params)
+    shared = {}
+    records = []
+    while True:
+        rows = await cursor.fetchmany(RECORD_BATCH_ROWS)
+        if not rows:
+            return records
+        for date, amount, type, category_id, member_id, bank_id in rows:
+            records.append(TransactionRecord(
+                date, amount, shared.setdefault(type, type), shared.setdefault(category_id, category_id),
+                shared.setdefault(member_id, member_id), shared.setdefault(bank_id, bank_id)
+            ))
+
+def monthly_totals(records: Iterable[TransactionRecord]) -> Dict[int, Tuple[int, int]]:
+    """(income, expenses) in cents per month index"""
+    totals = {}
+    for r in records:
+        income, expenses = totals.get(r.month, (0, 0))
+        if r.type == 'receita':
+            income += r.cents
+        elif r.type == 'despesa':
+            expenses += r.cents
+        totals[r.month] = (income, expenses)
+    return totals
+
+def totals_by(records: Iterable[TransactionRecord], field: str) -> Dict[Optional[str], int]:
+    """Cents per value of category_id, member_id or bank_id, in first-seen order"""
+    totals = {}
+    for r in records:
+        key = getattr(r, field)
+        totals[key] = totals.get(key, 0) + r.cents
+    return totals
+
+# ==================== CACHE ====================
+
+# Per-user results, each tagged with the data version it was computed from.
+# Versions live in the database (data_versions, bumped by triggers on every
+# write), so a result cached by one worker process is never served after
+# another worker changed the data.
+_cache: Dict[str, tuple] = {}
+
+async def data_version(db, user_id: str) -> int:
+    """Current data version of a user; one primary key lookup"""
+    cursor = await db.execute("SELECT version FROM data_versions WHERE user_id = ?", (user_id,))
+    row = await cursor.fetchone()
+    return row['version'] if row else 0
+
+def invalidate_user(user_id: str):
+    """Drop everything this process cached for a user"""
+    _cache.pop(user_id, None)
+
+def invalidate_all():
+    """Drop every user's cache in this process, e.g. after the database file was restored"""
+    _cache.clear()
+
+def cache_get(user_id: str, key, version: int):
+    entry = _cache.get(user_id)
+    if entry and entry[0] == version:
+        return entry[1].get(key)
+    return None
+
+def cache_set(user_id: str, key, value, version: int):
+    """Store a value computed from data at `version`, replacing results of other versions"""
+    entry = _cache.get(user_id)
+    if not entry or entry[0] != version:
+        entry = (version, {})
+        _cache[user_id] = entry
+    entry[1][key] = value
+
+async def get_cached_monthly_series(db, user_id: str, reserve_category_id: Optional[str] = None,
+                                    version: Optional[int] = None, compute=get_monthly_series) -> Dict[str, dict]:
+    """get_monthly_series, served from the per-user cache when nothing changed.
+
+    `compute` builds the series on a miss; it takes get_monthly_series' arguments.
+    """
+    if version is None:
+        version = await data_version(db, user_id)
+    key = ('monthly_series', reserve_category_id)
+    series = cache_get(user_id, key, version)
+    if series is None:
+        series = await compute(db, user_id, reserve_category_id)
+        cache_set(user_id, key, series, version)
+    return series
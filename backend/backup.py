@@ -0,0 +1,169 @@
+"""
+Online backups for FinFamily
+Uses SQLite's incremental backup API, so snapshots are consistent while the app keeps serving
+
+Usage:
+    python backup.py create
+    python backup.py list
+    python backup.py restore finamily-20250101-030000-000000-1a2b3c.db.gz
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from database import DB_PATH, SHARD_DIR, is_sharded, mark_restored
+
+BACKUP_DIR = Path(os.environ.get('BACKUP_DIR', str(Path(DB_PATH).parent / 'backups')))
+# Number of snapshots kept; older ones are deleted after each backup
+BACKUP_RETENTION = int(os.environ.get('BACKUP_RETENTION', '7'))
+# Pages copied per backup step; locks are released and the thread sleeps between steps
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.01
+
+SNAPSHOT_PREFIX = 'finamily-'
+SNAPSHOT_SUFFIX = '.db.gz'
+# In sharded mode each snapshot has a sibling directory with one .db.gz per shard
+SHARDS_SUFFIX = '.shards'
+
+def copy_database(source_path: str, target_path: str, pages: int = BACKUP_PAGES_PER_STEP):
+    """Copy a live database page batch by page batch with the SQLite backup API"""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=pages, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        target.close()
+        source.close()
+
+def verify_database(path: str):
+    """Raise ValueError unless the file is a healthy SQLite database"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Snapshot is not a valid database: {e}")
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise ValueError(f"Integrity check failed: {result}")
+
+def snapshot_database(source_path: str, target: Path, tmp: Path):
+    """Copy, verify and gzip one database into target"""
+    raw = tmp / 'snapshot.db'
+    copy_database(source_path, str(raw))
+    verify_database(str(raw))
+    with open(raw, 'rb') as src, gzip.open(target, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    raw.unlink()
+
+def restore_database(source: Path, target_path: str, tmp: Path):
+    """Decompress and verify a snapshot, then copy it over target_path in one step"""
+    raw = tmp / 'restore.db'
+    with gzip.open(source, 'rb') as src, open(raw, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    verify_database(str(raw))
+    # Marked before the copy, so the mark lands in the same single step as the rows
+    mark_restored(str(raw))
+    copy_database(str(raw), target_path, pages=-1)
+    verify_database(target_path)
+    raw.unlink()
+
+def shards_path(snapshot: Path) -> Path:
+    return snapshot.with_name(snapshot.name[:-len(SNAPSHOT_SUFFIX)] + SHARDS_SUFFIX)
+
+def snapshot_path(name: str) -> Path:
+    """Resolve a snapshot file name, rejecting anything outside BACKUP_DIR"""
+    if Path(name).name != name or not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+        raise ValueError(f"Invalid snapshot name: {name}")
+    return BACKUP_DIR / name
+
+def list_backups() -> list:
+    """Snapshots, newest first"""
+    if not BACKUP_DIR.exists():
+        return []
+    snapshots = sorted(BACKUP_DIR.glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}"), reverse=True)
+    return [
+        {"name": p.name, "size": p.stat().st_size,
+         "created_at": datetime.fromtimestamp(p.stat().st_mtime, timezone.utc).isoformat()}
+        for p in snapshots
+    ]
+
+def prune_backups(keep: int = BACKUP_RETENTION) -> list:
+    removed = []
+    for snapshot in list_backups()[keep:]:
+        path = BACKUP_DIR / snapshot['name']
+        shutil.rmtree(shards_path(path), ignore_errors=True)
+        path.unlink()
+        removed.append(snapshot['name'])
+    return removed
+
+def create_backup() -> dict:
+    """Snapshot the live database (and shards), verify, gzip into BACKUP_DIR and apply retention"""
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    # Names still sort by time; the suffix keeps backups from other workers in the same instant apart
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S-%f')
+    target = BACKUP_DIR / f"{SNAPSHOT_PREFIX}{timestamp}-{uuid.uuid4().hex[:6]}{SNAPSHOT_SUFFIX}"
+
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as tmp:
+        tmp = Path(tmp)
+        if is_sharded():
+            partial_shards = tmp / 'shards'
+            partial_shards.mkdir()
+            for shard in sorted(SHARD_DIR.glob('*.db')):
+                snapshot_database(str(shard), partial_shards / f"{shard.name}.gz", tmp)
+            partial_shards.replace(shards_path(target))
+
+        # The main snapshot appears last, so a listed snapshot is always complete
+        partial = tmp / target.name
+        snapshot_database(DB_PATH, partial, tmp)
+        partial.replace(target)
+
+    removed = prune_backups()
+    return {"name": target.name, "size": target.stat().st_size, "removed": removed}
+
+def restore_backup(name: str) -> dict:
+    """Verify a snapshot and copy it over the live database with the backup API.
+
+    The copy runs as a single step per database, so other connections see
+    either the old or the restored file, never a mix; the app does not need
+    to stop. Shard snapshots, if any, are restored the same way.
+    """
+    source = snapshot_path(name)
+    if not source.exists():
+        raise FileNotFoundError(f"Snapshot not found: {name}")
+
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as tmp:
+        tmp = Path(tmp)
+        restore_database(source, DB_PATH, tmp)
+        shards = sorted(shards_path(source).glob('*.db.gz'))
+        if shards:
+            SHARD_DIR.mkdir(parents=True, exist_ok=True)
+        for shard in shards:
+            restore_database(shard, str(SHARD_DIR / shard.name[:-len('.gz')]), tmp)
+
+    return {"name": name, "restored_to": DB_PATH, "shards": len(shards)}
+
+def main(argv: list) -> int:
+    command = argv[1] if len(argv) > 1 else None
+    if command == 'create':
+        result = create_backup()
+        print(f"✅ Backup created: {result['name']} ({result['size']} bytes)")
+    elif command == 'list':
+        for snapshot in list_backups():
+            print(f"{snapshot['name']}\t{snapshot['size']}\t{snapshot['created_at']}")
+    elif command == 'restore' and len(argv) > 2:
+        result = restore_backup(argv[2])
+        print(f"✅ Restored {result['name']} into {result['restored_to']}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,260 @@
+"""
+API benchmarks for FinFamily
+Boots server:app in-process (httpx ASGI transport, no network) over synthetic
+datasets of several sizes and records latency percentiles per endpoint
+
+Usage:
+    python benchmark.py run --sizes 1000,10000,100000 --output bench-main.json
+    python benchmark.py run --warm --output bench-main-warm.json
+    python benchmark.py compare bench-main.json bench-branch.json --threshold 0.2
+
+Each size is its own generated family in one fresh temporary database. Read
+endpoints are measured cold: the family's cached aggregates and the columnar
+cache are dropped before every request, so results reflect loading and
+computing rather than cache hits. --warm keeps the columnar cache loaded and
+only drops the aggregates, as after a write to an active family. Imports run last and add IMPORT_ROWS new rows per iteration.
+compare exits with status 1 when a p50 got slower than the threshold allows.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_ITERATIONS = 20
+WARMUP_ITERATIONS = 2
+# Years of history per generated family; transactions per month follow from the size
+DATASET_YEARS = 2
+IMPORT_ROWS = 200
+IMPORT_ITERATIONS = 5
+# Differences below this are noise, whatever the relative change
+MIN_REGRESSION_MS = 1.0
+
+READ_CASES = [
+    ("transactions_page", "/api/transactions?limit=50"),
+    ("transactions_month", "/api/transactions?month={month}&year={year}"),
+    ("transactions_search", "/api/transactions?q=assai&limit=50"),
+    ("dashboard_summary", "/api/dashboard/summary?month={month}&year={year}"),
+    ("dashboard_emergency_reserve", "/api/dashboard/emergency-reserve"),
+    ("dashboard_category_chart", "/api/dashboard/category-chart?month={month}&year={year}"),
+    ("dashboard_monthly_comparison", "/api/dashboard/monthly-comparison?year={year}"),
+    ("dashboard_by_member", "/api/dashboard/by-member?start_date={year}-01-01"),
+    ("dashboard_by_bank", "/api/dashboard/by-bank"),
+    ("health_score", "/api/gamification/health-score"),
+    ("badges", "/api/gamification/badges"),
+]
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile of already sorted values"""
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+def summarize(latencies: list) -> dict:
+    ms = sorted(l * 1000 for l in latencies)
+    total = sum(latencies)
+    return {
+        "iterations": len(ms),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "min_ms": round(ms[0], 3),
+        "max_ms": round(ms[-1], 3),
+        "throughput_rps": round(len(ms) / total, 2) if total else None,
+    }
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def import_file(iteration: int, today: datetime) -> bytes:
+    """A statement with IMPORT_ROWS rows that no earlier iteration imported"""
+    lines = ['Data;Descrição;Valor']
+    for j in range(IMPORT_ROWS):
+        lines.append(f"{today:%d/%m/%Y};COMPRA CARTAO - BENCH {iteration}-{j} UBER;-{10 + j % 90},{j % 100:02d}")
+    return '\n'.join(lines).encode('utf-8')
+
+# ==================== RUN ====================
+
+async def measure(request, iterations: int, before=None, after=None) -> dict:
+    """Time `request()` iterations times after a warmup; before/after run outside the timer"""
+    latencies = []
+    for i in range(-WARMUP_ITERATIONS, iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = await request(i)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text[:200]}")
+        if after:
+            await after()
+        if i >= 0:
+            latencies.append(elapsed)
+    return summarize(latencies)
+
+async def benchmark_size(client, email: str, iterations: int, warm: bool) -> dict:
+    import columnar
+    from aggregates import invalidate_user
+    from events import bus
+    from synthetic_data import SYNTHETIC_PASSWORD
+
+    login = await client.post('/api/auth/login', json={'email': email, 'password': SYNTHETIC_PASSWORD})
+    login.raise_for_status()
+    user_id = login.json()['user']['id']
+    headers = {'Authorization': f"Bearer {login.json()['access_token']}"}
+    today = datetime.now(timezone.utc)
+    results = {}
+
+    def drop_caches():
+        invalidate_user(user_id)
+        if not warm:
+            columnar.cache.clear()
+
+    for name, template in READ_CASES:
+        path = template.format(month=today.month, year=today.year)
+        results[name] = await measure(
+            lambda i, path=path: client.get(path, headers=headers), iterations,
+            before=drop_caches
+        )
+        print(f"   {name:<32} p50 {results[name]['p50_ms']:>9.2f} ms   p95 {results[name]['p95_ms']:>9.2f} ms")
+
+    results["check_badges"] = await measure(
+        lambda i: client.post('/api/gamification/check-badges', headers=headers), iterations,
+        before=drop_caches
+    )
+    print(f"   {'check_badges':<32} p50 {results['check_badges']['p50_ms']:>9.2f} ms")
+
+    member_id = (await client.get('/api/family', headers=headers)).json()[0]['id']
+    bank_id = (await client.get('/api/banks', headers=headers)).json()[0]['id']
+    results["import"] = await measure(
+        lambda i: client.post(
+            '/api/transactions/import', headers=headers,
+            files={'file': ('bench.csv', import_file(i, today), 'text/csv')},
+            data={'member_id': member_id, 'bank_id': bank_id},
+        ),
+        IMPORT_ITERATIONS,
+        # Badge and challenge handlers run in the background; keep them out of the next sample
+        after=bus.drain
+    )
+    print(f"   {'import':<32} p50 {results['import']['p50_ms']:>9.2f} ms   ({IMPORT_ROWS} rows)")
+    return results
+
+def run(sizes: list, iterations: int, output: Path, warm: bool = False) -> dict:
+    tmp = tempfile.mkdtemp(prefix='finfamily-bench-')
+    # database.py reads these at import time, so they are set before importing the app
+    os.environ['DATABASE_PATH'] = str(Path(tmp) / 'bench.db')
+    os.environ.setdefault('SHARD_DIR', str(Path(tmp) / 'shards'))
+    # EXPLAIN QUERY PLAN on slow statements would distort the timings
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+    import httpx
+    import server
+    import synthetic_data
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+            "storage_mode": os.environ.get('STORAGE_MODE', 'single'),
+            "iterations": iterations,
+            "warm": warm,
+            "import_rows": IMPORT_ROWS,
+        },
+        "results": {},
+    }
+
+    emails = {}
+    for index, size in enumerate(sizes, start=1):
+        per_month = max(math.ceil(size / (DATASET_YEARS * 12)), 1)
+        generated = synthetic_data.generate(1, DATASET_YEARS, per_month, seed=size, first_index=index)
+        emails[size] = generated['emails'][0]
+        print(f"📦 Dataset {size}: {generated['transactions']} transactions")
+
+    async def main():
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+                for size in sizes:
+                    print(f"⏱️  Size {size}")
+                    report["results"][str(size)] = await benchmark_size(client, emails[size], iterations, warm)
+
+    asyncio.run(main())
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"✅ Results written to {output}")
+    return report
+
+# ==================== COMPARE ====================
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """Rows (size, case, base p50, new p50, change, regressed) for cases present in both runs"""
+    rows = []
+    for size, cases in new["results"].items():
+        for case, stats in cases.items():
+            previous = base["results"].get(size, {}).get(case)
+            if not previous:
+                continue
+            before, after = previous["p50_ms"], stats["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            regressed = change > threshold and after - before > MIN_REGRESSION_MS
+            rows.append((size, case, before, after, change, regressed))
+    return rows
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark FinFamily API hot paths in-process")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="benchmark every endpoint at each data size")
+    run_parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                            help="comma-separated transaction counts (default %(default)s)")
+    run_parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                            help="timed requests per endpoint (default %(default)s)")
+    run_parser.add_argument('--output', type=Path, default=Path('benchmark-results.json'))
+    run_parser.add_argument('--warm', action='store_true',
+                            help="keep the columnar cache loaded between requests")
+    compare_parser = commands.add_parser('compare', help="flag p50 regressions between two result files")
+    compare_parser.add_argument('base', type=Path)
+    compare_parser.add_argument('new', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="relative p50 slowdown that counts as a regression (default %(default)s)")
+    args = parser.parse_args(argv[1:])
+
+    if args.command == 'run':
+        run([int(s) for s in args.sizes.split(',')], args.iterations, args.output, args.warm)
+        return 0
+
+    base = json.loads(args.base.read_text(encoding='utf-8'))
+    new = json.loads(args.new.read_text(encoding='utf-8'))
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    if base['meta'].get('warm', False) != new['meta'].get('warm', False):
+        print("⚠️  Comparing a warm run with a cold one")
+    rows = compare(base, new, args.threshold)
+    for size, case, before, after, change, regressed in rows:
+        flag = '  ❌ REGRESSION' if regressed else ''
+        print(f"{size:>9} {case:<32} {before:>9.2f} ms -> {after:>9.2f} ms  {change:+7.1%}{flag}")
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
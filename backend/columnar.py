@@ -0,0 +1,315 @@
+"""
+Columnar transaction cache for FinFamily
+Keeps each active family's transactions as NumPy arrays, so dashboard and
+health-score rollups are vectorized masks and bincounts instead of SQL scans.
+New rows are appended incrementally; edits, deletes and restores reload the
+family. Least recently used families are evicted to stay under COLUMNAR_CACHE_MB.
+"""
+import os
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from aggregates import month_index, month_key
+from database import RESTORED_KEY
+
+# Memory for every cached family together; 0 disables the cache
+COLUMNAR_CACHE_MB = float(os.environ.get('COLUMNAR_CACHE_MB', '64'))
+
+TYPE_CODES = {'receita': 1, 'despesa': 2}
+INCOME, EXPENSE = 1, 2
+# Bits of UserColumns.flags
+RESERVE_DEPOSIT, RESERVE_WITHDRAWAL, INTEREST = 1, 2, 4
+# Code of a missing category, member or bank
+NO_ID = -1
+
+# Data version, rewrite version of the family and of the whole file (backup restores)
+STATE_SQL = '''
+    SELECT
+        (SELECT version FROM data_versions WHERE user_id = :user_id),
+        (SELECT version FROM transaction_rewrites WHERE user_id = :user_id),
+        (SELECT version FROM transaction_rewrites WHERE user_id = :restored)
+'''
+# Dates, amounts and flags are converted by SQLite; ids are encoded in Python
+ROWS_SQL = '''
+    SELECT
+        rowid,
+        CAST(substr(date, 1, 4) AS INTEGER) * 12 + CAST(substr(date, 6, 2) AS INTEGER) - 1,
+        CAST(substr(date, 9, 2) AS INTEGER),
+        CAST(round(amount * 100) AS INTEGER),
+        CASE type WHEN 'receita' THEN 1 WHEN 'despesa' THEN 2 ELSE 0 END,
+        category_id, member_id, bank_id,
+        (is_reserve_deposit = 1) | ((is_reserve_withdrawal = 1) << 1) | ((description LIKE '%juros%') << 2)
+    FROM transactions
+    WHERE user_id = ? AND rowid > ?
+'''
+ROWS_BATCH = 5000
+
+# NumPy, imported by enabled() on first use so workers with the cache off never load it
+np = None
+_numpy_missing = False
+
+def enabled() -> bool:
+    """Whether the cache is on, importing NumPy the first time it is.
+    Optional: without NumPy the dashboards aggregate TransactionRecords"""
+    global np, _numpy_missing
+    if COLUMNAR_CACHE_MB <= 0 or _numpy_missing:
+        return False
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+            return False
+        np = numpy
+    return True
+
+class Vocabulary:
+    """Small int codes for the ids of one column; codes are never reassigned"""
+    __slots__ = ('ids', 'codes')
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_ID
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.ids)
+            self.ids.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code == NO_ID else self.ids[code]
+
+    @property
+    def nbytes(self) -> int:
+        # Rough: a str object plus its dict and list slots
+        return len(self.ids) * 120
+
+class UserColumns:
+    """One family's transactions as parallel arrays, never modified once built.
+
+    Appending returns a new instance, so a request still aggregating the
+    previous snapshot is unaffected. The vocabularies are shared between
+    snapshots: they only ever grow.
+    """
+    __slots__ = ('state', 'max_rowid', 'month', 'day', 'cents', 'type', 'flags',
+                 'category_id', 'member_id', 'bank_id', 'vocabularies')
+
+    FIELDS = ('category_id', 'member_id', 'bank_id')
+
+    def __init__(self, state: tuple, max_rowid: int, columns: dict, vocabularies: dict):
+        self.state = state
+        self.max_rowid = max_rowid
+        self.month = columns['month']
+        self.day = columns['day']
+        self.cents = columns['cents']
+        self.type = columns['type']
+        self.flags = columns['flags']
+        self.category_id = columns['category_id']
+        self.member_id = columns['member_id']
+        self.bank_id = columns['bank_id']
+        self.vocabularies = vocabularies
+
+    @classmethod
+    def empty(cls, state: tuple) -> 'UserColumns':
+        columns = {
+            'month': np.empty(0, np.int32), 'day': np.empty(0, np.int8), 'cents': np.empty(0, np.int64),
+            'type': np.empty(0, np.int8), 'flags': np.empty(0, np.int8),
+        }
+        for field in cls.FIELDS:
+            columns[field] = np.empty(0, np.int32)
+        return cls(state, 0, columns, {field: Vocabulary() for field in cls.FIELDS})
+
+    async def extended(self, db, user_id: str, state: tuple) -> 'UserColumns':
+        """A snapshot with the rows inserted after this one was loaded"""
+        cursor = await db.execute(ROWS_SQL, (user_id, self.max_rowid))
+        batches = []
+        max_rowid = self.max_rowid
+        while True:
+            rows = await cursor.fetchmany(ROWS_BATCH)
+            if not rows:
+                break
+            batches.append(list(zip(*rows)))
+            max_rowid = max(max_rowid, max(batches[-1][0]))
+        if not batches:
+            return UserColumns(state, max_rowid, self._columns(), self.vocabularies)
+
+        columns = self._columns()
+        for _, month, day, cents, type, category_id, member_id, bank_id, flags in batches:
+            new = {
+                'month': np.array(month, np.int32), 'day': np.array(day, np.int8),
+                'cents': np.array(cents, np.int64), 'type': np.array(type, np.int8),
+                'flags': np.array(flags, np.int8),
+            }
+            for field, values in zip(self.FIELDS, (category_id, member_id, bank_id)):
+                encode = self.vocabularies[field].encode
+                new[field] = np.fromiter((encode(v) for v in values), np.int32, len(values))
+            columns = {name: np.concatenate((columns[name], new[name])) for name in columns}
+        return UserColumns(state, max_rowid, columns, self.vocabularies)
+
+    def _columns(self) -> dict:
+        return {name: getattr(self, name) for name in ('month', 'day', 'cents', 'type', 'flags') + self.FIELDS}
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(array.nbytes for array in self._columns().values())
+                + sum(v.nbytes for v in self.vocabularies.values()))
+
+    def __len__(self) -> int:
+        return len(self.cents)
+
+    # ---- masks ----
+
+    def between(self, first_month: int, last_month: int) -> 'np.ndarray':
+        """Rows dated in months first_month..last_month (month indexes, inclusive)"""
+        return (self.month >= first_month) & (self.month <= last_month)
+
+    def dated(self, start: Optional[date] = None, end: Optional[date] = None) -> Optional['np.ndarray']:
+        """Rows dated start..end inclusive; None leaves that side open (and no bounds, no mask)"""
+        if start is None and end is None:
+            return None
+        # month * 32 + day orders like the date itself
+        key = self.month * 32 + self.day
+        mask = np.ones(len(self), bool)
+        if start is not None:
+            mask &= key >= month_index(start.year, start.month) * 32 + start.day
+        if end is not None:
+            mask &= key <= month_index(end.year, end.month) * 32 + end.day
+        return mask
+
+    def of_type(self, type: str) -> 'np.ndarray':
+        return self.type == TYPE_CODES.get(type, 0)
+
+    def code(self, field: str, value: Optional[str]) -> int:
+        """Code of an id in a column; ids this family never used match no row"""
+        if value is None:
+            return NO_ID
+        return self.vocabularies[field].codes.get(value, -2)
+
+    # ---- rollups ----
+
+    def monthly_totals(self, mask=None) -> Dict[int, Tuple[int, int]]:
+        """(income, expenses) in cents per month index, like aggregates.monthly_totals"""
+        month, cents, type = self._select(mask, self.month, self.cents, self.type)
+        months, group = np.unique(month, return_inverse=True)
+        income = _sum_by(group, np.where(type == INCOME, cents, 0), len(months))
+        expenses = _sum_by(group, np.where(type == EXPENSE, cents, 0), len(months))
+        return {int(m): (int(i), int(e)) for m, i, e in zip(months, income, expenses)}
+
+    def totals_by(self, field: str, mask=None) -> Dict[Optional[str], int]:
+        """Cents per category_id, member_id or bank_id, like aggregates.totals_by"""
+        codes, cents = self._select(mask, getattr(self, field), self.cents)
+        # Shifted by one so rows without an id (NO_ID) land in bin 0
+        size = len(self.vocabularies[field].ids) + 1
+        counts = np.bincount(codes + 1, minlength=size)
+        sums = _sum_by(codes + 1, cents, size)
+        decode = self.vocabularies[field].decode
+        return {decode(code - 1): int(sums[code]) for code in np.flatnonzero(counts)}
+
+    def income_and_expenses_by(self, field: str, mask=None) -> Dict[Optional[str], Tuple[int, int]]:
+        """(income, expenses) in cents per category_id, member_id or bank_id, like aggregates.get_breakdown"""
+        codes, cents, type = self._select(mask, getattr(self, field), self.cents, self.type)
+        codes = codes + 1
+        size = len(self.vocabularies[field].ids) + 1
+        counts = np.bincount(codes, minlength=size)
+        income = _sum_by(codes, np.where(type == INCOME, cents, 0), size)
+        expenses = _sum_by(codes, np.where(type == EXPENSE, cents, 0), size)
+        decode = self.vocabularies[field].decode
+        return {decode(code - 1): (int(income[code]), int(expenses[code])) for code in np.flatnonzero(counts)}
+
+    def monthly_series(self, reserve_category_id: Optional[str] = None) -> Dict[str, dict]:
+        """The same per-month rows as aggregates.get_monthly_series, from the arrays"""
+        months, group = np.unique(self.month, return_inverse=True)
+        size = len(months)
+        income, expense = self.type == INCOME, self.type == EXPENSE
+        deposit = (self.flags & RESERVE_DEPOSIT) != 0
+        withdrawal = (self.flags & RESERVE_WITHDRAWAL) != 0
+        reserve = self.category_id == self.code('category_id', reserve_category_id) if reserve_category_id else False
+        reserve_in = deposit | (reserve & income)
+        columns = {
+            'count': np.bincount(group, minlength=size),
+            'income': _sum_by(group, np.where(income, self.cents, 0), size),
+            'expenses': _sum_by(group, np.where(expense, self.cents, 0), size),
+            'uncategorized': np.bincount(group, self.category_id == NO_ID, size),
+            'reserve_in': _sum_by(group, np.where(reserve_in, self.cents, 0), size),
+            'reserve_out': _sum_by(group, np.where(withdrawal & ~reserve_in, self.cents, 0), size),
+            'reserve_deposits': np.bincount(group, deposit | (reserve & ~withdrawal), size),
+            'interest_charges': np.bincount(group, expense & ((self.flags & INTEREST) != 0), size),
+            'contributing_members': self._distinct_members(group, income, size),
+        }
+        amounts = ('income', 'expenses', 'reserve_in', 'reserve_out')
+        series = {}
+        for i, month in enumerate(months.tolist()):
+            row = {'month': month_key(month // 12, month % 12 + 1)}
+            for name, values in columns.items():
+                row[name] = int(values[i]) / 100 if name in amounts else int(values[i])
+            series[row['month']] = row
+        return series
+
+    def _distinct_members(self, group, income, size: int):
+        """Distinct members with income per month"""
+        mask = income & (self.member_id != NO_ID)
+        stride = len(self.vocabularies['member_id'].ids)
+        pairs = np.unique(group[mask].astype(np.int64) * stride + self.member_id[mask])
+        return np.bincount(pairs // stride, minlength=size) if stride else np.zeros(size, np.int64)
+
+    @staticmethod
+    def _select(mask, *arrays):
+        return arrays if mask is None else tuple(array[mask] for array in arrays)
+
+def _sum_by(group, values, size: int):
+    """Integer sums per group; bincount adds in float64, exact for totals under 2**53 cents"""
+    return np.rint(np.bincount(group, values, size)).astype(np.int64)
+
+class ColumnarCache:
+    """UserColumns per family, least recently used evicted beyond the byte budget"""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        # user_id -> (columns, size when stored); vocabularies grow under older snapshots
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.nbytes = 0
+
+    async def get(self, db, user_id: str) -> UserColumns:
+        """The family's current columns, loading only what changed since they were cached"""
+        cursor = await db.execute(STATE_SQL, {"user_id": user_id, "restored": RESTORED_KEY})
+        version, rewrites, restored = await cursor.fetchone()
+        state = (version or 0, rewrites, restored)
+        entry = self._entries.get(user_id, (None,))[0]
+        if entry is not None and entry.state == state:
+            self._entries.move_to_end(user_id)
+            return entry
+        if entry is None or entry.state[1:] != state[1:]:
+            # Rows were edited or deleted (or the file restored): appending cannot catch up
+            entry = UserColumns.empty(state)
+        # The state was read before the rows, so a write in between only makes the next call reload
+        columns = await entry.extended(db, user_id, state)
+        self._store(user_id, columns)
+        return columns
+
+    def _store(self, user_id: str, columns: UserColumns):
+        previous = self._entries.pop(user_id, None)
+        if previous is not None:
+            self.nbytes -= previous[1]
+        size = columns.nbytes
+        if size > self.budget_bytes:
+            return
+        self._entries[user_id] = (columns, size)
+        self.nbytes += size
+        while self.nbytes > self.budget_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+cache = ColumnarCache(int(COLUMNAR_CACHE_MB * 1024 * 1024))
+
+async def get_monthly_series(db, user_id: str, reserve_category_id: Optional[str] = None) -> Dict[str, dict]:
+    """Drop-in for aggregates.get_monthly_series served from the cache"""
+    return (await cache.get(db, user_id)).monthly_series(reserve_category_id)
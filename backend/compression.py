@@ -0,0 +1,110 @@
+"""
+Response compression for FinFamily
+Negotiates brotli or gzip from Accept-Encoding for API responses above a size
+threshold, including streamed ones; precompressed static files pass through
+"""
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from static_assets import accepted_encodings, brotli
+
+# Smaller bodies are sent as they are: headers and CPU would outweigh the savings
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+# Fast levels: these responses are compressed on every request, unlike static assets
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+}
+
+def encodings() -> tuple:
+    """Supported encodings in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+class Compressor:
+    """Incremental gzip or brotli stream"""
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.process = self._compressor.process
+            self.finish = self._compressor.finish
+        else:
+            # wbits 31: zlib stream with gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.process = self._compressor.compress
+            self.finish = self._compressor.flush
+
+def is_compressible(status: int, headers: MutableHeaders) -> bool:
+    if status < 200 or status in (204, 304) or 'content-encoding' in headers:
+        return False
+    content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+class CompressionMiddleware:
+    """Pure ASGI, so streaming responses are compressed chunk by chunk instead of buffered"""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(Headers(scope=scope).get('accept-encoding', ''))
+        encoding = next((e for e in encodings() if e in accepted), None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                # Held back until the first body chunk shows whether compressing pays off
+                start = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                headers = MutableHeaders(raw=list(start.get('headers', [])))
+                start['headers'] = headers.raw
+                if not is_compressible(start['status'], headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers['Content-Encoding'] = encoding
+                headers.add_vary_header('Accept-Encoding')
+                if 'content-length' in headers:
+                    del headers['content-length']
+                if not more_body:
+                    body = compressor.process(body) + compressor.finish()
+                    headers['Content-Length'] = str(len(body))
+                    await send(start)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                await send(start)
+
+            chunk = compressor.process(body)
+            if not more_body:
+                chunk += compressor.finish()
+            elif not chunk:
+                # The compressor is still buffering
+                return
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+        await self.app(scope, receive, send_wrapper)
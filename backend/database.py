@@ -3,182 +3,689 @@ SQLite Database Configuration for FinFamily
 Uses aiosqlite for async operations with FastAPI
 """
 import aiosqlite
+import asyncio
+import logging
 import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, closing
+from typing import Dict
+
+from metrics import observe_db, statement_stats
+
+logger = logging.getLogger(__name__)
 
 # Database file path - use environment variable or default to local file
 DB_PATH = os.environ.get('DATABASE_PATH', str(Path(__file__).parent / 'data' / 'finamily.db'))
 
+# Storage mode: 'single' keeps everything in DB_PATH; 'sharded' keeps only users
+# there and each user's financial tables in their own file under SHARD_DIR
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'single')
+SHARD_DIR = Path(os.environ.get('SHARD_DIR', str(Path(DB_PATH).parent / 'shards')))
+# Shard connections kept open, least recently used closed first
+SHARD_CACHE_SIZE = int(os.environ.get('SHARD_CACHE_SIZE', '64'))
+
+# Tables owned by a user, in the order their rows are copied into a shard
+FINANCIAL_TABLES = [
+    'family_members', 'banks', 'categories', 'transactions', 'goals',
+    'categorization_rules', 'badges', 'challenges',
+]
+
+# How long a connection waits for another writer (any worker process) before 'database is locked'
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# WAL lets readers run while a worker writes; use DELETE on network filesystems that lack shared memory
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+
+# Bump whenever create_auth_tables or create_financial_tables change: files marked
+# with the current version skip every CREATE statement when opened
+SCHEMA_VERSION = 5
+
+# Tables whose writes change cached aggregates; triggers give each user a new data version
+VERSIONED_TABLES = ['transactions', 'goals', 'categories']
+# transaction_rewrites key recording that a backup restore replaced every row of the file
+RESTORED_KEY = ''
+
+# Per-user version bumped only when transactions are edited or deleted, so caches
+# holding a user's rows can tell plain inserts (appended) from rewrites (reloaded)
+REWRITES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS transaction_rewrites (
+        user_id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID
+'''
+
+# Statements slower than this (execute plus fetches, in ms) are logged with their query plan; 0 disables
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+
 # Ensure data directory exists
 Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
 
-async def get_db():
+def is_sharded() -> bool:
+    return STORAGE_MODE == 'sharded'
+
+def shard_path(user_id: str) -> Path:
+    """Shard file of a user; ids are server-issued UUIDs but never trusted as paths"""
+    if not user_id or Path(user_id).name != user_id or user_id.startswith('.'):
+        raise ValueError(f"Invalid user id for shard: {user_id!r}")
+    return SHARD_DIR / f"{user_id}.db"
+
+async def get_db(path: str = DB_PATH):
     """Get database connection"""
-    db = await aiosqlite.connect(DB_PATH)
+    db = await aiosqlite.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
     db.row_factory = aiosqlite.Row
+    # Off by default and per connection: without it the declared REFERENCES are never checked
+    await db.execute("PRAGMA foreign_keys = ON")
+    return db
+
+async def _timed(operation: str, awaitable):
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        observe_db(operation, time.perf_counter() - start)
+
+class TimedCursor:
+    """Cursor proxy that adds fetch time and returned rows to its statement's stats"""
+
+    def __init__(self, connection: 'TimedConnection', cursor, stats, sql: str, parameters, elapsed: float):
+        self._connection = connection
+        self._cursor = cursor
+        self._stats = stats
+        self._sql = sql
+        self._parameters = parameters
+        # Time spent on this call so far, execute plus fetches
+        self._elapsed = elapsed
+        self._rows = 0
+        self._slow_logged = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def _fetch(self, awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        elapsed = time.perf_counter() - start
+        observe_db('fetch', elapsed)
+        self._stats.fetch_time += elapsed
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        self._stats.rows += rows
+        self._rows += rows
+        self._elapsed += elapsed
+        await self._check_slow()
+        return result
+
+    async def _check_slow(self):
+        self._stats.max_time = max(self._stats.max_time, self._elapsed)
+        if self._slow_logged or not SLOW_QUERY_MS or self._elapsed * 1000 < SLOW_QUERY_MS:
+            return
+        self._slow_logged = True
+        self._stats.slow_calls += 1
+        self._stats.plan = await self._connection.explain(self._sql, self._parameters)
+        logger.warning("🐢 Slow query (%.1f ms, %d rows fetched so far): %s\n  %s",
+                       self._elapsed * 1000, self._rows, self._stats.sql, '\n  '.join(self._stats.plan))
+
+    async def fetchone(self):
+        return await self._fetch(self._cursor.fetchone())
+
+    async def fetchmany(self, size: int = None):
+        return await self._fetch(self._cursor.fetchmany(size) if size else self._cursor.fetchmany())
+
+    async def fetchall(self):
+        return await self._fetch(self._cursor.fetchall())
+
+class TimedConnection:
+    """Connection proxy that times every statement for the metrics endpoint and the slow-query log"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    async def execute(self, sql: str, parameters=None):
+        stats = statement_stats(sql)
+        start = time.perf_counter()
+        cursor = await self._db.execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        observe_db('execute', elapsed)
+        stats.calls += 1
+        stats.execute_time += elapsed
+        timed = TimedCursor(self, cursor, stats, sql, parameters, elapsed)
+        await timed._check_slow()
+        return timed
+
+    async def executemany(self, sql: str, parameters):
+        stats = statement_stats(sql)
+        start = time.perf_counter()
+        cursor = await self._db.executemany(sql, parameters)
+        elapsed = time.perf_counter() - start
+        observe_db('execute', elapsed)
+        stats.calls += 1
+        stats.execute_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        return TimedCursor(self, cursor, stats, sql, None, elapsed)
+
+    async def explain(self, sql: str, parameters=None) -> list:
+        """EXPLAIN QUERY PLAN lines for a statement, indented by nesting"""
+        try:
+            cursor = await self._db.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            rows = await cursor.fetchall()
+        except Exception as e:
+            return [f"(no plan: {e})"]
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+
+    async def commit(self):
+        await _timed('commit', self._db.commit())
+
+    async def rollback(self):
+        await _timed('rollback', self._db.rollback())
+
+class ShardEntry:
+    def __init__(self, db):
+        self.db = db
+        self.lock = asyncio.Lock()
+        # Requests holding or waiting for the connection; only idle entries are evicted
+        self.users = 0
+
+class ShardPool:
+    """LRU of open shard connections, one request at a time per shard"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._open_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def connection(self, user_id: str):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            async with self._open_lock:
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    entry = ShardEntry(await open_shard(user_id))
+                    self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        entry.users += 1
+        try:
+            async with entry.lock:
+                await self._evict()
+                try:
+                    yield entry.db
+                finally:
+                    # Uncommitted work must not leak into the next request
+                    if entry.db.in_transaction:
+                        await entry.db.rollback()
+        finally:
+            entry.users -= 1
+
+    async def _evict(self):
+        # Victims are picked and popped without yielding, so none can be
+        # re-acquired between the users check and its close
+        victims = []
+        for uid in list(self._entries):
+            if len(self._entries) <= self.max_size:
+                break
+            if self._entries[uid].users == 0:
+                victims.append(self._entries.pop(uid))
+        for entry in victims:
+            async with entry.lock:
+                await entry.db.close()
+
+    async def discard(self, user_id: str):
+        """Close a shard's connection once its current users are done"""
+        entry = self._entries.pop(user_id, None)
+        if entry:
+            async with entry.lock:
+                await entry.db.close()
+
+    async def close(self):
+        entries, self._entries = self._entries, OrderedDict()
+        for entry in entries.values():
+            await entry.db.close()
+
+shard_pool = ShardPool(SHARD_CACHE_SIZE)
+
+async def open_shard(user_id: str):
+    """Open (creating if needed) a user's shard with the financial schema in place"""
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    db = await get_db(str(shard_path(user_id)))
+    await set_journal_mode(db)
+    if await schema_version(db) != schema_mark(financial=True):
+        # Accounts live in the main database; this stub is what the shard's user_id references resolve to
+        await db.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY)")
+        await db.execute("INSERT OR IGNORE INTO users (id) VALUES (?)", (user_id,))
+        await create_financial_tables(db)
+        await set_schema_version(db, schema_mark(financial=True))
+        await db.commit()
     return db
 
 @asynccontextmanager
-async def get_db_context():
-    """Context manager for database connection"""
-    db = await get_db()
+async def get_db_context(user_id: str = None, pooled: bool = True):
+    """Context manager for database connection.
+
+    With a user_id in sharded mode this is that user's shard; pooled=False
+    opens a private shard connection instead of waiting for the shared one
+    (for long streams and batch jobs). Without a user_id, or in single
+    mode, it is the main database.
+    """
+    if user_id and is_sharded():
+        if pooled:
+            async with shard_pool.connection(user_id) as db:
+                yield TimedConnection(db)
+            return
+        db = await open_shard(user_id)
+    else:
+        db = await get_db()
     try:
-        yield db
+        yield TimedConnection(db)
     finally:
         await db.close()
 
+async def close_db():
+    """Close pooled shard connections"""
+    await shard_pool.close()
+
 async def init_db():
-    """Initialize database tables"""
+    """Initialize database tables, unless the file already has the current schema"""
     async with get_db_context() as db:
-        # Users table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                password TEXT NOT NULL,
-                is_admin INTEGER DEFAULT 0,
-                is_approved INTEGER DEFAULT 0,
-                profile_photo TEXT,
-                preferences TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        
-        # Family members table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS family_members (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                profile TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Banks table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS banks (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                active INTEGER DEFAULT 1,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Categories table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                type TEXT NOT NULL,
-                is_fixed INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Transactions table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                date TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                type TEXT NOT NULL,
-                category_id TEXT,
-                member_id TEXT,
-                bank_id TEXT,
-                is_reserve_deposit INTEGER DEFAULT 0,
-                is_reserve_withdrawal INTEGER DEFAULT 0,
-                unique_hash TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (category_id) REFERENCES categories(id),
-                FOREIGN KEY (member_id) REFERENCES family_members(id),
-                FOREIGN KEY (bank_id) REFERENCES banks(id)
-            )
-        ''')
-        
-        # Goals table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS goals (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                target_amount REAL NOT NULL,
-                current_amount REAL DEFAULT 0,
-                deadline TEXT,
-                image_url TEXT,
-                monthly_contribution REAL DEFAULT 0,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Categorization rules table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS categorization_rules (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                keyword TEXT NOT NULL,
-                category_id TEXT NOT NULL,
-                match_type TEXT DEFAULT 'contains',
-                is_active INTEGER DEFAULT 1,
-                priority INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (category_id) REFERENCES categories(id)
-            )
-        ''')
-        
-        # Badges table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS badges (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                criteria TEXT NOT NULL,
-                unlocked_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                UNIQUE(user_id, criteria)
-            )
-        ''')
-        
-        # Family challenges table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS challenges (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                target_amount REAL NOT NULL,
-                current_amount REAL DEFAULT 0,
-                reward TEXT,
-                deadline TEXT,
-                category_id TEXT,
-                is_active INTEGER DEFAULT 1,
-                is_completed INTEGER DEFAULT 0,
-                completed_at TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Create indexes for better performance
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_categories_user ON categories(user_id)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_family_user ON family_members(user_id)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_banks_user ON banks(user_id)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_goals_user ON goals(user_id)')
-        await db.execute('CREATE INDEX IF NOT EXISTS idx_rules_user ON categorization_rules(user_id)')
-        
+        await set_journal_mode(db)
+        # The main file holds the financial tables only outside sharded mode
+        mark = schema_mark(financial=not is_sharded())
+        if await schema_version(db) == mark:
+            return
+        await create_auth_tables(db)
+        if not is_sharded():
+            await create_financial_tables(db)
+        await set_schema_version(db, mark)
         await db.commit()
         print("✅ Database initialized successfully")
+
+def schema_mark(financial: bool) -> int:
+    """user_version of an up-to-date file; files with and without the financial tables differ"""
+    return SCHEMA_VERSION * 2 + int(financial)
+
+async def schema_version(db) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    return (await cursor.fetchone())[0]
+
+async def set_schema_version(db, version: int):
+    await db.execute(f"PRAGMA user_version = {int(version)}")
+
+async def set_journal_mode(db):
+    """Persistent per file, so setting it when the schema is created covers every later connection"""
+    cursor = await db.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    row = await cursor.fetchone()
+    if row[0].upper() != SQLITE_JOURNAL_MODE:
+        logger.warning("⚠️ SQLite journal mode is %s, %s was requested", row[0], SQLITE_JOURNAL_MODE)
+
+async def create_auth_tables(db):
+    """Tables shared by every user: accounts and authentication"""
+    # Users table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            password TEXT NOT NULL,
+            is_admin INTEGER DEFAULT 0,
+            is_approved INTEGER DEFAULT 0,
+            profile_photo TEXT,
+            preferences TEXT,
+            created_at TEXT NOT NULL
+        )
+    ''')
+
+async def create_financial_tables(db):
+    """Tables holding a user's financial data (main database, or one shard per user)"""
+    # Family members table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS family_members (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            profile TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Banks table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS banks (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            active INTEGER DEFAULT 1,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Categories table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            is_fixed INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Transactions table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            type TEXT NOT NULL,
+            category_id TEXT,
+            member_id TEXT,
+            bank_id TEXT,
+            is_reserve_deposit INTEGER DEFAULT 0,
+            is_reserve_withdrawal INTEGER DEFAULT 0,
+            unique_hash TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (member_id) REFERENCES family_members(id),
+            FOREIGN KEY (bank_id) REFERENCES banks(id)
+        )
+    ''')
+    
+    # Goals table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS goals (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            target_amount REAL NOT NULL,
+            current_amount REAL DEFAULT 0,
+            deadline TEXT,
+            image_url TEXT,
+            monthly_contribution REAL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Categorization rules table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS categorization_rules (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            category_id TEXT NOT NULL,
+            match_type TEXT DEFAULT 'contains',
+            is_active INTEGER DEFAULT 1,
+            priority INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (category_id) REFERENCES categories(id)
+        )
+    ''')
+    
+    # Badges table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS badges (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            criteria TEXT NOT NULL,
+            unlocked_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            UNIQUE(user_id, criteria)
+        )
+    ''')
+    
+    # Family challenges table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS challenges (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            target_amount REAL NOT NULL,
+            current_amount REAL DEFAULT 0,
+            reward TEXT,
+            deadline TEXT,
+            category_id TEXT,
+            is_active INTEGER DEFAULT 1,
+            is_completed INTEGER DEFAULT 0,
+            completed_at TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Create indexes for better performance
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_categories_user ON categories(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_family_user ON family_members(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_banks_user ON banks(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_goals_user ON goals(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_rules_user ON categorization_rules(user_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(user_id, date)')
+    # Foreign keys: deleting a member, bank or category looks its references up by these
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_member ON transactions(member_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_bank ON transactions(bank_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_rules_category ON categorization_rules(category_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_challenges_category ON challenges(category_id)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_challenges_user ON challenges(user_id)')
+    # Per-member and per-bank breakdowns group along these without reading the table
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_member ON transactions(user_id, member_id, date, type, amount)')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_bank ON transactions(user_id, bank_id, date, type, amount)')
+    
+    # Full-text search over descriptions, kept in sync by triggers.
+    # External content keyed by the implicit rowid: never VACUUM without rebuilding it.
+    # user_id is indexed too, so a search intersects with one household's rows
+    # inside the index instead of collecting every household's matches.
+    cursor = await db.execute("SELECT name FROM pragma_table_info('transactions_fts')")
+    fts_columns = {r[0] for r in await cursor.fetchall()}
+    if fts_columns and 'user_id' not in fts_columns:
+        # Search table from before user_id was indexed; its triggers would skip the column
+        for trigger in ('insert', 'delete', 'update'):
+            await db.execute(f"DROP TRIGGER IF EXISTS transactions_fts_{trigger}")
+        await db.execute("DROP TABLE transactions_fts")
+        fts_columns = set()
+    await db.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            user_id,
+            description,
+            content='transactions',
+            content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+            INSERT INTO transactions_fts(rowid, user_id, description) VALUES (new.rowid, new.user_id, new.description);
+        END
+    ''')
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+            INSERT INTO transactions_fts(transactions_fts, rowid, user_id, description)
+            VALUES ('delete', old.rowid, old.user_id, old.description);
+        END
+    ''')
+    await db.execute('''
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF user_id, description ON transactions BEGIN
+            INSERT INTO transactions_fts(transactions_fts, rowid, user_id, description)
+            VALUES ('delete', old.rowid, old.user_id, old.description);
+            INSERT INTO transactions_fts(rowid, user_id, description) VALUES (new.rowid, new.user_id, new.description);
+        END
+    ''')
+    if not fts_columns:
+        # Index rows that predate the search table
+        await db.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+    
+    # Data version per user, shared by every worker process through the file.
+    # A random value rather than a counter: restoring a backup brings back older
+    # rows, and a counter could then repeat a version some worker cached newer data under.
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    for table in VERSIONED_TABLES:
+        for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+            await db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    INSERT OR REPLACE INTO data_versions (user_id, version) VALUES ({row}.user_id, random());
+                END
+            ''')
+    await db.execute(REWRITES_TABLE_SQL)
+    for event in ('UPDATE', 'DELETE'):
+        await db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS transactions_rewrite_{event.lower()} AFTER {event} ON transactions BEGIN
+                INSERT OR REPLACE INTO transaction_rewrites (user_id, version) VALUES (old.user_id, random());
+            END
+        ''')
+    
+    await detach_orphans(db)
+
+# References left dangling while foreign keys were not enforced. Optional ones are
+# cleared on every schema update (the app shows them as "Sem categoria", "Sem membro",
+# "Sem banco"); deleting rows is left to `python database.py remove-orphans`
+ORPHAN_CLEANUP = [
+    ('transactions', "UPDATE transactions SET category_id = NULL WHERE category_id NOT IN (SELECT id FROM categories)"),
+    ('transactions', "UPDATE transactions SET member_id = NULL WHERE member_id NOT IN (SELECT id FROM family_members)"),
+    ('transactions', "UPDATE transactions SET bank_id = NULL WHERE bank_id NOT IN (SELECT id FROM banks)"),
+    ('challenges', "UPDATE challenges SET category_id = NULL WHERE category_id NOT IN (SELECT id FROM categories)"),
+]
+
+# Rows that cannot be kept once foreign keys hold: those of accounts that no longer
+# exist (children first) and categorization rules whose category is gone
+ORPHAN_ROWS = [
+    (table, f"DELETE FROM {table} WHERE user_id NOT IN (SELECT id FROM users)")
+    for table in reversed(FINANCIAL_TABLES)
+] + [
+    ('categorization_rules', "DELETE FROM categorization_rules WHERE category_id NOT IN (SELECT id FROM categories)"),
+]
+
+async def run_cleanup(db, statements: list) -> Dict[str, int]:
+    """Run (table, sql) statements, returning the rows changed per table"""
+    counts = defaultdict(int)
+    for table, sql in statements:
+        cursor = await db.execute(sql)
+        if cursor.rowcount > 0:
+            counts[table] += cursor.rowcount
+    return dict(counts)
+
+async def detach_orphans(db):
+    """Clear optional references to deleted parents; never deletes rows"""
+    for table, count in (await run_cleanup(db, ORPHAN_CLEANUP)).items():
+        logger.info("🧹 %s: detached %d orphaned references", table, count)
+    cursor = await db.execute("PRAGMA foreign_key_check")
+    violations = await cursor.fetchall()
+    if violations:
+        logger.warning("⚠️ %d rows still violate foreign keys, e.g. %s; run `python database.py remove-orphans`",
+                       len(violations), tuple(violations[0]))
+
+async def remove_orphans() -> Dict[str, int]:
+    """Delete rows that violate foreign keys, after taking a backup.
+
+    In sharded mode the shards of accounts missing from the main database
+    are deleted whole (counted under "shards"). Returns rows deleted per table.
+    """
+    from backup import create_backup
+    backup = create_backup()
+    logger.info("💾 Backup %s taken before removing orphans", backup['name'])
+
+    counts = defaultdict(int)
+    async with get_db_context() as db:
+        if not is_sharded():
+            counts.update(await run_cleanup(db, ORPHAN_ROWS))
+            await db.commit()
+            return dict(counts)
+        cursor = await db.execute("SELECT id FROM users")
+        user_ids = {r['id'] for r in await cursor.fetchall()}
+
+    for path in sorted(SHARD_DIR.glob('*.db')) if SHARD_DIR.exists() else []:
+        if path.stem not in user_ids:
+            await delete_shard(path.stem)
+            counts['shards'] += 1
+            continue
+        async with get_db_context(path.stem, pooled=False) as shard:
+            for table, count in (await run_cleanup(shard, ORPHAN_ROWS)).items():
+                counts[table] += count
+            await shard.commit()
+    return dict(counts)
+
+async def delete_shard(user_id: str):
+    """Close and delete a user's shard file, with its WAL and shared-memory files"""
+    await shard_pool.discard(user_id)
+    path = shard_path(user_id)
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+def mark_restored(path: str):
+    """Record in a database file about to be restored that all its rows were replaced.
+
+    Restored rows never went through the triggers, so without the mark a
+    worker could append to a cache holding rows the restore removed.
+    """
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute(REWRITES_TABLE_SQL)
+        conn.execute("INSERT OR REPLACE INTO transaction_rewrites (user_id, version) VALUES (?, random())",
+                     (RESTORED_KEY,))
+        conn.commit()
+
+async def migrate_to_shards() -> int:
+    """Copy each user's rows from the main database into their shard.
+
+    Run once before switching STORAGE_MODE to 'sharded'; rows already in a
+    shard are kept, and the main database is left untouched. Older databases
+    may hold references to deleted rows, so rows are copied with foreign keys
+    off and each shard's dangling optional references are detached after.
+    """
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT id FROM users")
+        user_ids = [r['id'] for r in await cursor.fetchall()]
+
+    for user_id in user_ids:
+        shard = await open_shard(user_id)
+        try:
+            # OR IGNORE skips duplicates but not foreign key violations
+            await shard.execute("PRAGMA foreign_keys = OFF")
+            await shard.execute("ATTACH DATABASE ? AS source", (DB_PATH,))
+            for table in FINANCIAL_TABLES:
+                await shard.execute(
+                    f"INSERT OR IGNORE INTO main.{table} SELECT * FROM source.{table} WHERE user_id = ?",
+                    (user_id,)
+                )
+            await detach_orphans(shard)
+            await shard.commit()
+            await shard.execute("DETACH DATABASE source")
+        finally:
+            await shard.close()
+    return len(user_ids)
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['migrate-shards']:
+        count = asyncio.run(migrate_to_shards())
+        print(f"✅ Copied {count} users into {SHARD_DIR}")
+    elif sys.argv[1:] == ['remove-orphans']:
+        counts = asyncio.run(remove_orphans())
+        for table, count in counts.items():
+            print(f"🧹 {table}: {count} removed")
+        print(f"✅ Orphan cleanup finished ({sum(counts.values())} removed)")
+    else:
+        print("Usage: python database.py migrate-shards | remove-orphans")
+        sys.exit(1)
@@ -0,0 +1,110 @@
+"""
+In-process event bus for FinFamily
+Write endpoints emit per-user change events; subscribed handlers run in a
+background worker so gamification updates stay off the request path
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+from aggregates import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# Event types
+TRANSACTIONS_CHANGED = "transactions.changed"
+GOALS_CHANGED = "goals.changed"
+
+@dataclass
+class Event:
+    """A change to one user's data.
+
+    deltas holds signed (category_id, day, amount, type) entries describing
+    how the write moved money between categories, e.g. a deleted transaction
+    yields a negative amount for its category; type is the transactions' type.
+    """
+    type: str
+    user_id: str
+    deltas: List[tuple] = field(default_factory=list)
+
+Handler = Callable[[Event], Awaitable[None]]
+
+class EventBus:
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._coalesced: Dict[str, List[Handler]] = defaultdict(list)
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+
+    def subscribe(self, *event_types: str, coalesce: bool = False):
+        """Register a handler for one or more event types.
+
+        Coalesced handlers run once per user for each batch of queued events,
+        which suits idempotent recomputes such as badge evaluation.
+        """
+        def decorator(handler: Handler) -> Handler:
+            registry = self._coalesced if coalesce else self._handlers
+            for event_type in event_types:
+                registry[event_type].append(handler)
+            return handler
+        return decorator
+
+    def emit(self, event_type: str, user_id: str, deltas: List[tuple] = None):
+        """Invalidate the user's cached aggregates and queue an event without waiting for its handlers"""
+        invalidate_user(user_id)
+        if self._queue is None:
+            return
+        self._queue.put_nowait(Event(type=event_type, user_id=user_id, deltas=deltas or []))
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def drain(self):
+        """Wait until every event queued so far has been handled"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """Process whatever is still queued, then stop the worker"""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._queue = None
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._dispatch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _dispatch(self, batch: List[Event]):
+        latest: Dict[tuple, Event] = {}
+        for event in batch:
+            for handler in self._handlers[event.type]:
+                await self._call(handler, event)
+            for handler in self._coalesced[event.type]:
+                latest[(handler, event.user_id)] = event
+        for (handler, _), event in latest.items():
+            await self._call(handler, event)
+
+    async def _call(self, handler: Handler, event: Event):
+        try:
+            await handler(event)
+        except Exception:
+            logger.exception("Event handler %s failed for %s", handler.__name__, event.type)
+
+bus = EventBus()
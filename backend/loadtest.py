@@ -0,0 +1,241 @@
+"""
+Concurrent load test for FinFamily
+Simulates whole families against a running server (e.g. uvicorn on :8001) to
+surface contention between imports writing and dashboards reading
+
+Usage:
+    DATABASE_PATH=/tmp/carga.db python synthetic_data.py --users 50 --years 2
+    DATABASE_PATH=/tmp/carga.db uvicorn server:app --port 8001 &
+    python loadtest.py --families 50 --duration 60 --scenario family --output load.json
+
+Each virtual family logs in as familia-NNNNN@example.com (see synthetic_data.py)
+and repeats weighted actions with exponential think time between them. The
+report has p50/p95/p99 per request, error rates and how many requests failed
+with SQLite's 'database is locked' (served as 503 by the API).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmark import percentile
+from synthetic_data import EMAIL_DOMAIN, SYNTHETIC_PASSWORD
+
+# Action weights per scenario
+SCENARIOS = {
+    # A household checking its finances now and then, importing a statement occasionally
+    'family': {'dashboard': 45, 'browse': 35, 'import': 8, 'categorize': 12},
+    'read-heavy': {'dashboard': 60, 'browse': 40},
+    # Many families importing at once: worst case for the single SQLite writer
+    'import-storm': {'dashboard': 30, 'import': 50, 'categorize': 20},
+}
+IMPORT_ROWS = 150
+LOCKED_MARKER = 'locked'
+
+class Recorder:
+    """Latencies and outcomes per request name"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.locked = Counter()
+        self.errors = Counter()
+        # Families that could not start a session (login failed or account has no members, banks or categories)
+        self.failed_sessions = 0
+
+    def record(self, name: str, elapsed: float, response: httpx.Response = None, error: Exception = None):
+        self.latencies[name].append(elapsed)
+        if error is not None:
+            self.statuses[name][type(error).__name__] += 1
+            self.errors[name] += 1
+            return
+        self.statuses[name][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            if response.status_code == 503 and LOCKED_MARKER in response.text:
+                self.locked[name] += 1
+
+    def report(self, duration: float) -> dict:
+        requests = {}
+        for name in sorted(self.latencies):
+            ms = sorted(l * 1000 for l in self.latencies[name])
+            requests[name] = {
+                "count": len(ms),
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / len(ms), 4),
+                "database_locked": self.locked[name],
+                "p50_ms": round(percentile(ms, 0.50), 2),
+                "p95_ms": round(percentile(ms, 0.95), 2),
+                "p99_ms": round(percentile(ms, 0.99), 2),
+                "max_ms": round(ms[-1], 2),
+                "rps": round(len(ms) / duration, 2),
+                "statuses": dict(self.statuses[name]),
+            }
+        total = sum(r["count"] for r in requests.values())
+        errors = sum(r["errors"] for r in requests.values())
+        return {
+            "total_requests": total,
+            "rps": round(total / duration, 2),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "database_locked": sum(self.locked.values()),
+            "failed_sessions": self.failed_sessions,
+            "requests": requests,
+        }
+
+class Family:
+    """One virtual household session"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, index: int, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.email = f"familia-{index:05d}@{EMAIL_DOMAIN}"
+        self.rng = rng
+        self.headers = {}
+        self.imports = 0
+        # Picked by login() from the account's own rows
+        self.member_id = None
+        self.bank_id = None
+        self.category_ids = []
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(name, time.perf_counter() - start, error=e)
+            return None
+        self.recorder.record(name, time.perf_counter() - start, response)
+        return response if response.status_code < 400 else None
+
+    async def login(self) -> bool:
+        response = await self.request('login', 'POST', '/api/auth/login',
+                                      json={'email': self.email, 'password': SYNTHETIC_PASSWORD})
+        if response is None:
+            return False
+        self.headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+        members = await self.request('family', 'GET', '/api/family')
+        banks = await self.request('banks', 'GET', '/api/banks')
+        categories = await self.request('categories', 'GET', '/api/categories')
+        if not (members and banks and categories):
+            return False
+        members, banks = members.json(), banks.json()
+        self.category_ids = [c['id'] for c in categories.json() if c.get('type') == 'despesa']
+        # Imports and bulk categorize need one of each; such an account fails alone instead of the run
+        if not (members and banks and self.category_ids):
+            return False
+        self.member_id = members[0]['id']
+        self.bank_id = banks[0]['id']
+        return True
+
+    def random_month(self) -> tuple:
+        today = datetime.now(timezone.utc)
+        offset = self.rng.randint(0, 11)
+        index = today.year * 12 + today.month - 1 - offset
+        return index // 12, index % 12 + 1
+
+    async def dashboard(self):
+        """The dashboard page loads its widgets in parallel"""
+        year, month = self.random_month()
+        await asyncio.gather(
+            self.request('dashboard_summary', 'GET', '/api/dashboard/summary', params={'month': month, 'year': year}),
+            self.request('dashboard_category_chart', 'GET', '/api/dashboard/category-chart',
+                         params={'month': month, 'year': year}),
+            self.request('dashboard_monthly_comparison', 'GET', '/api/dashboard/monthly-comparison',
+                         params={'year': year}),
+            self.request('dashboard_emergency_reserve', 'GET', '/api/dashboard/emergency-reserve'),
+            self.request('health_score', 'GET', '/api/gamification/health-score'),
+            self.request('badges', 'GET', '/api/gamification/badges'),
+        )
+
+    async def browse(self):
+        year, month = self.random_month()
+        await self.request('transactions_month', 'GET', '/api/transactions', params={'month': month, 'year': year})
+        for page in range(self.rng.randint(1, 3)):
+            await self.request('transactions_page', 'GET', '/api/transactions', params={'limit': 50, 'offset': page * 50})
+        if self.rng.random() < 0.5:
+            term = self.rng.choice(['assai', 'uber', 'farmacia', 'pix', 'netflix'])
+            await self.request('transactions_search', 'GET', '/api/transactions', params={'q': term, 'limit': 50})
+
+    async def import_statement(self):
+        self.imports += 1
+        today = datetime.now(timezone.utc)
+        lines = ['Data;Descrição;Valor']
+        for j in range(IMPORT_ROWS):
+            lines.append(f"{today:%d/%m/%Y};COMPRA CARTAO - LOAD {id(self)}-{self.imports}-{j} IFOOD;-{5 + j % 200},{j % 100:02d}")
+        await self.request(
+            'import', 'POST', '/api/transactions/import',
+            files={'file': ('load.csv', '\n'.join(lines).encode('utf-8'), 'text/csv')},
+            data={'member_id': self.member_id, 'bank_id': self.bank_id},
+        )
+
+    async def categorize(self):
+        year, month = self.random_month()
+        await self.request('bulk_categorize', 'POST', '/api/transactions/bulk-categorize', json={
+            'filter': {'uncategorized': True, 'month': month, 'year': year},
+            'category_id': self.rng.choice(self.category_ids),
+        })
+
+    async def run(self, weights: dict, deadline: float, think: float):
+        actions = {'dashboard': self.dashboard, 'browse': self.browse,
+                   'import': self.import_statement, 'categorize': self.categorize}
+        names = list(weights)
+        # Spread logins so every family does not hit bcrypt at the same instant
+        await asyncio.sleep(self.rng.uniform(0, think))
+        if not await self.login():
+            self.recorder.failed_sessions += 1
+            return
+        while time.monotonic() < deadline:
+            action = self.rng.choices(names, weights=[weights[n] for n in names])[0]
+            await actions[action]()
+            await asyncio.sleep(self.rng.expovariate(1 / think) if think else 0)
+
+async def run_load(base_url: str, families: int, duration: float, scenario: str, think: float, seed: int) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    limits = httpx.Limits(max_connections=families * 6, max_keepalive_connections=families * 6)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        deadline = time.monotonic() + duration
+        start = time.perf_counter()
+        sessions = [Family(client, recorder, i, random.Random(rng.random())) for i in range(1, families + 1)]
+        await asyncio.gather(*(s.run(SCENARIOS[scenario], deadline, think) for s in sessions))
+        elapsed = time.perf_counter() - start
+    report = recorder.report(elapsed)
+    report["config"] = {"base_url": base_url, "families": families, "duration_s": duration,
+                        "scenario": scenario, "think_s": think, "seed": seed}
+    return report
+
+def print_report(report: dict):
+    print(f"{'request':<30} {'count':>7} {'err%':>6} {'locked':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in report["requests"].items():
+        print(f"{name:<30} {r['count']:>7} {r['error_rate']:>6.1%} {r['database_locked']:>7} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+    print(f"Total {report['total_requests']} requests, {report['rps']} req/s, "
+          f"{report['error_rate']:.2%} errors, {report['database_locked']} 'database is locked', "
+          f"{report['failed_sessions']} families failed to log in")
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent FinFamily households against a running server")
+    parser.add_argument('--url', default='http://localhost:8001', help="server base URL (default %(default)s)")
+    parser.add_argument('--families', type=int, default=20, help="concurrent virtual families (default %(default)s)")
+    parser.add_argument('--duration', type=float, default=60, help="seconds to run (default %(default)s)")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='family')
+    parser.add_argument('--think', type=float, default=1.0, help="mean think time between actions in seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv[1:])
+
+    report = asyncio.run(run_load(args.url, args.families, args.duration, args.scenario, args.think, args.seed))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
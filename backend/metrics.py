@@ -0,0 +1,267 @@
+"""
+Prometheus metrics for FinFamily
+Request latency, sizes and status codes are recorded by an ASGI middleware;
+database time and per-statement statistics are added by the connection proxy in database.py
+"""
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from starlette.routing import Match
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Requests that match no route share one label so unknown paths cannot grow the series count
+UNMATCHED_ROUTE = '<unmatched>'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+registry: List['Metric'] = []
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: Dict[tuple, object] = {}
+        registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values in sorted(self._series):
+            lines.extend(self._render_series(values, self._series[values]))
+        return lines
+
+    def _render_series(self, values: tuple, state) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, values)} {state}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *values, amount: float = 1):
+        self._series[values] = self._series.get(values, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *values, amount: float = 1):
+        self._series[values] = self._series.get(values, 0) + amount
+
+    def dec(self, *values, amount: float = 1):
+        self.inc(*values, amount=-amount)
+
+    def set(self, value: float, *values):
+        self._series[values] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *values):
+        state = self._series.get(values)
+        if state is None:
+            # Per-bucket counts (non-cumulative), then sum and count
+            state = self._series[values] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[0][index] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _render_series(self, values: tuple, state) -> List[str]:
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = _format_labels(self.labels, values, f'le="{bound}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        le = _format_labels(self.labels, values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{le} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# ==================== METRICS ====================
+
+REQUEST_DURATION = Histogram(
+    'finfamily_http_request_duration_seconds', 'Time from request start until the response body was sent.',
+    ('method', 'route'))
+REQUEST_DB_DURATION = Histogram(
+    'finfamily_http_request_db_seconds', 'Time a request spent waiting on SQLite.',
+    ('method', 'route'))
+RESPONSE_SIZE = Histogram(
+    'finfamily_http_response_size_bytes', 'Response body size.',
+    ('method', 'route'), buckets=SIZE_BUCKETS)
+REQUESTS = Counter(
+    'finfamily_http_requests_total', 'Finished requests by status code.',
+    ('method', 'route', 'status'))
+IN_FLIGHT = Gauge(
+    'finfamily_http_requests_in_flight', 'Requests currently being served.',
+    ('method', 'route'))
+DB_LOCKED = Counter(
+    'finfamily_db_locked_total', "Requests that failed with SQLite's 'database is locked'.",
+    ('method', 'route'))
+STARTUP_PHASE = Gauge(
+    'finfamily_startup_phase_seconds', 'Time this process spent in each startup phase.',
+    ('phase',))
+DB_DURATION = Histogram(
+    'finfamily_db_operation_seconds', 'Time spent in SQLite calls, including background work.',
+    ('operation',))
+
+# ==================== DATABASE TIME ====================
+
+# Holds a one-element list per request so the connection proxy can add to it
+_request_db_time: ContextVar[Optional[list]] = ContextVar('request_db_time', default=None)
+
+def observe_db(operation: str, seconds: float):
+    """Record one database call, attributing it to the current request if there is one"""
+    DB_DURATION.observe(seconds, operation)
+    holder = _request_db_time.get()
+    if holder is not None:
+        holder[0] += seconds
+
+# ==================== STATEMENTS ====================
+
+# Distinct statements tracked; anything beyond shares one entry
+MAX_STATEMENTS = 1000
+OTHER_STATEMENTS = '<other>'
+
+_WHITESPACE = re.compile(r'\s+')
+# IN (?, ?, ...) lists vary with the number of ids and would split one statement into many
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+class StatementStats:
+    """Totals for one normalized SQL statement since startup"""
+    __slots__ = ('sql', 'calls', 'execute_time', 'fetch_time', 'max_time', 'rows', 'slow_calls', 'plan')
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        # Slowest single call, execute plus its fetches
+        self.max_time = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        # Query plan captured the last time the statement was slow
+        self.plan: Optional[List[str]] = None
+
+    @property
+    def total_time(self) -> float:
+        return self.execute_time + self.fetch_time
+
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_ms": round(self.total_time * 1000, 3),
+            "execute_ms": round(self.execute_time * 1000, 3),
+            "fetch_ms": round(self.fetch_time * 1000, 3),
+            "mean_ms": round(self.total_time * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_time * 1000, 3),
+            "rows": self.rows,
+            "slow_calls": self.slow_calls,
+            "plan": self.plan,
+        }
+
+_statements: Dict[str, StatementStats] = {}
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    return _PLACEHOLDER_LIST.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+
+def statement_stats(sql: str) -> StatementStats:
+    key = normalize_sql(sql)
+    stats = _statements.get(key)
+    if stats is None:
+        if len(_statements) >= MAX_STATEMENTS:
+            key = OTHER_STATEMENTS
+            stats = _statements.get(key)
+        if stats is None:
+            stats = _statements[key] = StatementStats(key)
+    return stats
+
+STATEMENT_ORDERINGS = ('total_time', 'max_time', 'calls', 'rows')
+
+def top_statements(limit: int = 20, order_by: str = 'total_time') -> List[dict]:
+    """Statements with the highest total_time (or another ordering) since startup"""
+    ranked = sorted(_statements.values(), key=lambda s: getattr(s, order_by), reverse=True)
+    return [stats.to_dict() for stats in ranked[:limit]]
+
+# ==================== MIDDLEWARE ====================
+
+def route_label(scope) -> str:
+    """Path template of the route serving this request, e.g. /api/transactions/{transaction_id}"""
+    app = scope.get('app')
+    partial = None
+    for route in getattr(getattr(app, 'router', None), 'routes', []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed until their last chunk"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        route = route_label(scope)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        db_time = [0.0]
+        token = _request_db_time.set(db_time)
+        IN_FLIGHT.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, method, route)
+            REQUEST_DB_DURATION.observe(db_time[0], method, route)
+            RESPONSE_SIZE.observe(size, method, route)
+            REQUESTS.inc(method, route, str(status))
+            IN_FLIGHT.dec(method, route)
+            _request_db_time.reset(token)
@@ -0,0 +1,116 @@
+"""
+On-demand request profiling for FinFamily
+An admin sends a request with the header `X-Profile: 1`; it is served normally
+under cProfile and the result is stored in PROFILE_DIR for download
+"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from database import DB_PATH
+
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', str(Path(DB_PATH).parent / 'profiles')))
+# Number of profiles kept; older ones are deleted after each new profile
+PROFILE_RETENTION = int(os.environ.get('PROFILE_RETENTION', '20'))
+# Functions listed in the text report
+PROFILE_REPORT_LINES = 60
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_ID_HEADER = b'x-profile-id'
+# .prof files load in pstats/snakeviz; .txt is the readable report
+PROFILE_SUFFIXES = ('.prof', '.txt')
+
+_PROFILE_NAME = re.compile(r'^[0-9]{8}-[0-9]{6}-[A-Za-z0-9-]+\.(prof|txt)$')
+
+def profile_path(name: str) -> Path:
+    """Resolve a profile file name, rejecting anything outside PROFILE_DIR"""
+    if not _PROFILE_NAME.match(name):
+        raise ValueError(f"Invalid profile name: {name}")
+    return PROFILE_DIR / name
+
+def list_profiles() -> list:
+    """Stored profiles, newest first"""
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = sorted(PROFILE_DIR.glob('*.prof'), reverse=True)
+    return [
+        {"id": p.stem, "size": p.stat().st_size,
+         "created_at": datetime.fromtimestamp(p.stat().st_mtime, timezone.utc).isoformat()}
+        for p in profiles
+    ]
+
+def prune_profiles(keep: int = PROFILE_RETENTION):
+    for profile in list_profiles()[keep:]:
+        for suffix in PROFILE_SUFFIXES:
+            (PROFILE_DIR / f"{profile['id']}{suffix}").unlink(missing_ok=True)
+
+def save_profile(profiler: cProfile.Profile, profile_id: str, title: str):
+    """Write the raw stats and a text report sorted by cumulative time"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(PROFILE_DIR / f"{profile_id}.prof"))
+
+    report = io.StringIO()
+    report.write(f"{title}\n\n")
+    stats = pstats.Stats(profiler, stream=report).strip_dirs()
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_REPORT_LINES)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_REPORT_LINES // 2)
+    (PROFILE_DIR / f"{profile_id}.txt").write_text(report.getvalue(), encoding='utf-8')
+    prune_profiles()
+
+def new_profile_id(method: str, path: str) -> str:
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or 'root'
+    return f"{timestamp}-{method}-{slug}-{uuid.uuid4().hex[:6]}"
+
+class ProfileMiddleware:
+    """Profile requests carrying `X-Profile: 1` when authorize(headers) accepts them.
+
+    cProfile sees the whole event loop thread, so other requests served at the
+    same moment show up in the report too; profiles therefore run one at a
+    time, and a second X-Profile request arriving meanwhile is served without
+    profiling.
+    """
+
+    def __init__(self, app, authorize: Callable[[dict], Awaitable[bool]]):
+        self.app = app
+        self.authorize = authorize
+        # Set and checked with no await in between, so taking it never waits
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or (PROFILE_HEADER, b'1') not in scope['headers'] or self._busy:
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+        # Another profile may have started while authorize() was awaited
+        if not await self.authorize(headers) or self._busy:
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        try:
+            profile_id = new_profile_id(scope['method'], scope['path'])
+
+            async def send_wrapper(message):
+                if message['type'] == 'http.response.start':
+                    message['headers'] = list(message.get('headers', [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+                await send(message)
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+                query = scope.get('query_string', b'').decode('latin-1')
+                title = f"{scope['method']} {scope['path']}" + (f"?{query}" if query else '')
+                await asyncio.to_thread(save_profile, profiler, profile_id, title)
+        finally:
+            self._busy = False
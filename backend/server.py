@@ -2,29 +2,53 @@
 FinFamily API - Self-hosted Financial Management
 Refactored to use SQLite and serve frontend statically
 """
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request
+import time
+# Start of the import phase reported at startup (see STARTUP TIMING)
+STARTUP_BEGAN = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 import bcrypt
-from jose import JWTError, jwt
+from jose import JWTError
 import io
 import csv
 import hashlib
 import json
+import asyncio
+import sqlite3
+
+# Lists of rows skip FastAPI's encoder; orjson, when installed, serializes them several times faster
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as ListResponse
+except ImportError:
+    ListResponse = JSONResponse
 
 # Database
-from database import init_db, get_db_context
+from database import init_db, close_db, get_db_context, is_sharded, delete_shard, FINANCIAL_TABLES
+from aggregates import (
+    RESERVE_CATEGORY_NAME, get_reserve_category_id, get_cached_monthly_series, reserve_balance, average_monthly_expenses,
+    get_monthly_series, get_breakdown, BREAKDOWN_FIELDS, month_key, shift_month, data_version, cache_get, cache_set, invalidate_all,
+    month_index, load_transaction_records, monthly_totals, totals_by
+)
+from events import bus, TRANSACTIONS_CHANGED, GOALS_CHANGED
+import backup
+import columnar
+import metrics
+import profiling
+from compression import CompressionMiddleware
+from static_assets import StaticIndex
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -36,20 +60,53 @@ DATA_DIR = ROOT_DIR / 'data'
 # Ensure directories exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Built frontend, indexed (and precompressed) once at startup
+static_index = StaticIndex(STATIC_DIR) if STATIC_DIR.exists() else None
+
 # Configuration
 SECRET_KEY = os.environ.get('JWT_SECRET', os.environ.get('SECRET_KEY', 'change-this-secret-key-in-production'))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
+# Optional bearer token required by /api/metrics; unset leaves it open for local scrapers
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# ==================== STARTUP TIMING ====================
+
+# Seconds per startup phase of this process, in order; also exported as a metric
+startup_phases: dict = {}
+
+@contextmanager
+def startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = time.perf_counter() - start
+        metrics.STARTUP_PHASE.set(startup_phases[name], name)
 
 # ==================== LIFESPAN ====================
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await init_db()
-    logging.info("🚀 FinFamily API started")
+    startup_phases['imports'] = time.perf_counter() - STARTUP_BEGAN
+    metrics.STARTUP_PHASE.set(startup_phases['imports'], 'imports')
+    with startup_phase('init_db'):
+        await init_db()
+    with startup_phase('event_bus'):
+        await bus.start()
+    if static_index:
+        with startup_phase('static_index'):
+            await asyncio.to_thread(static_index.load)
+    # Load what the first authenticated request needs while the first page is being served
+    warmup = asyncio.create_task(asyncio.to_thread(jwt_module))
+    logging.info("🚀 FinFamily API started in %.0f ms (%s)", sum(startup_phases.values()) * 1000,
+                 ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_phases.items()))
     yield
+    await warmup
     # Shutdown
+    await bus.stop()
+    await close_db()
     logging.info("👋 FinFamily API shutting down")
 
 # ==================== APP SETUP ====================
@@ -73,6 +130,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for responses above COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Admin-only cProfile of single requests sent with `X-Profile: 1`
+app.add_middleware(profiling.ProfileMiddleware, authorize=lambda headers: is_admin_request(headers))
+
+# Per-route latency, size and status metrics (served at /api/metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(sqlite3.OperationalError)
+async def database_error_handler(request: Request, exc: sqlite3.OperationalError):
+    """A write lock held past the busy timeout is transient: answer 503 so clients retry"""
+    if 'database is locked' not in str(exc):
+        raise exc
+    metrics.DB_LOCKED.inc(request.method, metrics.route_label(request.scope))
+    logger.warning("🔒 Database is locked: %s %s", request.method, request.url.path)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is locked, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(sqlite3.IntegrityError)
+async def integrity_error_handler(request: Request, exc: sqlite3.IntegrityError):
+    """A write referencing a member, bank or category that no longer exists"""
+    if 'FOREIGN KEY' not in str(exc):
+        raise exc
+    return JSONResponse(status_code=409, content={"detail": "Membro, banco ou categoria não encontrado"})
+
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -171,8 +257,17 @@ class TransactionUpdate(BaseModel):
     member_id: Optional[str] = None
     bank_id: Optional[str] = None
 
+class TransactionFilter(BaseModel):
+    description: Optional[str] = None
+    uncategorized: bool = False
+    category_id: Optional[str] = None
+    type: Optional[str] = None
+    month: Optional[int] = None
+    year: Optional[int] = None
+
 class BulkCategorize(BaseModel):
-    transaction_ids: List[str]
+    transaction_ids: List[str] = []
+    filter: Optional[TransactionFilter] = None
     category_id: str
 
 class Goal(BaseModel):
@@ -238,6 +333,13 @@ class MonthlyComparison(BaseModel):
     income: float
     expenses: float
 
+class BreakdownItem(BaseModel):
+    id: Optional[str] = None
+    name: str
+    income: float
+    expenses: float
+    percentage: float
+
 class HealthScore(BaseModel):
     total_score: int
     reserve_score: int
@@ -249,10 +351,15 @@ class HealthScore(BaseModel):
 
 # ==================== AUTH HELPERS ====================
 
+def jwt_module():
+    """python-jose's jwt, imported on first use: it loads the cryptography backend, a large part of cold start"""
+    from jose import jwt
+    return jwt
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt_module().decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
@@ -260,9 +367,23 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+async def is_admin_request(headers: dict) -> bool:
+    """Whether raw request headers carry a valid admin token (for middleware, outside Depends)"""
+    authorization = headers.get("authorization", "")
+    if not authorization.startswith("Bearer "):
+        return False
+    try:
+        user_id = jwt_module().decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return False
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        return bool(row and row['is_admin'])
+
 def create_token(user_id: str) -> str:
     expires = datetime.now(timezone.utc) + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    return jwt.encode({"sub": user_id, "exp": expires}, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_module().encode({"sub": user_id, "exp": expires}, SECRET_KEY, algorithm=ALGORITHM)
 
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -274,14 +395,98 @@ def row_to_dict(row) -> dict:
     """Convert sqlite3 Row to dict"""
     return dict(row) if row else None
 
+# ==================== STREAMED LISTS ====================
+
+# Rows fetched from the cursor per chunk of a streamed JSON list
+LIST_CHUNK_ROWS = 500
+
+_table_columns: dict = {}
+
+async def table_columns(db, table: str) -> Dict[str, str]:
+    """Declared type of each column of a table, read once; every shard has the same schema"""
+    if table not in _table_columns:
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        _table_columns[table] = {r['name']: r['type'] for r in await cursor.fetchall()}
+    return _table_columns[table]
+
+def json_object_sql(columns: List[str], types: Dict[str, str]) -> str:
+    """SQL expression encoding a row as a JSON object inside SQLite.
+
+    SQLite renders REAL with 15 significant digits where json.dumps uses the
+    shortest repr, so a stored 0.1 + 0.2 would read 0.3 here and
+    0.30000000000000004 there. Every REAL column is a money amount, so they
+    are rounded to cents, which both render the same way.
+    """
+    values = (f"round({c}, 2)" if types.get(c) == 'REAL' else c for c in columns)
+    return "json_object(" + ", ".join(f"'{c}', {v}" for c, v in zip(columns, values)) + ")"
+
+async def iter_json_list(user_id: Optional[str], table: str, clauses: str, params, columns: List[str] = None):
+    """Yield a JSON array of rows in chunks: SQLite renders each row, Python only joins the text"""
+    async with get_db_context(user_id, pooled=False) as db:
+        types = await table_columns(db, table)
+        columns = columns or list(types)
+        cursor = await db.execute(f"SELECT {json_object_sql(columns, types)} FROM {table} {clauses}", params)
+        separator = '['
+        while True:
+            rows = await cursor.fetchmany(LIST_CHUNK_ROWS)
+            if not rows:
+                break
+            yield (separator + ','.join(r[0] for r in rows)).encode('utf-8')
+            separator = ','
+        yield b'[]' if separator == '[' else b']'
+
+async def stream_json_list(user_id: Optional[str], table: str, clauses: str = "", params=(),
+                           columns: List[str] = None) -> StreamingResponse:
+    """List endpoint response streamed from the cursor, without building row dicts or a full body"""
+    chunks = iter_json_list(user_id, table, clauses, params, columns)
+    # Run the query before answering, so SQL errors still become regular error responses
+    first = await chunks.__anext__()
+    
+    async def body():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+    
+    return StreamingResponse(body(), media_type="application/json")
+
 # ==================== HEALTH CHECK ====================
 
 @api_router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "finamily-api", "version": "2.0.0", "database": "sqlite"}
 
+@api_router.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus text format: request latency, DB time, sizes, status codes and in-flight requests"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # ==================== AUTH ENDPOINTS ====================
 
+DEFAULT_CATEGORIES = [
+    ("Reserva de Emergência", "especial", True),
+    ("Alimentação", "despesa", True),
+    ("Transporte", "despesa", True),
+    ("Saúde", "despesa", True),
+    ("Lazer", "despesa", True),
+    ("Educação", "despesa", True),
+    ("Moradia", "despesa", True),
+    ("Salário", "receita", True),
+    ("Freelance", "receita", True),
+]
+
+async def create_default_categories(db, user_id: str):
+    for name, cat_type, is_fixed in DEFAULT_CATEGORIES:
+        cat_id = str(uuid.uuid4())
+        await db.execute('''
+            INSERT INTO categories (id, user_id, name, type, is_fixed, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (cat_id, user_id, name, cat_type, int(is_fixed), datetime.now(timezone.utc).isoformat()))
+
 @api_router.post("/auth/register")
 async def register(user_data: UserCreate):
     async with get_db_context() as db:
@@ -308,33 +513,18 @@ async def register(user_data: UserCreate):
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (user.id, user.email, user.name, hash_password(user_data.password), 
               int(user.is_admin), int(user.is_approved), user.created_at.isoformat()))
-        
-        # Create default categories for first user
-        if is_first_user:
-            default_categories = [
-                ("Reserva de Emergência", "especial", True),
-                ("Alimentação", "despesa", True),
-                ("Transporte", "despesa", True),
-                ("Saúde", "despesa", True),
-                ("Lazer", "despesa", True),
-                ("Educação", "despesa", True),
-                ("Moradia", "despesa", True),
-                ("Salário", "receita", True),
-                ("Freelance", "receita", True),
-            ]
-            for name, cat_type, is_fixed in default_categories:
-                cat_id = str(uuid.uuid4())
-                await db.execute('''
-                    INSERT INTO categories (id, user_id, name, type, is_fixed, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (cat_id, user.id, name, cat_type, int(is_fixed), datetime.now(timezone.utc).isoformat()))
-        
         await db.commit()
-        
-        if not is_first_user:
-            raise HTTPException(status_code=202, detail="Conta criada! Aguarde aprovação do administrador.")
-        
-        return Token(access_token=create_token(user.id), token_type="bearer", user=user)
+    
+    # Create default categories for first user
+    if is_first_user:
+        async with get_db_context(user.id) as db:
+            await create_default_categories(db, user.id)
+            await db.commit()
+    
+    if not is_first_user:
+        raise HTTPException(status_code=202, detail="Conta criada! Aguarde aprovação do administrador.")
+    
+    return Token(access_token=create_token(user.id), token_type="bearer", user=user)
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
@@ -375,10 +565,8 @@ async def get_all_users(user_id: str = Depends(verify_token)):
         row = await cursor.fetchone()
         if not row or not row['is_admin']:
             raise HTTPException(status_code=403, detail="Admin access required")
-        
-        cursor = await db.execute("SELECT id, email, name, is_admin, is_approved, created_at FROM users")
-        rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+    
+    return await stream_json_list(None, "users", columns=["id", "email", "name", "is_admin", "is_approved", "created_at"])
 
 @api_router.post("/admin/approve/{target_user_id}")
 async def approve_user(target_user_id: str, user_id: str = Depends(verify_token)):
@@ -389,28 +577,13 @@ async def approve_user(target_user_id: str, user_id: str = Depends(verify_token)
             raise HTTPException(status_code=403, detail="Admin access required")
         
         await db.execute("UPDATE users SET is_approved = 1 WHERE id = ?", (target_user_id,))
-        
-        # Create default categories for approved user
+        await db.commit()
+    
+    # Create default categories for approved user
+    async with get_db_context(target_user_id) as db:
         cursor = await db.execute("SELECT id FROM categories WHERE user_id = ?", (target_user_id,))
         if not await cursor.fetchone():
-            default_categories = [
-                ("Reserva de Emergência", "especial", True),
-                ("Alimentação", "despesa", True),
-                ("Transporte", "despesa", True),
-                ("Saúde", "despesa", True),
-                ("Lazer", "despesa", True),
-                ("Educação", "despesa", True),
-                ("Moradia", "despesa", True),
-                ("Salário", "receita", True),
-                ("Freelance", "receita", True),
-            ]
-            for name, cat_type, is_fixed in default_categories:
-                cat_id = str(uuid.uuid4())
-                await db.execute('''
-                    INSERT INTO categories (id, user_id, name, type, is_fixed, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (cat_id, target_user_id, name, cat_type, int(is_fixed), datetime.now(timezone.utc).isoformat()))
-        
+            await create_default_categories(db, target_user_id)
         await db.commit()
         return {"message": "User approved successfully"}
 
@@ -422,9 +595,20 @@ async def reject_user(target_user_id: str, user_id: str = Depends(verify_token))
         if not row or not row['is_admin']:
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        await db.execute("DELETE FROM users WHERE id = ? AND is_approved = 0", (target_user_id,))
+        if not is_sharded():
+            # Children first, in the same transaction, or the foreign keys refuse the delete
+            for table in reversed(FINANCIAL_TABLES):
+                await db.execute(
+                    f"DELETE FROM {table} WHERE user_id IN (SELECT id FROM users WHERE id = ? AND is_approved = 0)",
+                    (target_user_id,)
+                )
+        cursor = await db.execute("DELETE FROM users WHERE id = ? AND is_approved = 0", (target_user_id,))
+        rejected = cursor.rowcount
         await db.commit()
-        return {"message": "User rejected"}
+    
+    if rejected and is_sharded():
+        await delete_shard(target_user_id)
+    return {"message": "User rejected"}
 
 @api_router.post("/admin/reset-password/{target_user_id}")
 async def admin_reset_password(target_user_id: str, user_id: str = Depends(verify_token)):
@@ -440,21 +624,185 @@ async def admin_reset_password(target_user_id: str, user_id: str = Depends(verif
         await db.commit()
         return {"message": f"Password reset to: {new_password}"}
 
+# Only one backup or restore runs at a time
+backup_lock = asyncio.Lock()
+
+@api_router.post("/admin/backup")
+async def create_backup(user_id: str = Depends(verify_token)):
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    async with backup_lock:
+        # The backup API sleeps between page batches in this worker thread
+        result = await asyncio.to_thread(backup.create_backup)
+    logger.info("💾 Backup created: %s", result['name'])
+    return result
+
+@api_router.get("/admin/backups")
+async def list_backups(user_id: str = Depends(verify_token)):
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return backup.list_backups()
+
+@api_router.post("/admin/backups/{name}/restore")
+async def restore_backup(name: str, user_id: str = Depends(verify_token)):
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    async with backup_lock:
+        try:
+            result = await asyncio.to_thread(backup.restore_backup, name)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Backup not found")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    # Snapshots may predate tables added since, e.g. data_versions; recreate what is missing
+    await init_db()
+    invalidate_all()
+    columnar.cache.clear()
+    logger.info("♻️ Backup restored: %s", name)
+    return result
+
+@api_router.get("/admin/query-stats")
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total_time"),
+    user_id: str = Depends(verify_token)
+):
+    """Top SQL statements since startup, with the query plan of their last slow run"""
+    if order_by not in metrics.STATEMENT_ORDERINGS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of: {', '.join(metrics.STATEMENT_ORDERINGS)}")
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return metrics.top_statements(limit, order_by)
+
+@api_router.get("/admin/profiles")
+async def list_profiles(user_id: str = Depends(verify_token)):
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return profiling.list_profiles()
+
+@api_router.get("/admin/profiles/{name}")
+async def download_profile(name: str, user_id: str = Depends(verify_token)):
+    """A stored profile: <id>.txt is the text report, <id>.prof the raw pstats file"""
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        path = profiling.profile_path(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if path.suffix == '.txt':
+        return FileResponse(path, media_type="text/plain; charset=utf-8")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+# ==================== DELETE PATHS ====================
+
+# What happens to the rows pointing at a deleted member, bank or category:
+# detach clears the reference (shown as "Sem membro", "Sem banco", "Sem categoria"),
+# reassign moves them to reassign_to, cascade deletes them
+DELETE_MODE_PATTERN = "^(detach|reassign|cascade)$"
+
+# Parent table -> (its column in transactions, rows the parent must be deletable by)
+REFERENCED_TABLES = {
+    'family_members': ('member_id', "1"),
+    'banks': ('bank_id', "1"),
+    # Fixed categories such as the emergency reserve are never deleted
+    'categories': ('category_id', "is_fixed = 0"),
+}
+
+async def delete_referenced(user_id: str, table: str, row_id: str, mode: str, reassign_to: Optional[str]) -> int:
+    """Delete a member, bank or category and apply `mode` to what references it, in one transaction.
+
+    Every step is a single set-based statement, looked up through the foreign
+    key indexes. Returns the number of transactions detached, moved or deleted.
+    """
+    field, deletable = REFERENCED_TABLES[table]
+    async with get_db_context(user_id) as db:
+        cursor = await db.execute(f"SELECT 1 FROM {table} WHERE id = ? AND user_id = ? AND {deletable}", (row_id, user_id))
+        if not await cursor.fetchone():
+            return 0
+        target = None
+        if mode == 'reassign':
+            cursor = await db.execute(f"SELECT 1 FROM {table} WHERE id = ? AND user_id = ?", (reassign_to, user_id))
+            if not reassign_to or reassign_to == row_id or not await cursor.fetchone():
+                raise HTTPException(status_code=400, detail="reassign_to deve ser outro registro existente")
+            target = reassign_to
+        
+        where, params = f"user_id = ? AND {field} = ?", (user_id, row_id)
+        # Category totals only move when transactions change category or disappear
+        deltas = []
+        if field == 'category_id' or mode == 'cascade':
+            moved = await category_totals(db, where, params)
+            deltas = [(c, day, -amount, t) for c, day, amount, t in moved]
+            if field == 'category_id' and mode != 'cascade':
+                deltas += [(target, day, amount, t) for _, day, amount, t in moved]
+        
+        if mode == 'cascade':
+            cursor = await db.execute(f"DELETE FROM transactions WHERE {where}", params)
+        else:
+            cursor = await db.execute(f"UPDATE transactions SET {field} = ? WHERE {where}", (target,) + params)
+        count = cursor.rowcount
+        if table == 'categories':
+            # Rules require a category; challenges without one track progress by hand.
+            # Challenges are detached rather than reassigned: their progress already
+            # counts the moved transactions, and the +amount deltas above are meant
+            # for the challenges the target category already had
+            if target:
+                await db.execute("UPDATE categorization_rules SET category_id = ? WHERE user_id = ? AND category_id = ?",
+                                 (target, user_id, row_id))
+            else:
+                await db.execute("DELETE FROM categorization_rules WHERE user_id = ? AND category_id = ?", (user_id, row_id))
+            if mode == 'cascade':
+                await db.execute("DELETE FROM challenges WHERE user_id = ? AND category_id = ?", (user_id, row_id))
+            else:
+                await db.execute("UPDATE challenges SET category_id = NULL WHERE user_id = ? AND category_id = ?",
+                                 (user_id, row_id))
+        await db.execute(f"DELETE FROM {table} WHERE id = ? AND user_id = ?", (row_id, user_id))
+        await db.commit()
+    
+    if count:
+        bus.emit(TRANSACTIONS_CHANGED, user_id, deltas)
+    return count
+
 # ==================== FAMILY MEMBERS ====================
 
 @api_router.get("/family")
 async def get_family_members(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute(
             "SELECT id, name, profile, created_at FROM family_members WHERE user_id = ?", 
             (user_id,)
         )
         rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+        return ListResponse([row_to_dict(r) for r in rows])
 
 @api_router.post("/family")
 async def create_family_member(member: FamilyMemberCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         member_obj = FamilyMember(**member.model_dump())
         await db.execute('''
             INSERT INTO family_members (id, user_id, name, profile, created_at)
@@ -466,7 +814,7 @@ async def create_family_member(member: FamilyMemberCreate, user_id: str = Depend
 
 @api_router.put("/family/{member_id}")
 async def update_family_member(member_id: str, member: FamilyMemberCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute(
             "UPDATE family_members SET name = ?, profile = ? WHERE id = ? AND user_id = ?",
             (member.name, member.profile, member_id, user_id)
@@ -480,27 +828,30 @@ async def update_family_member(member_id: str, member: FamilyMemberCreate, user_
         return row_to_dict(row)
 
 @api_router.delete("/family/{member_id}")
-async def delete_family_member(member_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        await db.execute("DELETE FROM family_members WHERE id = ? AND user_id = ?", (member_id, user_id))
-        await db.commit()
-        return {"message": "Member deleted"}
+async def delete_family_member(
+    member_id: str,
+    mode: str = Query("detach", pattern=DELETE_MODE_PATTERN),
+    reassign_to: Optional[str] = None,
+    user_id: str = Depends(verify_token)
+):
+    count = await delete_referenced(user_id, 'family_members', member_id, mode, reassign_to)
+    return {"message": "Member deleted", "transactions": count}
 
 # ==================== BANKS ====================
 
 @api_router.get("/banks")
 async def get_banks(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute(
             "SELECT id, name, active, created_at FROM banks WHERE user_id = ?", 
             (user_id,)
         )
         rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+        return ListResponse([row_to_dict(r) for r in rows])
 
 @api_router.post("/banks")
 async def create_bank(bank: BankCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         bank_obj = Bank(**bank.model_dump())
         await db.execute('''
             INSERT INTO banks (id, user_id, name, active, created_at)
@@ -512,7 +863,7 @@ async def create_bank(bank: BankCreate, user_id: str = Depends(verify_token)):
 
 @api_router.put("/banks/{bank_id}")
 async def update_bank(bank_id: str, bank: BankCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute(
             "UPDATE banks SET name = ?, active = ? WHERE id = ? AND user_id = ?",
             (bank.name, int(bank.active), bank_id, user_id)
@@ -523,27 +874,30 @@ async def update_bank(bank_id: str, bank: BankCreate, user_id: str = Depends(ver
         return row_to_dict(row)
 
 @api_router.delete("/banks/{bank_id}")
-async def delete_bank(bank_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        await db.execute("DELETE FROM banks WHERE id = ? AND user_id = ?", (bank_id, user_id))
-        await db.commit()
-        return {"message": "Bank deleted"}
+async def delete_bank(
+    bank_id: str,
+    mode: str = Query("detach", pattern=DELETE_MODE_PATTERN),
+    reassign_to: Optional[str] = None,
+    user_id: str = Depends(verify_token)
+):
+    count = await delete_referenced(user_id, 'banks', bank_id, mode, reassign_to)
+    return {"message": "Bank deleted", "transactions": count}
 
 # ==================== CATEGORIES ====================
 
 @api_router.get("/categories")
 async def get_categories(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute(
             "SELECT id, name, type, is_fixed, created_at FROM categories WHERE user_id = ?", 
             (user_id,)
         )
         rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+        return ListResponse([row_to_dict(r) for r in rows])
 
 @api_router.post("/categories")
 async def create_category(category: CategoryCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cat_obj = Category(**category.model_dump())
         await db.execute('''
             INSERT INTO categories (id, user_id, name, type, is_fixed, created_at)
@@ -554,7 +908,7 @@ async def create_category(category: CategoryCreate, user_id: str = Depends(verif
 
 @api_router.put("/categories/{category_id}")
 async def update_category(category_id: str, category: CategoryCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute(
             "UPDATE categories SET name = ?, type = ? WHERE id = ? AND user_id = ? AND is_fixed = 0",
             (category.name, category.type, category_id, user_id)
@@ -568,51 +922,306 @@ async def update_category(category_id: str, category: CategoryCreate, user_id: s
         return row_to_dict(row)
 
 @api_router.delete("/categories/{category_id}")
-async def delete_category(category_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        await db.execute(
-            "DELETE FROM categories WHERE id = ? AND user_id = ? AND is_fixed = 0", 
-            (category_id, user_id)
-        )
-        await db.commit()
-        return {"message": "Category deleted"}
+async def delete_category(
+    category_id: str,
+    mode: str = Query("detach", pattern=DELETE_MODE_PATTERN),
+    reassign_to: Optional[str] = None,
+    user_id: str = Depends(verify_token)
+):
+    count = await delete_referenced(user_id, 'categories', category_id, mode, reassign_to)
+    return {"message": "Category deleted", "transactions": count}
 
 # ==================== TRANSACTIONS ====================
 
+# Max ids bound into a single IN (...) list
+SQL_CHUNK_SIZE = 500
+
+def transaction_filter_sql(user_id: str, month: Optional[int] = None, year: Optional[int] = None,
+                           category_id: Optional[str] = None, trans_type: Optional[str] = None,
+                           description: Optional[str] = None, uncategorized: bool = False) -> tuple:
+    """WHERE clause and params selecting a user's transactions"""
+    where = ["user_id = ?"]
+    params = [user_id]
+    
+    if year:
+        # ISO dates sort lexically, so a month is the range [YYYY-MM, next month)
+        if month:
+            start, end = month_key(year, month), month_key(*shift_month(year, month, 1))
+        else:
+            start, end = f"{year:04d}", f"{year + 1:04d}"
+        where.append("date >= ? AND date < ?")
+        params.extend([start, end])
+    if category_id:
+        where.append("category_id = ?")
+        params.append(category_id)
+    if uncategorized:
+        where.append("category_id IS NULL")
+    if trans_type:
+        where.append("type = ?")
+        params.append(trans_type)
+    if description:
+        escaped = description.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        where.append("description LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    
+    return " AND ".join(where), params
+
+async def category_totals(db, where: str, params) -> List[tuple]:
+    """Per-category, per-day, per-type sums of the matching transactions"""
+    cursor = await db.execute(
+        f"SELECT category_id, substr(date, 1, 10) as day, type, SUM(amount) as amount FROM transactions "
+        f"WHERE {where} GROUP BY category_id, day, type",
+        params
+    )
+    return [(r['category_id'], r['day'], r['amount'], r['type']) for r in await cursor.fetchall()]
+
+def fts_query(q: str, user_id: str) -> Optional[str]:
+    """Turn free text into an FTS5 query over one user's descriptions: every word must match as a prefix"""
+    words = [w.replace('"', '') for w in q.split()]
+    words = [w for w in words if w]
+    if not words:
+        return None
+    terms = ' '.join(f'"{w}"*' for w in words)
+    # The user's own phrase is matched inside the index, so other households' rows are never read
+    user = user_id.replace('"', '""')
+    return f'user_id : "{user}" AND description : ({terms})'
+
+def transaction_list_sql(user_id: str, month: Optional[int], year: Optional[int],
+                         category_id: Optional[str], q: Optional[str]) -> tuple:
+    """Filters shared by the transaction list and export; month only applies together with a year"""
+    where, params = transaction_filter_sql(
+        user_id, month=month, year=year if month else None, category_id=category_id
+    )
+    match = fts_query(q, user_id) if q else None
+    if match:
+        where += " AND rowid IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)"
+        params.append(match)
+    return where, params
+
 @api_router.get("/transactions")
 async def get_transactions(
     month: Optional[int] = None, 
     year: Optional[int] = None,
     category_id: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     user_id: str = Depends(verify_token)
 ):
-    async with get_db_context() as db:
-        query = "SELECT * FROM transactions WHERE user_id = ?"
-        params = [user_id]
-        
-        if category_id:
-            query += " AND category_id = ?"
-            params.append(category_id)
-        
-        query += " ORDER BY date DESC"
-        
-        cursor = await db.execute(query, params)
-        rows = await cursor.fetchall()
-        transactions = [row_to_dict(r) for r in rows]
-        
-        # Filter by month/year in Python (SQLite date handling)
-        if month and year:
-            transactions = [
-                t for t in transactions 
-                if datetime.fromisoformat(t['date']).month == month 
-                and datetime.fromisoformat(t['date']).year == year
-            ]
+    where, params = transaction_list_sql(user_id, month, year, category_id, q)
+    clauses = f"WHERE {where} ORDER BY date DESC"
+    if limit:
+        clauses += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+    return await stream_json_list(user_id, "transactions", clauses, params)
+
+# Rows fetched from the cursor per streamed chunk
+EXPORT_CHUNK_ROWS = 1000
+
+# Rows per Parquet row group / Arrow record batch
+EXPORT_ROW_GROUP_ROWS = 50_000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+async def export_lookup(db, table: str, user_id: str) -> dict:
+    cursor = await db.execute(f"SELECT id, name FROM {table} WHERE user_id = ?", (user_id,))
+    return {r['id']: r['name'] for r in await cursor.fetchall()}
+
+async def iter_export_rows(where: str, params: list, user_id: str):
+    """Yield (row, names) batches straight from a cursor, oldest first"""
+    async with get_db_context(user_id, pooled=False) as db:
+        names = {
+            'category': await export_lookup(db, "categories", user_id),
+            'member': await export_lookup(db, "family_members", user_id),
+            'bank': await export_lookup(db, "banks", user_id),
+        }
+        cursor = await db.execute(f"SELECT * FROM transactions WHERE {where} ORDER BY date", params)
+        while True:
+            rows = await cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            yield rows, names
+
+async def export_csv(where: str, params: list, user_id: str):
+    """CSV in the import dialect: ';' separated, dd/mm/yyyy dates, signed '1234,56' amounts"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria', 'Membro', 'Banco'])
+    async for rows, names in iter_export_rows(where, params, user_id):
+        for r in rows:
+            date = r['date']
+            amount = -r['amount'] if r['type'] == 'despesa' else r['amount']
+            writer.writerow([
+                f"{date[8:10]}/{date[5:7]}/{date[:4]}",
+                r['description'],
+                f"{amount:.2f}".replace('.', ','),
+                r['type'],
+                names['category'].get(r['category_id'], ''),
+                names['member'].get(r['member_id'], ''),
+                names['bank'].get(r['bank_id'], ''),
+            ])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+async def export_ndjson(where: str, params: list, user_id: str):
+    async for rows, names in iter_export_rows(where, params, user_id):
+        lines = []
+        for r in rows:
+            lines.append(json.dumps({
+                "id": r['id'],
+                "date": r['date'],
+                "description": r['description'],
+                "amount": r['amount'],
+                "type": r['type'],
+                "category_id": r['category_id'],
+                "category": names['category'].get(r['category_id']),
+                "member_id": r['member_id'],
+                "member": names['member'].get(r['member_id']),
+                "bank_id": r['bank_id'],
+                "bank": names['bank'].get(r['bank_id']),
+                "is_reserve_deposit": bool(r['is_reserve_deposit']),
+                "is_reserve_withdrawal": bool(r['is_reserve_withdrawal']),
+            }, ensure_ascii=False))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+class ExportSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def arrow_dictionary(pa, lookup: dict) -> tuple:
+    """Shared dictionary values for a categorical column plus id -> index map"""
+    ids = list(lookup)
+    return pa.array([lookup[i] for i in ids], pa.string()), {i: n for n, i in enumerate(ids)}
+
+def build_arrow_batch(pa, pc, schema, rows, dictionaries):
+    """Typed record batch: date32 dates, integer cents and dictionary-encoded names"""
+    def categorical(column, key):
+        values, index = dictionaries[key]
+        indices = pa.array([index.get(r[column]) for r in rows], pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, values)
+    
+    amounts = pa.array([r['amount'] for r in rows], pa.float64())
+    return pa.record_batch([
+        pa.array([r['id'] for r in rows], pa.string()),
+        pc.cast(pa.array([r['date'][:10] for r in rows], pa.string()), pa.date32()),
+        pa.array([r['description'] for r in rows], pa.string()),
+        pc.cast(pc.round(pc.multiply(amounts, 100)), pa.int64()),
+        categorical('type', 'type'),
+        categorical('category_id', 'category'),
+        categorical('member_id', 'member'),
+        categorical('bank_id', 'bank'),
+        pa.array([bool(r['is_reserve_deposit']) for r in rows], pa.bool_()),
+        pa.array([bool(r['is_reserve_withdrawal']) for r in rows], pa.bool_()),
+    ], schema=schema)
+
+async def export_columnar(where: str, params: list, user_id: str, export_format: str):
+    """Parquet or Arrow IPC file, written one row group at a time and streamed as it grows"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("description", pa.string()),
+        ("amount_cents", pa.int64()),
+        ("type", categorical),
+        ("category", categorical),
+        ("member", categorical),
+        ("bank", categorical),
+        ("is_reserve_deposit", pa.bool_()),
+        ("is_reserve_withdrawal", pa.bool_()),
+    ])
+    sink = ExportSink()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    
+    async with get_db_context(user_id, pooled=False) as db:
+        cursor = await db.execute(f"SELECT DISTINCT type FROM transactions WHERE {where}", params)
+        types = {r['type']: r['type'] for r in await cursor.fetchall()}
+        dictionaries = {
+            'type': arrow_dictionary(pa, types),
+            'category': arrow_dictionary(pa, await export_lookup(db, "categories", user_id)),
+            'member': arrow_dictionary(pa, await export_lookup(db, "family_members", user_id)),
+            'bank': arrow_dictionary(pa, await export_lookup(db, "banks", user_id)),
+        }
         
-        return transactions
+        cursor = await db.execute(f"SELECT * FROM transactions WHERE {where} ORDER BY date", params)
+        while True:
+            rows = await cursor.fetchmany(EXPORT_ROW_GROUP_ROWS)
+            if not rows:
+                break
+            # Encoding and compression are CPU-bound: keep them off the event loop
+            await asyncio.to_thread(
+                lambda: writer.write_batch(build_arrow_batch(pa, pc, schema, rows, dictionaries))
+            )
+            yield sink.drain()
+    
+    writer.close()
+    yield sink.drain()
+
+@api_router.get("/transactions/export")
+async def export_transactions(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet|arrow)$"),
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    category_id: Optional[str] = None,
+    q: Optional[str] = None,
+    user_id: str = Depends(verify_token)
+):
+    """Stream the user's transactions in fixed-size chunks; nothing is held as a full list"""
+    where, params = transaction_list_sql(user_id, month, year, category_id, q)
+    if export_format in ("parquet", "arrow"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportação parquet/arrow requer o pacote pyarrow")
+        content = export_columnar(where, params, user_id, export_format)
+    else:
+        exporters = {"csv": export_csv, "ndjson": export_ndjson}
+        content = exporters[export_format](where, params, user_id)
+    
+    filename = f"finamily-transacoes-{datetime.now(timezone.utc):%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @api_router.post("/transactions")
 async def create_transaction(transaction: TransactionCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         trans_obj = Transaction(**transaction.model_dump())
         await db.execute('''
             INSERT INTO transactions (id, user_id, date, description, amount, type, 
@@ -623,11 +1232,20 @@ async def create_transaction(transaction: TransactionCreate, user_id: str = Depe
               trans_obj.bank_id, int(trans_obj.is_reserve_deposit), 
               int(trans_obj.is_reserve_withdrawal), trans_obj.created_at.isoformat()))
         await db.commit()
+        bus.emit(TRANSACTIONS_CHANGED, user_id, [
+            (trans_obj.category_id, trans_obj.date.isoformat(), trans_obj.amount, trans_obj.type)
+        ])
         return trans_obj
 
 @api_router.put("/transactions/{transaction_id}")
 async def update_transaction(transaction_id: str, transaction: TransactionUpdate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
+        cursor = await db.execute(
+            "SELECT category_id, date, amount, type FROM transactions WHERE id = ? AND user_id = ?",
+            (transaction_id, user_id)
+        )
+        previous = await cursor.fetchone()
+        
         updates = []
         params = []
         
@@ -647,37 +1265,95 @@ async def update_transaction(transaction_id: str, transaction: TransactionUpdate
         
         cursor = await db.execute("SELECT * FROM transactions WHERE id = ?", (transaction_id,))
         row = await cursor.fetchone()
+        if updates and previous:
+            bus.emit(TRANSACTIONS_CHANGED, user_id, [
+                (previous['category_id'], previous['date'], -previous['amount'], previous['type']),
+                (row['category_id'], row['date'], row['amount'], row['type']),
+            ])
         return row_to_dict(row)
 
-@api_router.delete("/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        await db.execute("DELETE FROM transactions WHERE id = ? AND user_id = ?", (transaction_id, user_id))
-        await db.commit()
-        return {"message": "Transaction deleted"}
-
 @api_router.post("/transactions/bulk-categorize")
 async def bulk_categorize(data: BulkCategorize, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        for trans_id in data.transaction_ids:
-            await db.execute(
-                "UPDATE transactions SET category_id = ? WHERE id = ? AND user_id = ?",
-                (data.category_id, trans_id, user_id)
+    """Move the selected transactions to a category.
+
+    Transactions are selected by id, by filter, or both (ids narrowed by
+    the filter); ids are bound in chunks so each chunk is one UPDATE.
+    """
+    f = data.filter or TransactionFilter()
+    # An empty filter would select every transaction of the user
+    if not data.transaction_ids and not f.model_dump(exclude_defaults=True):
+        raise HTTPException(status_code=400, detail="Informe transaction_ids ou filter")
+    # transaction_filter_sql ignores a month without its year
+    if f.month and not f.year:
+        raise HTTPException(status_code=400, detail="Informe o ano junto com o mês")
+    
+    where, params = transaction_filter_sql(
+        user_id, month=f.month, year=f.year, category_id=f.category_id, trans_type=f.type,
+        description=f.description, uncategorized=f.uncategorized
+    )
+    # Rows already in the target category are not counted as updated
+    where += " AND (category_id IS NULL OR category_id != ?)"
+    params.append(data.category_id)
+    
+    if data.transaction_ids:
+        chunks = [data.transaction_ids[i:i + SQL_CHUNK_SIZE]
+                  for i in range(0, len(data.transaction_ids), SQL_CHUNK_SIZE)]
+    else:
+        chunks = [[]]
+    
+    async with get_db_context(user_id) as db:
+        updated = 0
+        deltas = []
+        for chunk in chunks:
+            chunk_where, chunk_params = where, list(params)
+            if chunk:
+                chunk_where += f" AND id IN ({', '.join('?' * len(chunk))})"
+                chunk_params.extend(chunk)
+            
+            for category_id, day, amount, trans_type in await category_totals(db, chunk_where, chunk_params):
+                deltas.append((category_id, day, -amount, trans_type))
+                deltas.append((data.category_id, day, amount, trans_type))
+            
+            cursor = await db.execute(
+                f"UPDATE transactions SET category_id = ? WHERE {chunk_where}",
+                [data.category_id, *chunk_params]
             )
+            updated += cursor.rowcount
         await db.commit()
-        return {"message": f"Updated {len(data.transaction_ids)} transactions"}
+        
+        if updated:
+            bus.emit(TRANSACTIONS_CHANGED, user_id, deltas)
+        return {"message": f"Updated {updated} transactions", "count": updated}
 
 @api_router.delete("/transactions/delete-all")
 async def delete_all_transactions(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute("SELECT COUNT(*) as count FROM transactions WHERE user_id = ?", (user_id,))
         row = await cursor.fetchone()
         count = row['count']
         
+        deltas = [(c, day, -amount, t) for c, day, amount, t in await category_totals(db, "user_id = ?", (user_id,))]
         await db.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
         await db.commit()
+        bus.emit(TRANSACTIONS_CHANGED, user_id, deltas)
         return {"message": f"Todas as {count} transações foram excluídas", "count": count}
 
+@api_router.delete("/transactions/{transaction_id}")
+async def delete_transaction(transaction_id: str, user_id: str = Depends(verify_token)):
+    async with get_db_context(user_id) as db:
+        cursor = await db.execute(
+            "SELECT category_id, date, amount, type FROM transactions WHERE id = ? AND user_id = ?",
+            (transaction_id, user_id)
+        )
+        previous = await cursor.fetchone()
+        await db.execute("DELETE FROM transactions WHERE id = ? AND user_id = ?", (transaction_id, user_id))
+        await db.commit()
+        if previous:
+            bus.emit(TRANSACTIONS_CHANGED, user_id, [
+                (previous['category_id'], previous['date'], -previous['amount'], previous['type'])
+            ])
+        return {"message": "Transaction deleted"}
+
 # ==================== IMPORT ====================
 
 async def apply_categorization_rules(description: str, user_id: str, db) -> Optional[str]:
@@ -710,7 +1386,7 @@ async def import_transactions(
     bank_id: str = Form(...),
     user_id: str = Depends(verify_token)
 ):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         content = await file.read()
         filename = file.filename.lower()
         
@@ -802,6 +1478,10 @@ async def import_transactions(
                   trans['bank_id'], trans['unique_hash'], trans['created_at']))
         
         await db.commit()
+        if transactions:
+            bus.emit(TRANSACTIONS_CHANGED, user_id, [
+                (t['category_id'], t['date'], t['amount'], t['type']) for t in transactions
+            ])
         
         message = f"Importadas {len(transactions)} transações"
         if duplicates_count > 0:
@@ -818,42 +1498,36 @@ async def import_transactions(
 
 # ==================== DASHBOARD ====================
 
+def monthly_series_source():
+    """How a monthly series missing from the aggregates cache is computed"""
+    return columnar.get_monthly_series if columnar.enabled() else get_monthly_series
+
 @api_router.get("/dashboard/summary")
 async def get_dashboard_summary(month: int, year: int, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        cursor = await db.execute("SELECT * FROM transactions WHERE user_id = ?", (user_id,))
-        all_transactions = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        # Parse dates and filter
-        for t in all_transactions:
-            t['date_obj'] = datetime.fromisoformat(t['date'])
-        
-        # Previous balance (all transactions before this month)
-        previous_trans = [t for t in all_transactions 
-                        if (t['date_obj'].year < year) or 
-                           (t['date_obj'].year == year and t['date_obj'].month < month)]
-        previous_income = sum(t['amount'] for t in previous_trans if t['type'] == 'receita')
-        previous_expenses = sum(t['amount'] for t in previous_trans if t['type'] == 'despesa')
-        previous_balance = previous_income - previous_expenses
-        
-        # Current month
-        current_trans = [t for t in all_transactions 
-                        if t['date_obj'].year == year and t['date_obj'].month == month]
-        month_income = sum(t['amount'] for t in current_trans if t['type'] == 'receita')
-        month_expenses = sum(t['amount'] for t in current_trans if t['type'] == 'despesa')
-        
-        final_balance = previous_balance + month_income - month_expenses
-        
-        return DashboardSummary(
-            previous_balance=previous_balance,
-            month_income=month_income,
-            month_expenses=month_expenses,
-            final_balance=final_balance
-        )
+    current = month_index(year, month)
+    async with get_db_context(user_id) as db:
+        # Everything up to the end of the month: earlier months make the previous balance
+        if columnar.enabled():
+            columns = await columnar.cache.get(db, user_id)
+            totals = columns.monthly_totals(columns.month <= current)
+        else:
+            totals = monthly_totals(await load_transaction_records(
+                db, "user_id = ? AND date < ?", (user_id, month_key(*shift_month(year, month, 1)))
+            ))
+    
+    previous_balance = sum(income - expenses for m, (income, expenses) in totals.items() if m < current)
+    month_income, month_expenses = totals.get(current, (0, 0))
+    
+    return DashboardSummary(
+        previous_balance=previous_balance / 100,
+        month_income=month_income / 100,
+        month_expenses=month_expenses / 100,
+        final_balance=(previous_balance + month_income - month_expenses) / 100
+    )
 
 @api_router.get("/dashboard/emergency-reserve")
 async def get_emergency_reserve(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         # Get emergency reserve category
         cursor = await db.execute(
             "SELECT id FROM categories WHERE user_id = ? AND name = 'Reserva de Emergência'",
@@ -901,76 +1575,123 @@ async def get_emergency_reserve(user_id: str = Depends(verify_token)):
 
 @api_router.get("/dashboard/category-chart")
 async def get_category_chart(month: int, year: int, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        cursor = await db.execute("SELECT * FROM transactions WHERE user_id = ? AND type = 'despesa'", (user_id,))
-        transactions = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        # Filter by month/year
-        transactions = [
-            t for t in transactions 
-            if datetime.fromisoformat(t['date']).month == month 
-            and datetime.fromisoformat(t['date']).year == year
-        ]
+    async with get_db_context(user_id) as db:
+        if columnar.enabled():
+            columns = await columnar.cache.get(db, user_id)
+            by_category = columns.totals_by(
+                'category_id', (columns.month == month_index(year, month)) & columns.of_type('despesa'))
+        else:
+            where, params = transaction_filter_sql(user_id, month=month, year=year, trans_type='despesa')
+            by_category = totals_by(await load_transaction_records(db, where, params), 'category_id')
         
         # Get categories
         cursor = await db.execute("SELECT id, name FROM categories WHERE user_id = ?", (user_id,))
         categories = {r['id']: r['name'] for r in await cursor.fetchall()}
-        
-        # Aggregate by category
-        category_totals = {}
-        for t in transactions:
-            cat_name = categories.get(t['category_id'], 'Sem categoria')
-            category_totals[cat_name] = category_totals.get(cat_name, 0) + t['amount']
-        
-        total = sum(category_totals.values())
-        
-        result = [
-            CategoryChart(
-                category=cat, 
-                amount=amount, 
-                percentage=round((amount/total*100) if total > 0 else 0, 2)
-            )
-            for cat, amount in category_totals.items()
-        ]
-        
-        return sorted(result, key=lambda x: x.amount, reverse=True)
+    
+    # Aggregate by category name, in cents
+    category_totals = {}
+    for category_id, cents in by_category.items():
+        cat_name = categories.get(category_id, 'Sem categoria')
+        category_totals[cat_name] = category_totals.get(cat_name, 0) + cents
+    
+    total = sum(category_totals.values())
+    
+    result = [
+        CategoryChart(
+            category=cat, 
+            amount=cents / 100, 
+            percentage=round((cents/total*100) if total > 0 else 0, 2)
+        )
+        for cat, cents in category_totals.items()
+    ]
+    
+    return sorted(result, key=lambda x: x.amount, reverse=True)
 
 @api_router.get("/dashboard/monthly-comparison")
 async def get_monthly_comparison(year: int, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        cursor = await db.execute("SELECT * FROM transactions WHERE user_id = ?", (user_id,))
-        transactions = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        # Parse dates
-        for t in transactions:
-            t['date_obj'] = datetime.fromisoformat(t['date'])
-        
-        # Filter by year
-        year_trans = [t for t in transactions if t['date_obj'].year == year]
-        
-        month_names = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-        result = []
-        
-        for month_num in range(1, 13):
-            month_trans = [t for t in year_trans if t['date_obj'].month == month_num]
-            income = sum(t['amount'] for t in month_trans if t['type'] == 'receita')
-            expenses = sum(t['amount'] for t in month_trans if t['type'] == 'despesa')
-            result.append(MonthlyComparison(month=month_names[month_num-1], income=income, expenses=expenses))
+    async with get_db_context(user_id) as db:
+        if columnar.enabled():
+            columns = await columnar.cache.get(db, user_id)
+            totals = columns.monthly_totals(columns.between(month_index(year, 1), month_index(year, 12)))
+        else:
+            where, params = transaction_filter_sql(user_id, year=year)
+            totals = monthly_totals(await load_transaction_records(db, where, params))
+    
+    month_names = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    result = []
+    
+    for month_num in range(1, 13):
+        income, expenses = totals.get(month_index(year, month_num), (0, 0))
+        result.append(MonthlyComparison(month=month_names[month_num-1], income=income / 100, expenses=expenses / 100))
+    
+    return result
+
+# Label of transactions without a member or bank
+BREAKDOWN_UNASSIGNED = {'member_id': 'Sem membro', 'bank_id': 'Sem banco'}
+
+async def dashboard_breakdown(user_id: str, field: str, start_date: Optional[date],
+                              end_date: Optional[date]) -> List[BreakdownItem]:
+    """Income and expenses per member_id or bank_id over an optional date range, biggest spender first"""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date deve ser anterior a end_date")
+    
+    async with get_db_context(user_id) as db:
+        version = await data_version(db, user_id)
+        cache_key = ('breakdown', field, start_date, end_date)
+        totals = cache_get(user_id, cache_key, version)
+        if totals is None:
+            if columnar.enabled():
+                columns = await columnar.cache.get(db, user_id)
+                totals = columns.income_and_expenses_by(field, columns.dated(start_date, end_date))
+            else:
+                totals = await get_breakdown(db, user_id, field, start_date, end_date)
+            cache_set(user_id, cache_key, totals, version)
         
-        return result
+        # Names are read every time: renaming a member or bank does not change the data version
+        cursor = await db.execute(f"SELECT id, name FROM {BREAKDOWN_FIELDS[field]} WHERE user_id = ?", (user_id,))
+        names = {r['id']: r['name'] for r in await cursor.fetchall()}
+    
+    total_expenses = sum(expenses for _, expenses in totals.values())
+    result = [
+        BreakdownItem(
+            id=key,
+            name=names.get(key, BREAKDOWN_UNASSIGNED[field]),
+            income=income / 100,
+            expenses=expenses / 100,
+            percentage=round((expenses / total_expenses * 100) if total_expenses > 0 else 0, 2)
+        )
+        for key, (income, expenses) in totals.items()
+    ]
+    return sorted(result, key=lambda x: (x.expenses, x.income), reverse=True)
+
+@api_router.get("/dashboard/by-member", response_model=List[BreakdownItem])
+async def get_breakdown_by_member(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user_id: str = Depends(verify_token)
+):
+    return await dashboard_breakdown(user_id, 'member_id', start_date, end_date)
+
+@api_router.get("/dashboard/by-bank", response_model=List[BreakdownItem])
+async def get_breakdown_by_bank(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user_id: str = Depends(verify_token)
+):
+    return await dashboard_breakdown(user_id, 'bank_id', start_date, end_date)
 
 # ==================== GOALS ====================
 
 @api_router.get("/goals")
 async def get_goals(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute("SELECT * FROM goals WHERE user_id = ?", (user_id,))
         rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+        return ListResponse([row_to_dict(r) for r in rows])
 
 @api_router.post("/goals")
 async def create_goal(goal: GoalCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         goal_obj = Goal(**goal.model_dump())
         await db.execute('''
             INSERT INTO goals (id, user_id, name, description, target_amount, current_amount, 
@@ -980,11 +1701,12 @@ async def create_goal(goal: GoalCreate, user_id: str = Depends(verify_token)):
               goal_obj.current_amount, goal_obj.deadline.isoformat() if goal_obj.deadline else None,
               goal_obj.image_url, goal_obj.monthly_contribution, goal_obj.created_at.isoformat()))
         await db.commit()
+        bus.emit(GOALS_CHANGED, user_id)
         return goal_obj
 
 @api_router.put("/goals/{goal_id}")
 async def update_goal(goal_id: str, goal: GoalCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute('''
             UPDATE goals SET name = ?, description = ?, target_amount = ?, 
                 deadline = ?, image_url = ?, monthly_contribution = ?
@@ -993,25 +1715,28 @@ async def update_goal(goal_id: str, goal: GoalCreate, user_id: str = Depends(ver
               goal.deadline.isoformat() if goal.deadline else None,
               goal.image_url, goal.monthly_contribution, goal_id, user_id))
         await db.commit()
+        bus.emit(GOALS_CHANGED, user_id)
         cursor = await db.execute("SELECT * FROM goals WHERE id = ?", (goal_id,))
         row = await cursor.fetchone()
         return row_to_dict(row)
 
 @api_router.delete("/goals/{goal_id}")
 async def delete_goal(goal_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute("DELETE FROM goals WHERE id = ? AND user_id = ?", (goal_id, user_id))
         await db.commit()
+        bus.emit(GOALS_CHANGED, user_id)
         return {"message": "Goal deleted"}
 
 @api_router.post("/goals/{goal_id}/contribute")
 async def contribute_to_goal(goal_id: str, contribution: GoalContribution, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute(
             "UPDATE goals SET current_amount = current_amount + ? WHERE id = ? AND user_id = ?",
             (contribution.amount, goal_id, user_id)
         )
         await db.commit()
+        bus.emit(GOALS_CHANGED, user_id)
         cursor = await db.execute("SELECT * FROM goals WHERE id = ?", (goal_id,))
         row = await cursor.fetchone()
         return row_to_dict(row)
@@ -1020,17 +1745,11 @@ async def contribute_to_goal(goal_id: str, contribution: GoalContribution, user_
 
 @api_router.get("/categorization-rules")
 async def get_categorization_rules(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        cursor = await db.execute(
-            "SELECT * FROM categorization_rules WHERE user_id = ? ORDER BY priority DESC",
-            (user_id,)
-        )
-        rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+    return await stream_json_list(user_id, "categorization_rules", "WHERE user_id = ? ORDER BY priority DESC", (user_id,))
 
 @api_router.post("/categorization-rules")
 async def create_categorization_rule(rule: CategorizationRuleCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         rule_id = str(uuid.uuid4())
         await db.execute('''
             INSERT INTO categorization_rules (id, user_id, keyword, category_id, match_type, is_active, priority, created_at)
@@ -1042,7 +1761,7 @@ async def create_categorization_rule(rule: CategorizationRuleCreate, user_id: st
 
 @api_router.put("/categorization-rules/{rule_id}")
 async def update_categorization_rule(rule_id: str, rule: CategorizationRuleCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute('''
             UPDATE categorization_rules SET keyword = ?, category_id = ?, match_type = ?, 
                 is_active = ?, priority = ?
@@ -1056,7 +1775,7 @@ async def update_categorization_rule(rule_id: str, rule: CategorizationRuleCreat
 
 @api_router.delete("/categorization-rules/{rule_id}")
 async def delete_categorization_rule(rule_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute("DELETE FROM categorization_rules WHERE id = ? AND user_id = ?", (rule_id, user_id))
         await db.commit()
         return {"message": "Rule deleted"}
@@ -1118,6 +1837,16 @@ async def change_password(data: PasswordChange, user_id: str = Depends(verify_to
 
 # ==================== GAMIFICATION ====================
 
+# Months looked back by the health score consistency component
+HEALTH_SCORE_WINDOW_MONTHS = int(os.environ.get('HEALTH_SCORE_WINDOW_MONTHS', '3'))
+
+# Goal count and summed progress (each goal capped at 100%)
+GOALS_PROGRESS_SQL = '''
+    SELECT user_id, COUNT(*) as count,
+        SUM(MIN(CASE WHEN target_amount > 0 THEN current_amount / target_amount ELSE 1.0 END, 1.0)) as progress
+    FROM goals
+'''
+
 BADGE_DEFINITIONS = [
     {"name": "Mês sem Juros", "description": "Completou um mês sem pagar juros", "icon": "🎉", "criteria": "no_interest_month"},
     {"name": "Poupador Iniciante", "description": "Fez o primeiro depósito na reserva de emergência", "icon": "🌱", "criteria": "first_reserve_deposit"},
@@ -1131,7 +1860,7 @@ BADGE_DEFINITIONS = [
 
 @api_router.get("/gamification/badges")
 async def get_user_badges(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute("SELECT criteria, unlocked_at FROM badges WHERE user_id = ?", (user_id,))
         unlocked = {r['criteria']: r['unlocked_at'] for r in await cursor.fetchall()}
         
@@ -1144,178 +1873,404 @@ async def get_user_badges(user_id: str = Depends(verify_token)):
             for badge in BADGE_DEFINITIONS
         ]
 
+BADGES_BY_CRITERIA = {badge['criteria']: badge for badge in BADGE_DEFINITIONS}
+
+class BadgeContext:
+    """Lazily loaded aggregates shared by the badge evaluators of one check"""
+
+    def __init__(self, db, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        now = datetime.now(timezone.utc)
+        self.current_month = month_key(now.year, now.month)
+        self.previous_month = month_key(*shift_month(now.year, now.month, -1))
+        self._reserve_loaded = False
+        self._reserve_category_id = None
+        self._series = None
+
+    async def reserve_category_id(self) -> Optional[str]:
+        if not self._reserve_loaded:
+            self._reserve_category_id = await get_reserve_category_id(self.db, self.user_id)
+            self._reserve_loaded = True
+        return self._reserve_category_id
+
+    async def series(self) -> dict:
+        if self._series is None:
+            self._series = await get_cached_monthly_series(
+                self.db, self.user_id, await self.reserve_category_id(), compute=monthly_series_source())
+        return self._series
+
+    async def month(self, key: str) -> Optional[dict]:
+        return (await self.series()).get(key)
+
+async def _badge_no_interest_month(ctx: BadgeContext) -> bool:
+    month = await ctx.month(ctx.previous_month)
+    return bool(month and month['count'] > 0 and month['interest_charges'] == 0)
+
+async def _badge_first_reserve_deposit(ctx: BadgeContext) -> bool:
+    if not await ctx.reserve_category_id():
+        return False
+    return any(m['reserve_deposits'] > 0 for m in (await ctx.series()).values())
+
+async def _badge_goal_completed(ctx: BadgeContext) -> bool:
+    cursor = await ctx.db.execute(
+        "SELECT 1 FROM goals WHERE user_id = ? AND current_amount >= target_amount LIMIT 1",
+        (ctx.user_id,)
+    )
+    return await cursor.fetchone() is not None
+
+async def _badge_consecutive_savings(ctx: BadgeContext) -> bool:
+    if not await ctx.reserve_category_id():
+        return False
+    streak, last_index = 0, None
+    for key, month in (await ctx.series()).items():
+        if month['reserve_deposits'] == 0:
+            continue
+        year, month_num = int(key[:4]), int(key[5:7])
+        index = year * 12 + month_num
+        streak = streak + 1 if last_index == index - 1 else 1
+        last_index = index
+        if streak >= 3:
+            return True
+    return False
+
+async def _badge_all_members_contributed(ctx: BadgeContext) -> bool:
+    month = await ctx.month(ctx.current_month)
+    if not month:
+        return False
+    cursor = await ctx.db.execute("SELECT COUNT(*) as count FROM family_members WHERE user_id = ?", (ctx.user_id,))
+    members = (await cursor.fetchone())['count']
+    return members > 0 and month['contributing_members'] >= members
+
+async def _badge_high_savings_rate(ctx: BadgeContext) -> bool:
+    month = await ctx.month(ctx.current_month)
+    if not month or month['income'] <= 0:
+        return False
+    return (month['income'] - month['expenses']) / month['income'] >= 0.3
+
+async def _badge_all_categorized(ctx: BadgeContext) -> bool:
+    month = await ctx.month(ctx.current_month)
+    return bool(month and month['count'] > 0 and month['uncategorized'] == 0)
+
+async def _badge_solid_reserve(ctx: BadgeContext) -> bool:
+    if not await ctx.reserve_category_id():
+        return False
+    series = await ctx.series()
+    avg_expenses = average_monthly_expenses(series)
+    return avg_expenses > 0 and reserve_balance(series) >= 6 * avg_expenses
+
+BADGE_EVALUATORS = {
+    "no_interest_month": _badge_no_interest_month,
+    "first_reserve_deposit": _badge_first_reserve_deposit,
+    "goal_completed": _badge_goal_completed,
+    "consecutive_savings": _badge_consecutive_savings,
+    "all_members_contributed": _badge_all_members_contributed,
+    "high_savings_rate": _badge_high_savings_rate,
+    "all_categorized": _badge_all_categorized,
+    "solid_reserve": _badge_solid_reserve,
+}
+
+async def evaluate_badges(db, user_id: str) -> List[dict]:
+    """Evaluate every still-locked badge from aggregates and unlock the ones earned"""
+    cursor = await db.execute("SELECT criteria FROM badges WHERE user_id = ?", (user_id,))
+    already_unlocked = {r['criteria'] for r in await cursor.fetchall()}
+    pending = [c for c in BADGE_EVALUATORS if c not in already_unlocked]
+    if not pending:
+        return []
+    
+    ctx = BadgeContext(db, user_id)
+    unlocked_at = datetime.now(timezone.utc).isoformat()
+    unlocked = []
+    for criteria in pending:
+        if not await BADGE_EVALUATORS[criteria](ctx):
+            continue
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO badges (id, user_id, criteria, unlocked_at) VALUES (?, ?, ?, ?)",
+            (str(uuid.uuid4()), user_id, criteria, unlocked_at)
+        )
+        if cursor.rowcount:
+            badge = BADGES_BY_CRITERIA[criteria]
+            unlocked.append({"name": badge['name'], "icon": badge['icon']})
+    
+    await db.commit()
+    return unlocked
+
 @api_router.post("/gamification/check-badges")
 async def check_and_unlock_badges(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        unlocked = []
-        
-        # Get user data
-        cursor = await db.execute("SELECT * FROM transactions WHERE user_id = ?", (user_id,))
-        transactions = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        cursor = await db.execute("SELECT * FROM goals WHERE user_id = ?", (user_id,))
-        goals = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        cursor = await db.execute("SELECT id FROM categories WHERE user_id = ? AND name = 'Reserva de Emergência'", (user_id,))
-        reserve_cat = await cursor.fetchone()
-        reserve_category_id = reserve_cat['id'] if reserve_cat else None
-        
-        # Parse dates
-        for t in transactions:
-            t['date_obj'] = datetime.fromisoformat(t['date'])
-        
-        current_month = datetime.now(timezone.utc).month
-        current_year = datetime.now(timezone.utc).year
-        
-        # Check: First reserve deposit
-        if reserve_category_id:
-            reserve_trans = [t for t in transactions if t.get('category_id') == reserve_category_id or t.get('is_reserve_deposit')]
-            if reserve_trans:
-                cursor = await db.execute("SELECT id FROM badges WHERE user_id = ? AND criteria = 'first_reserve_deposit'", (user_id,))
-                if not await cursor.fetchone():
-                    badge_id = str(uuid.uuid4())
-                    await db.execute("INSERT INTO badges (id, user_id, criteria, unlocked_at) VALUES (?, ?, ?, ?)",
-                                    (badge_id, user_id, 'first_reserve_deposit', datetime.now(timezone.utc).isoformat()))
-                    unlocked.append({"name": "Poupador Iniciante", "icon": "🌱"})
-        
-        # Check: Goal completed
-        completed_goals = [g for g in goals if g.get('current_amount', 0) >= g.get('target_amount', float('inf'))]
-        if completed_goals:
-            cursor = await db.execute("SELECT id FROM badges WHERE user_id = ? AND criteria = 'goal_completed'", (user_id,))
-            if not await cursor.fetchone():
-                badge_id = str(uuid.uuid4())
-                await db.execute("INSERT INTO badges (id, user_id, criteria, unlocked_at) VALUES (?, ?, ?, ?)",
-                                (badge_id, user_id, 'goal_completed', datetime.now(timezone.utc).isoformat()))
-                unlocked.append({"name": "Meta de Reserva Batida", "icon": "🏆"})
-        
-        # Check: High savings rate (>30%)
-        current_trans = [t for t in transactions if t['date_obj'].month == current_month and t['date_obj'].year == current_year]
-        income = sum(t['amount'] for t in current_trans if t['type'] == 'receita')
-        expenses = sum(t['amount'] for t in current_trans if t['type'] == 'despesa')
-        
-        if income > 0 and ((income - expenses) / income) >= 0.3:
-            cursor = await db.execute("SELECT id FROM badges WHERE user_id = ? AND criteria = 'high_savings_rate'", (user_id,))
-            if not await cursor.fetchone():
-                badge_id = str(uuid.uuid4())
-                await db.execute("INSERT INTO badges (id, user_id, criteria, unlocked_at) VALUES (?, ?, ?, ?)",
-                                (badge_id, user_id, 'high_savings_rate', datetime.now(timezone.utc).isoformat()))
-                unlocked.append({"name": "Economizador Master", "icon": "💎"})
-        
-        await db.commit()
+    async with get_db_context(user_id) as db:
+        unlocked = await evaluate_badges(db, user_id)
         return {"unlocked": unlocked, "count": len(unlocked)}
 
-@api_router.get("/gamification/health-score", response_model=HealthScore)
-async def get_health_score(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
-        cursor = await db.execute("SELECT * FROM transactions WHERE user_id = ?", (user_id,))
-        transactions = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        cursor = await db.execute("SELECT * FROM goals WHERE user_id = ?", (user_id,))
-        goals = [row_to_dict(r) for r in await cursor.fetchall()]
-        
-        cursor = await db.execute("SELECT id FROM categories WHERE user_id = ? AND name = 'Reserva de Emergência'", (user_id,))
-        reserve_cat = await cursor.fetchone()
-        reserve_category_id = reserve_cat['id'] if reserve_cat else None
-        
-        for t in transactions:
-            t['date_obj'] = datetime.fromisoformat(t['date'])
-        
-        current_month = datetime.now(timezone.utc).month
-        current_year = datetime.now(timezone.utc).year
-        
-        # Current month data
-        current_trans = [t for t in transactions if t['date_obj'].month == current_month and t['date_obj'].year == current_year]
-        month_income = sum(t['amount'] for t in current_trans if t['type'] == 'receita')
-        month_expenses = sum(t['amount'] for t in current_trans if t['type'] == 'despesa')
-        
-        # Reserve calculation
-        reserve_total = 0
-        if reserve_category_id:
-            for t in transactions:
-                if t.get('is_reserve_deposit') or (t.get('category_id') == reserve_category_id and t['type'] == 'receita'):
-                    reserve_total += t['amount']
-                elif t.get('is_reserve_withdrawal'):
-                    reserve_total -= t['amount']
-        
-        tips = []
-        
-        # 1. Reserve Score (0-30)
-        months_covered = reserve_total / month_expenses if month_expenses > 0 else 0
-        if months_covered >= 6:
-            reserve_score = 30
-        elif months_covered >= 3:
-            reserve_score = 20
-        elif months_covered >= 1:
-            reserve_score = 10
-        else:
-            reserve_score = 0
-            tips.append("💡 Construa uma reserva de emergência de 3-6 meses de despesas")
-        
-        # 2. Expense Ratio Score (0-30)
-        if month_income > 0:
-            expense_ratio = month_expenses / month_income
-            if expense_ratio <= 0.5:
-                expense_ratio_score = 30
-            elif expense_ratio <= 0.7:
-                expense_ratio_score = 20
-            elif expense_ratio <= 0.9:
-                expense_ratio_score = 10
-            else:
-                expense_ratio_score = 0
-                tips.append("💡 Reduza despesas para menos de 70% da renda")
+def compute_health_score(series: dict, reserve_total: float, goals_count: int, goals_progress: float,
+                         year: int, month: int, window: int) -> HealthScore:
+    """Score a household from its monthly series; only touches the months it needs"""
+    current = series.get(month_key(year, month)) or {}
+    month_income = current.get('income', 0)
+    month_expenses = current.get('expenses', 0)
+    
+    tips = []
+    
+    # 1. Reserve Score (0-30)
+    months_covered = reserve_total / month_expenses if month_expenses > 0 else 0
+    if months_covered >= 6:
+        reserve_score = 30
+    elif months_covered >= 3:
+        reserve_score = 20
+    elif months_covered >= 1:
+        reserve_score = 10
+    else:
+        reserve_score = 0
+        tips.append("💡 Construa uma reserva de emergência de 3-6 meses de despesas")
+    
+    # 2. Expense Ratio Score (0-30)
+    if month_income > 0:
+        expense_ratio = month_expenses / month_income
+        if expense_ratio <= 0.5:
+            expense_ratio_score = 30
+        elif expense_ratio <= 0.7:
+            expense_ratio_score = 20
+        elif expense_ratio <= 0.9:
+            expense_ratio_score = 10
         else:
             expense_ratio_score = 0
-            tips.append("💡 Registre suas receitas para análise completa")
-        
-        # 3. Consistency Score (0-20)
-        months_with_savings = 0
-        for i in range(3):
-            check_month = current_month - i if current_month - i > 0 else 12 + (current_month - i)
-            check_year = current_year if current_month - i > 0 else current_year - 1
-            month_trans = [t for t in transactions if t['date_obj'].month == check_month and t['date_obj'].year == check_year]
-            m_income = sum(t['amount'] for t in month_trans if t['type'] == 'receita')
-            m_expenses = sum(t['amount'] for t in month_trans if t['type'] == 'despesa')
-            if m_income > m_expenses:
-                months_with_savings += 1
-        
-        consistency_score = {3: 20, 2: 13, 1: 7}.get(months_with_savings, 0)
-        if months_with_savings == 0:
-            tips.append("💡 Tente economizar algo todo mês")
+            tips.append("💡 Reduza despesas para menos de 70% da renda")
+    else:
+        expense_ratio_score = 0
+        tips.append("💡 Registre suas receitas para análise completa")
+    
+    # 3. Consistency Score (0-20): share of the last `window` months with savings
+    months_with_savings = 0
+    for i in range(window):
+        m = series.get(month_key(*shift_month(year, month, -i)))
+        if m and m['income'] > m['expenses']:
+            months_with_savings += 1
+    
+    consistency_score = round(20 * months_with_savings / window)
+    if months_with_savings == 0:
+        tips.append("💡 Tente economizar algo todo mês")
+    
+    # 4. Goals Score (0-20)
+    if goals_count:
+        goals_score = int((goals_progress / goals_count) * 20)
+    else:
+        goals_score = 0
+        tips.append("💡 Defina metas financeiras para acompanhar progresso")
+    
+    total_score = reserve_score + expense_ratio_score + consistency_score + goals_score
+    
+    level = "Crítico" if total_score < 40 else "Atenção" if total_score < 60 else "Bom" if total_score < 80 else "Excelente"
+    
+    return HealthScore(
+        total_score=total_score,
+        reserve_score=reserve_score,
+        expense_ratio_score=expense_ratio_score,
+        consistency_score=consistency_score,
+        goals_score=goals_score,
+        level=level,
+        tips=tips[:3]
+    )
+
+@api_router.get("/gamification/health-score", response_model=HealthScore)
+async def get_health_score(
+    window: int = Query(HEALTH_SCORE_WINDOW_MONTHS, ge=1, le=24),
+    user_id: str = Depends(verify_token)
+):
+    now = datetime.now(timezone.utc)
+    cache_key = ('health_score', now.year, now.month, window)
+    
+    async with get_db_context(user_id) as db:
+        version = await data_version(db, user_id)
+        cached = cache_get(user_id, cache_key, version)
+        if cached is not None:
+            return cached
+        
+        reserve_category_id = await get_reserve_category_id(db, user_id)
+        series = await get_cached_monthly_series(
+            db, user_id, reserve_category_id, version, compute=monthly_series_source())
+        reserve_total = reserve_balance(series) if reserve_category_id else 0
+        
+        cursor = await db.execute(GOALS_PROGRESS_SQL + " WHERE user_id = ?", (user_id,))
+        goals = await cursor.fetchone()
+        
+        score = compute_health_score(
+            series, reserve_total, goals['count'], goals['progress'] or 0,
+            now.year, now.month, window
+        )
+        cache_set(user_id, cache_key, score, version)
+        return score
+
+async def load_health_score_inputs(db, user_ids: List[str], first_month: str) -> tuple:
+    """Window months, reserve balance and goal progress for a group of users, one grouped query each"""
+    placeholders = ', '.join('?' * len(user_ids))
+    
+    series = {uid: {} for uid in user_ids}
+    cursor = await db.execute(f'''
+        SELECT user_id, substr(date, 1, 7) AS month,
+            COALESCE(SUM(CASE WHEN type = 'receita' THEN amount END), 0) AS income,
+            COALESCE(SUM(CASE WHEN type = 'despesa' THEN amount END), 0) AS expenses
+        FROM transactions
+        WHERE user_id IN ({placeholders}) AND date >= ?
+        GROUP BY user_id, month
+    ''', (*user_ids, first_month))
+    for r in await cursor.fetchall():
+        series[r['user_id']][r['month']] = {'income': r['income'], 'expenses': r['expenses']}
+    
+    # One reserve category per user, picked like get_reserve_category_id; users
+    # without one have no reserve, as in get_health_score
+    values = ', '.join(['(?)'] * len(user_ids))
+    cursor = await db.execute(f'''
+        WITH ids(user_id) AS (VALUES {values}),
+        reserve AS (
+            SELECT user_id, (
+                SELECT id FROM categories WHERE user_id = ids.user_id AND name = ? LIMIT 1
+            ) AS category_id
+            FROM ids
+        )
+        SELECT t.user_id, SUM(CASE
+            WHEN r.category_id IS NULL THEN 0
+            WHEN t.is_reserve_deposit = 1 OR (t.category_id = r.category_id AND t.type = 'receita') THEN t.amount
+            WHEN t.is_reserve_withdrawal = 1 THEN -t.amount
+            ELSE 0 END) AS total
+        FROM transactions t
+        LEFT JOIN reserve r ON r.user_id = t.user_id
+        WHERE t.user_id IN ({placeholders})
+            AND (t.category_id = r.category_id OR t.is_reserve_deposit = 1 OR t.is_reserve_withdrawal = 1)
+        GROUP BY t.user_id
+    ''', (*user_ids, RESERVE_CATEGORY_NAME, *user_ids))
+    reserves = {r['user_id']: r['total'] for r in await cursor.fetchall()}
+    
+    cursor = await db.execute(
+        GOALS_PROGRESS_SQL + f" WHERE user_id IN ({placeholders}) GROUP BY user_id", user_ids
+    )
+    goals = {r['user_id']: (r['count'], r['progress'] or 0) for r in await cursor.fetchall()}
+    
+    return series, reserves, goals
+
+@api_router.get("/admin/health-scores")
+async def get_all_health_scores(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    window: int = Query(HEALTH_SCORE_WINDOW_MONTHS, ge=1, le=24),
+    user_id: str = Depends(verify_token)
+):
+    """Health score of every approved user, one keyset page at a time.
+
+    Each page runs three grouped queries over its users (window months,
+    reserve balance, goals), so memory is bounded by the page size.
+    In sharded mode the same queries run once per user shard.
+    Pass the returned next_cursor as `after` to fetch the next page.
+    """
+    async with get_db_context() as db:
+        cursor = await db.execute("SELECT is_admin FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        if not row or not row['is_admin']:
+            raise HTTPException(status_code=403, detail="Admin access required")
         
-        # 4. Goals Score (0-20)
-        if goals:
-            total_progress = sum(min(g.get('current_amount', 0) / g.get('target_amount', 1), 1.0) for g in goals)
-            goals_score = int((total_progress / len(goals)) * 20)
+        cursor = await db.execute(
+            "SELECT id, email, name FROM users WHERE is_approved = 1 AND id > ? ORDER BY id LIMIT ?",
+            (after or '', limit)
+        )
+        users = await cursor.fetchall()
+        if not users:
+            return {"items": [], "next_cursor": None}
+        
+        user_ids = [u['id'] for u in users]
+        now = datetime.now(timezone.utc)
+        first_month = month_key(*shift_month(now.year, now.month, -(window - 1)))
+        
+        if is_sharded():
+            series, reserves, goals = {}, {}, {}
+            for uid in user_ids:
+                async with get_db_context(uid, pooled=False) as shard:
+                    user_series, user_reserves, user_goals = await load_health_score_inputs(shard, [uid], first_month)
+                series.update(user_series)
+                reserves.update(user_reserves)
+                goals.update(user_goals)
         else:
-            goals_score = 0
-            tips.append("💡 Defina metas financeiras para acompanhar progresso")
-        
-        total_score = reserve_score + expense_ratio_score + consistency_score + goals_score
-        
-        level = "Crítico" if total_score < 40 else "Atenção" if total_score < 60 else "Bom" if total_score < 80 else "Excelente"
+            series, reserves, goals = await load_health_score_inputs(db, user_ids, first_month)
+        
+        items = []
+        for u in users:
+            goals_count, goals_progress = goals.get(u['id'], (0, 0))
+            score = compute_health_score(
+                series[u['id']], reserves.get(u['id'], 0), goals_count, goals_progress,
+                now.year, now.month, window
+            )
+            items.append({"user_id": u['id'], "email": u['email'], "name": u['name'], **score.model_dump()})
         
-        return HealthScore(
-            total_score=total_score,
-            reserve_score=reserve_score,
-            expense_ratio_score=expense_ratio_score,
-            consistency_score=consistency_score,
-            goals_score=goals_score,
-            level=level,
-            tips=tips[:3]
-        )
+        next_cursor = user_ids[-1] if len(users) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
 
 # ==================== CHALLENGES ====================
 
+async def apply_challenge_progress(db, challenge, amount: float):
+    """Add amount to a challenge, marking it completed when it reaches the target
+    and reopening it when a correction takes it back below"""
+    new_amount = challenge['current_amount'] + amount
+    is_completed = new_amount >= challenge['target_amount']
+    
+    if is_completed and not challenge['is_completed']:
+        await db.execute(
+            "UPDATE challenges SET current_amount = ?, is_completed = 1, completed_at = ? WHERE id = ?",
+            (new_amount, datetime.now(timezone.utc).isoformat(), challenge['id'])
+        )
+    elif not is_completed and challenge['is_completed']:
+        await db.execute(
+            "UPDATE challenges SET current_amount = ?, is_completed = 0, completed_at = NULL WHERE id = ?",
+            (new_amount, challenge['id'])
+        )
+    else:
+        await db.execute("UPDATE challenges SET current_amount = ? WHERE id = ?", (new_amount, challenge['id']))
+
+@bus.subscribe(TRANSACTIONS_CHANGED)
+async def update_challenges_on_transactions(event):
+    """Move category challenges by the amounts the write added to or removed from their category.
+
+    Only transactions of the category's own type count, so a refund
+    (receita) filed under an expense category does not add to its spending;
+    categories of other types (the reserve) count every transaction.
+    """
+    deltas = [d for d in event.deltas if d[0]]
+    if not deltas:
+        return
+    async with get_db_context(event.user_id) as db:
+        cursor = await db.execute('''
+            SELECT ch.*, c.type AS category_type FROM challenges ch
+            JOIN categories c ON c.id = ch.category_id
+            WHERE ch.user_id = ? AND ch.is_active = 1
+        ''', (event.user_id,))
+        challenges = await cursor.fetchall()
+        for challenge in challenges:
+            start = challenge['created_at'][:10]
+            end = challenge['deadline'][:10] if challenge['deadline'] else None
+            category_type = challenge['category_type']
+            typed = category_type in ('receita', 'despesa')
+            amount = sum(
+                delta for category_id, day, delta, trans_type in deltas
+                if category_id == challenge['category_id'] and day[:10] >= start and (not end or day[:10] <= end)
+                and (not typed or trans_type == category_type)
+            )
+            if amount:
+                await apply_challenge_progress(db, challenge, amount)
+        await db.commit()
+
+@bus.subscribe(TRANSACTIONS_CHANGED, GOALS_CHANGED, coalesce=True)
+async def check_badges_on_change(event):
+    async with get_db_context(event.user_id) as db:
+        unlocked = await evaluate_badges(db, event.user_id)
+        if unlocked:
+            logger.info("🏅 %d badge(s) unlocked for user %s", len(unlocked), event.user_id)
+
 @api_router.get("/gamification/challenges")
 async def get_challenges(user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute("SELECT * FROM challenges WHERE user_id = ?", (user_id,))
         rows = await cursor.fetchall()
-        return [row_to_dict(r) for r in rows]
+        return ListResponse([row_to_dict(r) for r in rows])
 
 @api_router.post("/gamification/challenges")
 async def create_challenge(challenge: FamilyChallengeCreate, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         challenge_id = str(uuid.uuid4())
         await db.execute('''
             INSERT INTO challenges (id, user_id, name, description, target_amount, current_amount, 
@@ -1329,24 +2284,14 @@ async def create_challenge(challenge: FamilyChallengeCreate, user_id: str = Depe
 
 @api_router.post("/gamification/challenges/{challenge_id}/progress")
 async def update_challenge_progress(challenge_id: str, amount: float, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         cursor = await db.execute("SELECT * FROM challenges WHERE id = ? AND user_id = ?", (challenge_id, user_id))
         challenge = await cursor.fetchone()
         
         if not challenge:
             raise HTTPException(status_code=404, detail="Challenge not found")
         
-        new_amount = challenge['current_amount'] + amount
-        is_completed = new_amount >= challenge['target_amount']
-        
-        if is_completed and not challenge['is_completed']:
-            await db.execute(
-                "UPDATE challenges SET current_amount = ?, is_completed = 1, completed_at = ? WHERE id = ?",
-                (new_amount, datetime.now(timezone.utc).isoformat(), challenge_id)
-            )
-        else:
-            await db.execute("UPDATE challenges SET current_amount = ? WHERE id = ?", (new_amount, challenge_id))
-        
+        await apply_challenge_progress(db, challenge, amount)
         await db.commit()
         
         cursor = await db.execute("SELECT * FROM challenges WHERE id = ?", (challenge_id,))
@@ -1354,7 +2299,7 @@ async def update_challenge_progress(challenge_id: str, amount: float, user_id: s
 
 @api_router.delete("/gamification/challenges/{challenge_id}")
 async def delete_challenge(challenge_id: str, user_id: str = Depends(verify_token)):
-    async with get_db_context() as db:
+    async with get_db_context(user_id) as db:
         await db.execute("DELETE FROM challenges WHERE id = ? AND user_id = ?", (challenge_id, user_id))
         await db.commit()
         return {"message": "Challenge deleted"}
@@ -1365,25 +2310,16 @@ app.include_router(api_router)
 
 # ==================== STATIC FILES (Frontend) ====================
 
-# Mount static files if directory exists (for production with built frontend)
-if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR / "static")), name="static")
-    
+# Serve the built frontend if present (production); files come from the startup index, not the disk
+if static_index:
     @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
+    async def serve_frontend(full_path: str, request: Request):
         """Serve React frontend - catch-all route for SPA"""
         # Skip API routes
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404)
         
-        # Try to serve the requested file
-        file_path = STATIC_DIR / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
-        
-        # Fall back to index.html for SPA routing
-        index_path = STATIC_DIR / "index.html"
-        if index_path.exists():
-            return FileResponse(index_path)
-        
-        raise HTTPException(status_code=404, detail="Frontend not found")
+        response = static_index.response(full_path, request.headers)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Frontend not found")
+        return response
@@ -0,0 +1,195 @@
+"""
+Static frontend serving for FinFamily
+The built React app is indexed once at startup: gzip/brotli variants are
+precomputed next to each compressible file, content-hashed bundles under
+/static are served as immutable and index.html is held in memory with an ETag
+
+Usage (the Docker build runs this so startup finds the variants ready):
+    python static_assets.py compress ./static
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are created
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Encodings in order of preference, with the suffix of their precomputed variant
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE_SUFFIXES = {'.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico', '.xml', '.webmanifest'}
+# Smaller files gain little from compression
+MIN_COMPRESS_SIZE = 1024
+
+# The React build puts content-hashed bundles under static/; their names change with every build
+HASHED_PREFIX = 'static/'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# index.html, manifest.json, favicon... keep their names, so browsers revalidate them by ETag
+REVALIDATE_CACHE = 'no-cache'
+INDEX_HTML = 'index.html'
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def can_encode(encoding: str) -> bool:
+    return encoding != 'br' or brotli is not None
+
+def accepted_encodings(header: str) -> set:
+    """Encodings an Accept-Encoding header allows, ignoring those with q=0"""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:] in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+def write_variants(path: Path) -> Dict[str, Path]:
+    """Create missing or outdated compressed variants of a file; returns encoding -> variant"""
+    stat = path.stat()
+    if path.suffix not in COMPRESSIBLE_SUFFIXES or stat.st_size < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {}
+    data = None
+    for encoding, suffix in ENCODINGS:
+        variant = path.with_name(path.name + suffix)
+        outdated = not variant.exists() or variant.stat().st_mtime < stat.st_mtime
+        if outdated and can_encode(encoding):
+            data = path.read_bytes() if data is None else data
+            # Written aside and renamed, so concurrent workers never serve a partial file
+            tmp = variant.with_name(f".{variant.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(compress(data, encoding))
+            os.replace(tmp, variant)
+            outdated = False
+        if not outdated:
+            variants[encoding] = variant
+    return variants
+
+def is_variant(path: Path) -> bool:
+    """Compressed copies and in-progress temp files, which are not served under their own name"""
+    return path.name.startswith('.') or (path.suffix in ('.br', '.gz') and path.with_suffix('').exists())
+
+class StaticAsset:
+    """One file of the build with its precompressed variants and cache policy"""
+    __slots__ = ('media_type', 'cache_control', 'files')
+
+    def __init__(self, path: Path, cache_control: str, variants: Dict[str, Path]):
+        self.media_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.cache_control = cache_control
+        # encoding -> (path, stat), 'identity' being the file itself; stat once here, not per request
+        self.files = {'identity': (path, path.stat())}
+        for encoding, variant in variants.items():
+            self.files[encoding] = (variant, variant.stat())
+
+    def etag(self, encoding: str) -> str:
+        stat = self.files[encoding][1]
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding}"'
+
+    def response(self, encoding: str) -> Response:
+        path, stat = self.files[encoding]
+        headers = {'Cache-Control': self.cache_control, 'ETag': self.etag(encoding), 'Vary': 'Accept-Encoding'}
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return FileResponse(path, media_type=self.media_type, headers=headers, stat_result=stat)
+
+class InMemoryAsset:
+    """index.html: served on every SPA route, so its bytes and compressed forms stay in memory"""
+    __slots__ = ('media_type', 'cache_control', 'digest', 'files')
+
+    def __init__(self, path: Path, cache_control: str):
+        self.media_type = 'text/html; charset=utf-8'
+        self.cache_control = cache_control
+        data = path.read_bytes()
+        self.digest = hashlib.md5(data).hexdigest()
+        # encoding -> body
+        self.files = {'identity': data}
+        for encoding, _ in ENCODINGS:
+            if can_encode(encoding):
+                self.files[encoding] = compress(data, encoding)
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}-{encoding}"'
+
+    def response(self, encoding: str) -> Response:
+        headers = {'Cache-Control': self.cache_control, 'ETag': self.etag(encoding), 'Vary': 'Accept-Encoding'}
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.files[encoding], media_type=self.media_type, headers=headers)
+
+class StaticIndex:
+    """Every file of the frontend build, keyed by URL path, built once by load()"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        self.index: Optional[InMemoryAsset] = None
+
+    def load(self):
+        assets = {}
+        writable = True
+        for path in sorted(p for p in self.root.rglob('*') if p.is_file() and not is_variant(p)):
+            key = path.relative_to(self.root).as_posix()
+            variants = {}
+            if writable:
+                try:
+                    variants = write_variants(path)
+                except OSError as e:
+                    logger.warning("⚠️ Cannot write compressed assets in %s (%s); serving uncompressed", self.root, e)
+                    writable = False
+            cache_control = IMMUTABLE_CACHE if key.startswith(HASHED_PREFIX) else REVALIDATE_CACHE
+            assets[key] = StaticAsset(path, cache_control, variants)
+
+        index_path = self.root / INDEX_HTML
+        self.index = InMemoryAsset(index_path, REVALIDATE_CACHE) if index_path.is_file() else None
+        self.assets = assets
+        logger.info("📦 Static index: %d files from %s", len(assets), self.root)
+
+    def lookup(self, path: str):
+        """The file for a URL path; unknown paths outside /static get index.html for SPA routing"""
+        if path == INDEX_HTML:
+            return self.index
+        asset = self.assets.get(path)
+        if asset is None and not path.startswith(HASHED_PREFIX):
+            return self.index
+        return asset
+
+    def response(self, path: str, headers: Headers) -> Optional[Response]:
+        asset = self.lookup(path)
+        if asset is None:
+            return None
+        accepted = accepted_encodings(headers.get('accept-encoding', ''))
+        encoding = next((e for e, _ in ENCODINGS if e in accepted and e in asset.files), 'identity')
+        etag = asset.etag(encoding)
+        if etag in headers.get('if-none-match', ''):
+            return Response(status_code=304, headers={
+                'Cache-Control': asset.cache_control, 'ETag': etag, 'Vary': 'Accept-Encoding'})
+        return asset.response(encoding)
+
+def main(argv: list) -> int:
+    if len(argv) != 3 or argv[1] != 'compress':
+        print(__doc__)
+        return 1
+    root = Path(argv[2])
+    count = 0
+    for path in sorted(p for p in root.rglob('*') if p.is_file() and not is_variant(p)):
+        count += bool(write_variants(path))
+    encodings = ', '.join(e for e, _ in ENCODINGS if can_encode(e))
+    print(f"✅ Compressed {count} files under {root} ({encodings})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,449 @@
+"""
+Synthetic household data for FinFamily
+Writes N families x M years of realistic transactions straight into the configured
+SQLite database (DATABASE_PATH / STORAGE_MODE), for load and scale tests
+
+Usage:
+    python synthetic_data.py --users 10 --years 2
+    python synthetic_data.py --users 200 --years 5 --per-month 120 --seed 7
+    python synthetic_data.py --users 1 --years 3 --transactions 1000000 --statements /tmp/extratos
+
+Every family gets members, banks, the default categories, categorization
+rules, goals and challenges. Generated users log in with SYNTHETIC_PASSWORD;
+if the database had no users, the first one is an approved admin.
+
+--statements also writes each family's transactions as one CSV (the import
+format) and one OFX file per bank. The rows carry the same unique hash as the
+database, so importing them into the generated family measures duplicate
+detection, and into a fresh account measures a full import.
+"""
+import argparse
+import asyncio
+import calendar
+import hashlib
+import math
+import random
+import sqlite3
+import sys
+import time
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+
+import bcrypt
+
+from aggregates import RESERVE_CATEGORY_NAME, shift_month
+from database import DB_PATH, init_db, is_sharded, open_shard, shard_path
+
+SYNTHETIC_PASSWORD = 'synthetic'
+EMAIL_DOMAIN = 'example.com'
+# Rows per executemany/commit during the bulk load
+INSERT_BATCH_ROWS = 100_000
+
+FIRST_NAMES = [
+    'Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique',
+    'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael',
+]
+SURNAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira', 'Almeida', 'Rodrigues']
+BANKS = ['Nubank', 'Itaú', 'Bradesco', 'Banco do Brasil', 'Caixa', 'Inter', 'Santander', 'C6 Bank']
+EMPLOYERS = ['AMBEV SA', 'PETROBRAS', 'MAGAZINE LUIZA', 'PREFEITURA MUNICIPAL', 'TOTVS SA', 'NATURA COSMETICOS']
+CITIES = ['SAO PAULO', 'RIO DE JANEIRO', 'BELO HORIZONTE', 'CURITIBA', 'PORTO ALEGRE', 'RECIFE']
+
+# Same names and types as the categories created on registration
+CATEGORIES = [
+    (RESERVE_CATEGORY_NAME, 'especial'), ('Alimentação', 'despesa'), ('Transporte', 'despesa'),
+    ('Saúde', 'despesa'), ('Lazer', 'despesa'), ('Educação', 'despesa'), ('Moradia', 'despesa'),
+    ('Salário', 'receita'), ('Freelance', 'receita'),
+]
+
+# Day-to-day spending: (category or None for uncategorized, weight, median amount, merchants)
+SPENDING = [
+    ('Alimentação', 30, 95.0, ['SUPERMERCADO ASSAI', 'CARREFOUR HIPER', 'PAO DE ACUCAR', 'IFOOD *RESTAURANTE',
+                                'PADARIA REAL', 'ATACADAO', 'HORTIFRUTI', 'RAPPI *MERCADO']),
+    ('Transporte', 18, 38.0, ['UBER *TRIP', '99 *POP', 'POSTO SHELL', 'POSTO IPIRANGA', 'SEM PARAR',
+                               'METRO RECARGA', 'ESTAPAR ESTACIONAMENTO']),
+    ('Saúde', 7, 85.0, ['DROGASIL', 'DROGA RAIA', 'FARMACIA SAO JOAO', 'LABORATORIO FLEURY', 'CLINICA ODONTO']),
+    ('Lazer', 9, 65.0, ['CINEMARK', 'INGRESSO.COM', 'BAR DO ZE', 'STEAM PURCHASE', 'PARQUE IBIRAPUERA ESTAC']),
+    ('Educação', 3, 180.0, ['UDEMY', 'LIVRARIA CULTURA', 'ALURA', 'PAPELARIA KALUNGA']),
+    ('Moradia', 4, 150.0, ['LEROY MERLIN', 'TELHA NORTE', 'CASA E VIDEO']),
+    (None, 16, 70.0, ['MERCADO LIVRE', 'AMAZON MARKETPLACE', 'SHOPEE', 'PAGSEGURO *LOJA', 'RENNER', 'DECATHLON']),
+    (None, 8, 120.0, ['PIX ENVIADO']),
+]
+SPENDING_WEIGHTS = [s[1] for s in SPENDING]
+
+# Monthly bills: (category, day of month, median amount, description)
+BILLS = [
+    ('Moradia', 10, 1900.0, 'ALUGUEL'),
+    ('Moradia', 15, 210.0, 'ENEL CONTA LUZ'),
+    ('Moradia', 18, 95.0, 'SABESP CONTA AGUA'),
+    ('Moradia', 20, 120.0, 'VIVO FIBRA'),
+    ('Lazer', 7, 39.9, 'NETFLIX.COM'),
+    ('Lazer', 12, 21.9, 'SPOTIFY'),
+    ('Saúde', 8, 620.0, 'UNIMED MENSALIDADE'),
+]
+
+RULES = [
+    ('assai', 'Alimentação'), ('carrefour', 'Alimentação'), ('ifood', 'Alimentação'), ('padaria', 'Alimentação'),
+    ('uber', 'Transporte'), ('posto', 'Transporte'), ('drogasil', 'Saúde'), ('droga raia', 'Saúde'),
+    ('netflix', 'Lazer'), ('spotify', 'Lazer'), ('aluguel', 'Moradia'), ('enel', 'Moradia'),
+    ('salario', 'Salário'),
+]
+GOALS = [('Viagem para o Nordeste', 12000.0), ('Carro novo', 45000.0), ('Reforma da cozinha', 18000.0),
+         ('Intercâmbio', 30000.0), ('Notebook', 6000.0)]
+CHALLENGES = [('Menos delivery', 'Gastar pouco com iFood este mês', 'Alimentação', 'Pizza em casa'),
+              ('Economia no transporte', 'Usar menos aplicativos de corrida', 'Transporte', 'Cinema em família'),
+              ('Lazer consciente', 'Segurar os gastos com lazer', 'Lazer', 'Passeio no parque')]
+
+TRANSACTION_COLUMNS = (
+    'id', 'user_id', 'date', 'description', 'amount', 'type', 'category_id', 'member_id', 'bank_id',
+    'is_reserve_deposit', 'is_reserve_withdrawal', 'unique_hash', 'created_at',
+)
+INSERT_TRANSACTION = (
+    f"INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(TRANSACTION_COLUMNS))})"
+)
+
+class Household:
+    """Ids and lookup tables of one generated family"""
+
+    def __init__(self, rng: random.Random, index: int, now: str):
+        self.rng = rng
+        self.user_id = new_id(rng)
+        self.surname = rng.choice(SURNAMES)
+        self.email = f"familia-{index:05d}@{EMAIL_DOMAIN}"
+        self.name = f"Família {self.surname} {index}"
+        self.now = now
+        size = rng.randint(2, 4)
+        self.members = [(new_id(rng), f"{n} {self.surname}") for n in rng.sample(FIRST_NAMES, size)]
+        # One or two earners, each with a salary around R$ 4.500
+        self.earners = [(m_id, rng.choice(EMPLOYERS), lognormal(rng, 4500, 0.5)) for m_id, _ in self.members[:rng.randint(1, 2)]]
+        self.banks = [(new_id(rng), name) for name in rng.sample(BANKS, rng.randint(1, 3))]
+        self.categories = {name: new_id(rng) for name, _ in CATEGORIES}
+
+# Version 4 and RFC 4122 variant bits of a uuid4, as set by uuid.UUID(version=4)
+_UUID4_CLEAR = ~((0xf000 << 64) | (0xc000 << 48))
+_UUID4_SET = (0x4000 << 64) | (0x8000 << 48)
+
+def new_id(rng: random.Random) -> str:
+    """uuid4 drawn from the seeded generator, so runs are reproducible"""
+    h = f"{rng.getrandbits(128) & _UUID4_CLEAR | _UUID4_SET:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+def pick(rng: random.Random, seq):
+    """rng.choice without its per-call overhead; the hot loop calls this millions of times"""
+    return seq[int(rng.random() * len(seq))]
+
+def lognormal(rng: random.Random, median: float, sigma: float = 0.6) -> float:
+    return round(rng.lognormvariate(math.log(median), sigma), 2)
+
+def month_range(years: int) -> list:
+    """(year, month) pairs of the last `years` years, ending with the current month"""
+    today = datetime.now(timezone.utc)
+    count = years * 12
+    return [shift_month(today.year, today.month, offset) for offset in range(-count + 1, 1)]
+
+def brl(amount: float) -> str:
+    """Brazilian number format: 1.234,56"""
+    return f"{amount:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+# ==================== TRANSACTIONS ====================
+
+def month_transactions(h: Household, year: int, month: int, per_month: int, last_day: int):
+    """Tuples (date, description, amount, type, category, member, bank, deposit, withdrawal) for one month"""
+    rng = h.rng
+    rows = []
+    main_bank = h.banks[0][0]
+
+    for member_id, employer, salary in h.earners:
+        rows.append((5, f"SALARIO - {employer}", round(salary * rng.uniform(0.98, 1.02), 2), 'receita',
+                     'Salário', member_id, main_bank, 0, 0))
+    if rng.random() < 0.25:
+        rows.append((rng.randint(1, last_day), f"PIX RECEBIDO - {rng.choice(FIRST_NAMES).upper()} FREELA",
+                     lognormal(rng, 900), 'receita', 'Freelance', h.members[0][0], main_bank, 0, 0))
+    for category, day, median, description in BILLS:
+        rows.append((day, description, lognormal(rng, median, 0.1), 'despesa', category,
+                     h.members[0][0], main_bank, 0, 0))
+    if rng.random() < 0.7:
+        rows.append((6, "APLICACAO RESERVA", lognormal(rng, 400, 0.4), 'despesa', RESERVE_CATEGORY_NAME,
+                     h.members[0][0], main_bank, 1, 0))
+    if rng.random() < 0.05:
+        rows.append((rng.randint(1, last_day), "RESGATE RESERVA", lognormal(rng, 800, 0.4), 'receita', None,
+                     h.members[0][0], main_bank, 0, 1))
+    if rng.random() < 0.08:
+        rows.append((rng.randint(1, last_day), "JUROS CHEQUE ESPECIAL", lognormal(rng, 35, 0.5), 'despesa', None,
+                     h.members[0][0], main_bank, 0, 0))
+
+    picks = rng.choices(SPENDING, weights=SPENDING_WEIGHTS, k=max(per_month - len(rows), 0))
+    for category, _, median, merchants in picks:
+        merchant = pick(rng, merchants)
+        if merchant == 'PIX ENVIADO':
+            description = f"PIX ENVIADO - {pick(rng, FIRST_NAMES).upper()} {pick(rng, SURNAMES).upper()}"
+        else:
+            description = f"COMPRA CARTAO - {merchant} {pick(rng, CITIES)}"
+        rows.append((1 + int(rng.random() * last_day), description, lognormal(rng, median), 'despesa', category,
+                     pick(rng, h.members)[0], pick(rng, h.banks)[0], 0, 0))
+
+    rows = [r for r in rows if r[0] <= last_day]
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+def household_transactions(h: Household, months: list, per_month: int, statements=None):
+    """Transaction rows for the whole period, one month at a time"""
+    today = datetime.now(timezone.utc).date()
+    for year, month in months:
+        last_day = calendar.monthrange(year, month)[1]
+        if (year, month) == (today.year, today.month):
+            last_day = today.day
+        # (datetime, stored ISO string, 'YYYY-MM-DD' as hashed by the import) per day
+        dates = {}
+        batch = []
+        for day, description, amount, trans_type, category, member_id, bank_id, deposit, withdrawal in \
+                month_transactions(h, year, month, per_month, last_day):
+            day_info = dates.get(day)
+            if day_info is None:
+                date = datetime(year, month, day, tzinfo=timezone.utc)
+                day_info = dates[day] = (date, date.isoformat(), str(date.date()))
+            date, iso_date, hash_date = day_info
+            # Same hash as the CSV import, so generated statements dedupe against these rows
+            unique_hash = hashlib.md5(f"{hash_date}{description}{amount}".encode()).hexdigest()
+            batch.append((
+                new_id(h.rng), h.user_id, iso_date, description, amount, trans_type,
+                h.categories[category] if category else None, member_id, bank_id,
+                deposit, withdrawal, unique_hash, h.now,
+            ))
+            if statements:
+                statements.write(bank_id, date, description, amount if trans_type == 'receita' else -amount, unique_hash)
+        yield batch
+
+# ==================== STATEMENTS ====================
+
+OFX_HEADER = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:USASCII
+CHARSET:1252
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+<OFX>
+<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS><DTSERVER>{now}<LANGUAGE>POR</SONRS></SIGNONMSGSRSV1>
+<BANKMSGSRSV1><STMTTRNRS><TRNUID>1<STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<STMTRS><CURDEF>BRL
+<BANKACCTFROM><BANKID>{bank_id}<ACCTID>{account}<ACCTTYPE>CHECKING</BANKACCTFROM>
+<BANKTRANLIST><DTSTART>{start}<DTEND>{end}
+"""
+OFX_FOOTER = """</BANKTRANLIST>
+<LEDGERBAL><BALAMT>{balance:.2f}<DTASOF>{end}</LEDGERBAL>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+class StatementWriter:
+    """Writes one family's rows as a CSV in the import format plus one OFX file per bank"""
+
+    def __init__(self, directory: Path, h: Household, months: list):
+        self.prefix = h.email.split('@')[0]
+        self.csv = open(directory / f"{self.prefix}.csv", 'w', encoding='utf-8', newline='')
+        self.csv.write('Data;Descrição;Valor\n')
+        start = datetime(*months[0], 1).strftime('%Y%m%d')
+        end = datetime.now(timezone.utc).strftime('%Y%m%d')
+        self.end = end
+        self.ofx = {}
+        self.balances = {}
+        for number, (bank_id, bank_name) in enumerate(h.banks, start=1):
+            ascii_name = unicodedata.normalize('NFKD', bank_name).encode('ascii', 'ignore').decode()
+            slug = ''.join(c for c in ascii_name.lower() if c.isalnum())
+            f = open(directory / f"{self.prefix}-{slug}.ofx", 'w', encoding='cp1252', errors='replace', newline='\r\n')
+            f.write(OFX_HEADER.format(now=end, bank_id=f"{number:04d}", account=bank_id[:8], start=start, end=end))
+            self.ofx[bank_id] = f
+            self.balances[bank_id] = 0.0
+
+    def write(self, bank_id: str, date: datetime, description: str, amount: float, fitid: str):
+        self.csv.write(f"{date:%d/%m/%Y};{description};{'-' if amount < 0 else ''}{brl(abs(amount))}\n")
+        self.balances[bank_id] += amount
+        self.ofx[bank_id].write(
+            f"<STMTTRN><TRNTYPE>{'CREDIT' if amount > 0 else 'DEBIT'}<DTPOSTED>{date:%Y%m%d}"
+            f"<TRNAMT>{amount:.2f}<FITID>{fitid}<MEMO>{description}</STMTTRN>\n"
+        )
+
+    def close(self):
+        self.csv.close()
+        for bank_id, f in self.ofx.items():
+            f.write(OFX_FOOTER.format(balance=self.balances[bank_id], end=self.end))
+            f.close()
+
+# ==================== BULK LOAD ====================
+
+def open_bulk(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    # A generated database can be regenerated, so durability is traded for speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def drop_transaction_indexes(conn: sqlite3.Connection) -> list:
+    """Drop secondary indexes and search triggers on transactions; returns their SQL to recreate them.
+
+    The data_versions and transaction_rewrites triggers stay, so a running
+    server sees the loaded rows and drops its cached aggregates.
+    """
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = 'transactions' AND sql IS NOT NULL "
+        "AND (type = 'index' OR (type = 'trigger' AND name LIKE 'transactions\\_fts\\_%' ESCAPE '\\'))"
+    ).fetchall()
+    for object_type, name, _ in objects:
+        conn.execute(f"DROP {object_type.upper()} {name}")
+    return [sql for _, _, sql in objects]
+
+def restore_transaction_indexes(conn: sqlite3.Connection, statements: list):
+    """Rebuild indexes in one sorted pass each, recreate the search triggers and reindex the search table"""
+    for sql in statements:
+        conn.execute(sql)
+    conn.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+    conn.commit()
+
+def insert_user(conn: sqlite3.Connection, h: Household, admin: bool, password_hash: str):
+    conn.execute(
+        "INSERT INTO users (id, email, name, password, is_admin, is_approved, created_at) VALUES (?, ?, ?, ?, ?, 1, ?)",
+        (h.user_id, h.email, h.name, password_hash, int(admin), h.now)
+    )
+
+def insert_household(conn: sqlite3.Connection, h: Household):
+    """Members, banks, categories, rules, goals and challenges of one family"""
+    rng = h.rng
+    conn.executemany(
+        "INSERT INTO family_members (id, user_id, name, profile, created_at) VALUES (?, ?, ?, NULL, ?)",
+        [(m_id, h.user_id, name, h.now) for m_id, name in h.members]
+    )
+    conn.executemany(
+        "INSERT INTO banks (id, user_id, name, active, created_at) VALUES (?, ?, ?, 1, ?)",
+        [(b_id, h.user_id, name, h.now) for b_id, name in h.banks]
+    )
+    conn.executemany(
+        "INSERT INTO categories (id, user_id, name, type, is_fixed, created_at) VALUES (?, ?, ?, ?, 1, ?)",
+        [(h.categories[name], h.user_id, name, cat_type, h.now) for name, cat_type in CATEGORIES]
+    )
+    conn.executemany(
+        "INSERT INTO categorization_rules (id, user_id, keyword, category_id, match_type, is_active, priority, created_at) "
+        "VALUES (?, ?, ?, ?, 'contains', 1, ?, ?)",
+        [(new_id(rng), h.user_id, keyword, h.categories[category], len(RULES) - i, h.now)
+         for i, (keyword, category) in enumerate(RULES)]
+    )
+    today = datetime.now(timezone.utc)
+    goals = []
+    for name, target in rng.sample(GOALS, rng.randint(1, 3)):
+        deadline = datetime(today.year + rng.randint(1, 3), rng.randint(1, 12), 1, tzinfo=timezone.utc)
+        goals.append((new_id(rng), h.user_id, name, None, target, round(target * rng.uniform(0, 0.8), 2),
+                      deadline.isoformat(), None, round(target / 24, 2), h.now))
+    conn.executemany(
+        "INSERT INTO goals (id, user_id, name, description, target_amount, current_amount, deadline, image_url, "
+        "monthly_contribution, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", goals
+    )
+    year, month = shift_month(today.year, today.month, 1)
+    conn.executemany(
+        "INSERT INTO challenges (id, user_id, name, description, target_amount, current_amount, reward, deadline, "
+        "category_id, is_active, is_completed, created_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, 1, 0, ?)",
+        [(new_id(rng), h.user_id, name, description, float(rng.choice([200, 300, 500])), reward,
+          datetime(year, month, 1, tzinfo=timezone.utc).isoformat(), h.categories[category], h.now)
+         for name, description, category, reward in rng.sample(CHALLENGES, rng.randint(1, 2))]
+    )
+
+def bulk_load(conn: sqlite3.Connection, households: list, months: list, per_month: int,
+              statements_dir: Path = None) -> int:
+    """Insert families and their transactions with the transaction indexes dropped, then rebuild them"""
+    indexes = drop_transaction_indexes(conn)
+    total = pending = 0
+    for h in households:
+        insert_household(conn, h)
+        writer = StatementWriter(statements_dir, h, months) if statements_dir else None
+        try:
+            for batch in household_transactions(h, months, per_month, writer):
+                conn.executemany(INSERT_TRANSACTION, batch)
+                total += len(batch)
+                pending += len(batch)
+                if pending >= INSERT_BATCH_ROWS:
+                    conn.commit()
+                    pending = 0
+        finally:
+            if writer:
+                writer.close()
+    conn.commit()
+    restore_transaction_indexes(conn, indexes)
+    return total
+
+async def prepare_schema(user_ids: list):
+    """Create the schema through database.py: main database, and one shard per user in sharded mode"""
+    await init_db()
+    if is_sharded():
+        for user_id in user_ids:
+            db = await open_shard(user_id)
+            await db.close()
+
+def generate(users: int, years: int, per_month: int, seed: int = 42, statements_dir: Path = None,
+             first_index: int = 1) -> dict:
+    """Generate `users` families with `per_month` transactions each over the last `years` years.
+
+    Families are numbered from first_index (familia-00001@...), so repeated
+    calls into one database need distinct ranges.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).isoformat()
+    months = month_range(years)
+    households = [Household(rng, i, now) for i in range(first_index, first_index + users)]
+    asyncio.run(prepare_schema([h.user_id for h in households]))
+    password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    if statements_dir:
+        statements_dir.mkdir(parents=True, exist_ok=True)
+
+    main = open_bulk(DB_PATH)
+    try:
+        first_admin = main.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+        for index, h in enumerate(households):
+            insert_user(main, h, first_admin and index == 0, password_hash)
+        if is_sharded():
+            main.commit()
+            total = 0
+            for h in households:
+                shard = open_bulk(str(shard_path(h.user_id)))
+                try:
+                    total += bulk_load(shard, [h], months, per_month, statements_dir)
+                finally:
+                    shard.close()
+        else:
+            total = bulk_load(main, households, months, per_month, statements_dir)
+    finally:
+        main.close()
+    return {"users": users, "months": len(months), "transactions": total,
+            "emails": [h.email for h in households]}
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic FinFamily households into DATABASE_PATH")
+    parser.add_argument('--users', type=int, default=10, help="families to create (default 10)")
+    parser.add_argument('--years', type=int, default=2, help="years of history per family (default 2)")
+    parser.add_argument('--per-month', type=int, default=60, help="transactions per family per month (default 60)")
+    parser.add_argument('--transactions', type=int,
+                        help="total transactions to aim for; overrides --per-month")
+    parser.add_argument('--seed', type=int, default=42, help="random seed, for reproducible datasets")
+    parser.add_argument('--statements', type=Path, metavar='DIR',
+                        help="also write each family's CSV and OFX statements into DIR")
+    args = parser.parse_args(argv[1:])
+    if args.users < 1 or args.years < 1:
+        parser.error("--users and --years must be at least 1")
+
+    per_month = args.per_month
+    if args.transactions:
+        per_month = max(math.ceil(args.transactions / (args.users * args.years * 12)), 1)
+
+    start = time.perf_counter()
+    result = generate(args.users, args.years, per_month, args.seed, args.statements)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Generated {result['transactions']} transactions for {result['users']} families "
+          f"over {result['months']} months in {elapsed:.1f}s ({result['transactions'] / elapsed:,.0f} rows/s)")
+    print(f"   Database: {DB_PATH} | login: familia-00001@{EMAIL_DOMAIN} / {SYNTHETIC_PASSWORD}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
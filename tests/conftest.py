@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the in-process API tests
+The app runs against a throwaway database, so these tests never touch
+backend/data; every test gets its own approved user
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+DATA_DIR = Path(tempfile.mkdtemp(prefix="finfamily-tests-"))
+os.environ['DATABASE_PATH'] = str(DATA_DIR / 'finamily.db')
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from database import DB_PATH  # noqa: E402
+
+PASSWORD = "Senha@123"
+# Challenges only count transactions from their creation day on
+TODAY = date.today().isoformat()
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+def sql(query: str, *params) -> list:
+    """Run one statement on the database directly, for rows the API does not expose"""
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        rows = conn.execute(query, params).fetchall()
+        conn.commit()
+        return rows
+
+class ApiUser:
+    """An approved user with helpers for the calls most tests need"""
+
+    def __init__(self, client, user_id: str, token: str):
+        self.client = client
+        self.id = user_id
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def get(self, path, **kwargs):
+        return self.client.get(f'/api{path}', headers=self.headers, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.client.post(f'/api{path}', headers=self.headers, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.client.delete(f'/api{path}', headers=self.headers, **kwargs)
+
+    def create(self, path, **payload) -> str:
+        response = self.post(path, json=payload)
+        assert response.status_code == 200, response.text
+        return response.json()['id']
+
+    def transaction(self, amount, type='despesa', date=None, description='Compra', **fields) -> str:
+        date = date or TODAY
+        return self.create('/transactions', date=date, description=description, amount=amount, type=type, **fields)
+
+    def drain(self):
+        """Wait for the event handlers queued by the previous writes"""
+        self.client.portal.call(server.bus.drain)
+
+def register(client) -> ApiUser:
+    email = f'{uuid.uuid4().hex[:12]}@example.com'
+    response = client.post('/api/auth/register', json={'email': email, 'name': 'Família Teste', 'password': PASSWORD})
+    if response.status_code == 202:
+        sql("UPDATE users SET is_approved = 1 WHERE email = ?", email)
+        response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return ApiUser(client, body['user']['id'], body['access_token'])
+
+@pytest.fixture
+def user(client) -> ApiUser:
+    return register(client)
+
+@pytest.fixture
+def other_user(client) -> ApiUser:
+    """A second household, for checks that one user never sees another's rows"""
+    return register(client)
@@ -0,0 +1,49 @@
+"""Approving and rejecting accounts"""
+import uuid
+
+import database
+from tests.conftest import PASSWORD, sql
+
+def pending_user(client) -> str:
+    email = f'{uuid.uuid4().hex[:12]}@example.com'
+    response = client.post('/api/auth/register', json={'email': email, 'name': 'Pendente', 'password': PASSWORD})
+    assert response.status_code == 202
+    return sql("SELECT id FROM users WHERE email = ?", email)[0][0]
+
+def test_reject_deletes_pending_user_and_rows(user, client):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    pending = pending_user(client)
+    sql("INSERT INTO family_members (id, user_id, name, created_at) VALUES (?, ?, 'x', '2026')", f'm-{pending}', pending)
+
+    assert user.post(f'/admin/reject/{pending}').status_code == 200
+
+    assert sql("SELECT COUNT(*) FROM users WHERE id = ?", pending) == [(0,)]
+    assert sql("SELECT COUNT(*) FROM family_members WHERE user_id = ?", pending) == [(0,)]
+
+def test_reject_keeps_approved_users(user, client):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    approved = pending_user(client)
+    sql("UPDATE users SET is_approved = 1 WHERE id = ?", approved)
+    sql("INSERT INTO family_members (id, user_id, name, created_at) VALUES (?, ?, 'x', '2026')", f'm-{approved}', approved)
+
+    user.post(f'/admin/reject/{approved}')
+
+    assert sql("SELECT COUNT(*) FROM users WHERE id = ?", approved) == [(1,)]
+    assert sql("SELECT COUNT(*) FROM family_members WHERE user_id = ?", approved) == [(1,)]
+
+def test_reject_deletes_shard_in_sharded_mode(user, client, monkeypatch, tmp_path):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    pending = pending_user(client)
+    monkeypatch.setattr(database, 'STORAGE_MODE', 'sharded')
+    monkeypatch.setattr(database, 'SHARD_DIR', tmp_path)
+
+    async def create_shard():
+        async with database.get_db_context(pending) as db:
+            await db.execute("SELECT 1")
+    client.portal.call(create_shard)
+    assert database.shard_path(pending).exists()
+
+    assert user.post(f'/admin/reject/{pending}').status_code == 200
+
+    assert not database.shard_path(pending).exists()
+    assert sql("SELECT COUNT(*) FROM users WHERE id = ?", pending) == [(0,)]
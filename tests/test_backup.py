@@ -0,0 +1,45 @@
+"""Creating, verifying, restoring and pruning backups"""
+import gzip
+
+import backup
+from tests.conftest import sql
+
+def test_backup_round_trip(user, monkeypatch, tmp_path):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    monkeypatch.setattr(backup, 'BACKUP_DIR', tmp_path)
+    kept = user.transaction(10, description='Antes do backup')
+
+    response = user.post('/admin/backup')
+    assert response.status_code == 200, response.text
+    name = response.json()['name']
+    assert [b['name'] for b in user.get('/admin/backups').json()] == [name]
+
+    # The snapshot is a complete, healthy database
+    raw = tmp_path / 'check.db'
+    raw.write_bytes(gzip.decompress((tmp_path / name).read_bytes()))
+    backup.verify_database(str(raw))
+
+    lost = user.transaction(20, description='Depois do backup')
+    response = user.post(f'/admin/backups/{name}/restore')
+    assert response.status_code == 200, response.text
+
+    ids = {t['id'] for t in user.get('/transactions').json()}
+    assert kept in ids
+    assert lost not in ids
+
+def test_restore_rejects_unknown_and_foreign_names(user, monkeypatch, tmp_path):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    monkeypatch.setattr(backup, 'BACKUP_DIR', tmp_path)
+
+    assert user.post('/admin/backups/finamily-missing.db.gz/restore').status_code == 404
+    assert user.post('/admin/backups/finamily.db/restore').status_code == 400
+
+def test_backups_in_the_same_second_are_all_kept_until_pruned(monkeypatch, tmp_path):
+    monkeypatch.setattr(backup, 'BACKUP_DIR', tmp_path)
+
+    names = [backup.create_backup()['name'] for _ in range(3)]
+
+    assert len(set(names)) == 3
+    assert [b['name'] for b in backup.list_backups()] == names[::-1]
+    assert backup.prune_backups(keep=2) == [names[0]]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(names[1:])
@@ -0,0 +1,85 @@
+"""Badges unlocked from the monthly aggregates"""
+from datetime import date
+
+import pytest
+
+import server
+from aggregates import month_key, shift_month
+from tests.conftest import TODAY
+
+PREVIOUS_MONTH = month_key(*shift_month(date.today().year, date.today().month, -1))
+
+def unlocked(user) -> set:
+    user.drain()
+    assert user.post('/gamification/check-badges').status_code == 200
+    return {b['criteria'] for b in user.get('/gamification/badges').json() if b['unlocked']}
+
+def reserve_category(user) -> str:
+    return user.create('/categories', name=server.RESERVE_CATEGORY_NAME, type='receita')
+
+@pytest.mark.parametrize('expenses, earned', [(700, True), (700.01, False)])
+def test_high_savings_rate_from_thirty_percent(user, expenses, earned):
+    # Badges are checked after every write and stay unlocked, so the expense goes first
+    user.transaction(expenses)
+    user.transaction(1000, type='receita')
+
+    assert ('high_savings_rate' in unlocked(user)) is earned
+
+@pytest.mark.parametrize('contributed, earned', [(100, True), (99.99, False)])
+def test_goal_completed_at_its_target(user, contributed, earned):
+    goal = user.create('/goals', name='Viagem', target_amount=100)
+    user.post(f'/goals/{goal}/contribute', json={'amount': contributed})
+
+    assert ('goal_completed' in unlocked(user)) is earned
+
+@pytest.mark.parametrize('months, earned', [
+    (['2025-01', '2025-02', '2025-03'], True),
+    (['2025-01', '2025-02', '2025-04'], False),
+    (['2024-11', '2024-12', '2025-01'], True),
+])
+def test_consecutive_savings_needs_three_months_in_a_row(user, months, earned):
+    reserve = reserve_category(user)
+    for month in months:
+        user.transaction(50, type='receita', date=f'{month}-05', category_id=reserve)
+
+    assert ('consecutive_savings' in unlocked(user)) is earned
+
+def test_first_reserve_deposit_needs_the_reserve_category(user):
+    user.transaction(50, type='receita', is_reserve_deposit=True)
+    assert 'first_reserve_deposit' not in unlocked(user)
+
+    reserve_category(user)
+    user.transaction(50, type='receita', is_reserve_deposit=True)
+    assert 'first_reserve_deposit' in unlocked(user)
+
+@pytest.mark.parametrize('reserve, earned', [(600, True), (599.99, False)])
+def test_solid_reserve_at_six_months_of_expenses(user, reserve, earned):
+    category = reserve_category(user)
+    user.transaction(100, date='2025-01-10')
+    user.transaction(100, date='2025-02-10')
+    user.transaction(reserve, type='receita', date='2025-02-15', category_id=category)
+
+    assert ('solid_reserve' in unlocked(user)) is earned
+
+@pytest.mark.parametrize('uncategorized, earned', [(0, True), (1, False)])
+def test_all_categorized_in_the_current_month(user, uncategorized, earned):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    for _ in range(uncategorized):
+        user.transaction(10)
+    user.transaction(30, category_id=category)
+
+    assert ('all_categorized' in unlocked(user)) is earned
+
+@pytest.mark.parametrize('description, earned', [('Mercado', True), ('Juros do cartão', False)])
+def test_no_interest_in_the_previous_month(user, description, earned):
+    user.transaction(40, date=f'{PREVIOUS_MONTH}-10', description=description)
+
+    assert ('no_interest_month' in unlocked(user)) is earned
+
+@pytest.mark.parametrize('contributors, earned', [(2, True), (1, False)])
+def test_all_members_contributed_this_month(user, contributors, earned):
+    members = [user.create('/family', name=name) for name in ('Ana', 'Bruno')]
+    for member in members[:contributors]:
+        user.transaction(500, type='receita', date=TODAY, member_id=member)
+
+    assert ('all_members_contributed' in unlocked(user)) is earned
@@ -0,0 +1,59 @@
+"""Per-member and per-bank dashboard breakdowns"""
+import pytest
+
+import columnar
+
+@pytest.fixture(params=['columnar', 'sql'])
+def breakdown_user(request, user, monkeypatch):
+    """The same user, answered from the columnar cache or from the SQL GROUP BY"""
+    if request.param == 'sql':
+        monkeypatch.setattr(columnar, 'COLUMNAR_CACHE_MB', 0)
+    return user
+
+def by_id(response) -> dict:
+    assert response.status_code == 200, response.text
+    return {item['id']: item for item in response.json()}
+
+def test_by_member_splits_income_and_expenses(breakdown_user):
+    user = breakdown_user
+    ana = user.create('/family', name='Ana', profile='adulto')
+    bia = user.create('/family', name='Bia', profile='adulto')
+    user.transaction(300, member_id=ana)
+    user.transaction(100.5, member_id=bia)
+    user.transaction(1000, type='receita', member_id=bia)
+    user.transaction(99.5)
+
+    items = user.get('/dashboard/by-member').json()
+
+    assert [item['name'] for item in items] == ['Ana', 'Bia', 'Sem membro']
+    assert items[0] == {'id': ana, 'name': 'Ana', 'income': 0.0, 'expenses': 300.0, 'percentage': 60.0}
+    assert items[1] == {'id': bia, 'name': 'Bia', 'income': 1000.0, 'expenses': 100.5, 'percentage': 20.1}
+    assert items[2] == {'id': None, 'name': 'Sem membro', 'income': 0.0, 'expenses': 99.5, 'percentage': 19.9}
+
+def test_by_bank_honours_the_date_range(breakdown_user):
+    user = breakdown_user
+    bank = user.create('/banks', name='Banco A')
+    user.transaction(40, date='2026-01-31', bank_id=bank)
+    user.transaction(60, date='2026-02-01', bank_id=bank)
+    user.transaction(80, date='2026-03-01', bank_id=bank)
+
+    items = by_id(user.get('/dashboard/by-bank', params={'start_date': '2026-02-01', 'end_date': '2026-02-28'}))
+
+    assert items[bank]['expenses'] == 60.0
+    assert by_id(user.get('/dashboard/by-bank', params={'start_date': '2026-02-01'}))[bank]['expenses'] == 140.0
+    assert by_id(user.get('/dashboard/by-bank'))[bank]['expenses'] == 180.0
+
+def test_breakdown_follows_writes(breakdown_user):
+    user = breakdown_user
+    bank = user.create('/banks', name='Banco A')
+    user.transaction(10, bank_id=bank)
+    assert by_id(user.get('/dashboard/by-bank'))[bank]['expenses'] == 10.0
+
+    user.transaction(15, bank_id=bank)
+
+    assert by_id(user.get('/dashboard/by-bank'))[bank]['expenses'] == 25.0
+
+def test_breakdown_rejects_inverted_range(user):
+    response = user.get('/dashboard/by-member', params={'start_date': '2026-03-01', 'end_date': '2026-02-01'})
+
+    assert response.status_code == 400
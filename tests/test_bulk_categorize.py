@@ -0,0 +1,26 @@
+"""Filters accepted by bulk categorize"""
+import pytest
+
+from tests.conftest import sql
+
+@pytest.mark.parametrize('body', [{'filter': {}}, {'filter': {'month': 3}}, {}])
+def test_filter_without_criteria_is_rejected(user, body):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    transaction = user.transaction(25)
+
+    response = user.post('/transactions/bulk-categorize', json={'category_id': category, **body})
+
+    assert response.status_code == 400
+    assert sql("SELECT category_id FROM transactions WHERE id = ?", transaction) == [(None,)]
+
+def test_filter_selects_month_of_year(user):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    march = user.transaction(25, date='2025-03-10')
+    april = user.transaction(30, date='2025-04-02')
+
+    response = user.post('/transactions/bulk-categorize',
+                         json={'category_id': category, 'filter': {'month': 3, 'year': 2025}})
+
+    assert response.status_code == 200, response.text
+    assert sql("SELECT category_id FROM transactions WHERE id = ?", march) == [(category,)]
+    assert sql("SELECT category_id FROM transactions WHERE id = ?", april) == [(None,)]
@@ -0,0 +1,46 @@
+"""Category challenges following transaction writes"""
+from tests.conftest import sql
+
+def challenge(user, category_id, target=100.0) -> str:
+    return user.create('/gamification/challenges', name='Desafio', description='Gastar menos',
+                       target_amount=target, reward='Pizza', category_id=category_id)
+
+def progress(challenge_id) -> tuple:
+    return sql("SELECT current_amount, is_completed, completed_at IS NOT NULL FROM challenges WHERE id = ?",
+               challenge_id)[0]
+
+def test_only_transactions_of_the_category_type_count(user):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    tracked = challenge(user, category, target=1000)
+    user.transaction(80, category_id=category)
+    # A refund filed under the expense category is not spending
+    user.transaction(30, type='receita', category_id=category)
+    user.drain()
+
+    assert progress(tracked)[0] == 80.0
+
+def test_completion_is_reopened_when_progress_drops(user):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    tracked = challenge(user, category, target=100)
+    first = user.transaction(60, category_id=category)
+    user.transaction(50, category_id=category)
+    user.drain()
+    assert progress(tracked) == (110.0, 1, 1)
+
+    user.delete(f'/transactions/{first}')
+    user.drain()
+
+    assert progress(tracked) == (50.0, 0, 0)
+
+def test_moving_a_transaction_moves_progress(user):
+    source = user.create('/categories', name='Mercado', type='despesa')
+    target = user.create('/categories', name='Lazer', type='despesa')
+    on_source, on_target = challenge(user, source), challenge(user, target)
+    transaction = user.transaction(40, category_id=source)
+    user.drain()
+
+    user.post('/transactions/bulk-categorize', json={'transaction_ids': [transaction], 'category_id': target})
+    user.drain()
+
+    assert progress(on_source)[0] == 0.0
+    assert progress(on_target)[0] == 40.0
@@ -0,0 +1,103 @@
+"""Compression of API responses, whole and streamed"""
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware
+
+ROWS = [{'id': i, 'description': f'Transação {i}', 'amount': i * 1.5} for i in range(200)]
+NDJSON_LINES = [json.dumps(row).encode() + b'\n' for row in ROWS]
+PARQUET_BODY = b'PAR1' + bytes(range(256)) * 20
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+
+@pytest.fixture(scope='module')
+def api() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get('/rows')
+    async def rows():
+        return ROWS
+
+    @app.get('/small')
+    async def small():
+        return {'status': 'ok'}
+
+    @app.get('/encoded')
+    async def encoded():
+        return Response(gzip.compress(json.dumps(ROWS).encode()), media_type='application/json',
+                        headers={'Content-Encoding': 'gzip'})
+
+    @app.get('/stream')
+    async def stream():
+        async def lines():
+            for line in NDJSON_LINES:
+                yield line
+        return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+    @app.get('/parquet')
+    async def parquet():
+        async def chunks():
+            for i in range(0, len(PARQUET_BODY), 1024):
+                yield PARQUET_BODY[i:i + 1024]
+        return StreamingResponse(chunks(), media_type='application/vnd.apache.parquet')
+
+    return TestClient(app)
+
+def fetch(api, path, encoding):
+    return api.get(path, headers={'Accept-Encoding': encoding})
+
+@needs_brotli
+def test_brotli_is_preferred(api):
+    response = fetch(api, '/rows', 'gzip, br')
+
+    assert response.headers['content-encoding'] == 'br'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.json() == ROWS
+
+@pytest.mark.parametrize('accept', ['gzip', 'gzip, br;q=0'])
+def test_gzip_when_brotli_is_not_accepted(api, accept):
+    response = fetch(api, '/rows', accept)
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert int(response.headers['content-length']) < len(json.dumps(ROWS))
+    assert response.json() == ROWS
+
+@pytest.mark.parametrize('accept', ['', 'identity', 'gzip;q=0, br;q=0'])
+def test_identity_when_nothing_is_accepted(api, accept):
+    response = fetch(api, '/rows', accept)
+
+    assert 'content-encoding' not in response.headers
+    assert response.json() == ROWS
+
+def test_small_responses_are_left_alone(api):
+    response = fetch(api, '/small', 'gzip')
+
+    assert 'content-encoding' not in response.headers
+    assert response.json() == {'status': 'ok'}
+
+def test_already_encoded_responses_are_left_alone(api):
+    response = fetch(api, '/encoded', 'gzip, br')
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.json() == ROWS
+
+def test_streamed_text_is_compressed_chunk_by_chunk(api):
+    response = fetch(api, '/stream', 'gzip')
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert response.content == b''.join(NDJSON_LINES)
+
+def test_streamed_binary_is_left_alone(api):
+    response = fetch(api, '/parquet', 'gzip, br')
+
+    assert 'content-encoding' not in response.headers
+    assert response.content == PARQUET_BODY
@@ -0,0 +1,97 @@
+"""Deleting members, banks and categories: detach, reassign and cascade"""
+from tests.conftest import sql
+
+def count(query, *params) -> int:
+    return sql(query, *params)[0][0]
+
+def challenge(user, category_id, target=1000.0) -> str:
+    return user.create('/gamification/challenges', name='Desafio', description='Gastar menos',
+                       target_amount=target, reward='Pizza', category_id=category_id)
+
+def challenge_row(challenge_id) -> tuple:
+    return sql("SELECT category_id, current_amount, is_completed FROM challenges WHERE id = ?", challenge_id)[0]
+
+def test_detach_member_keeps_transactions(user):
+    member = user.create('/family', name='Ana', profile='adulto')
+    first, second = user.transaction(50, member_id=member), user.transaction(20, member_id=member)
+
+    response = user.delete(f'/family/{member}')
+
+    assert response.status_code == 200
+    assert response.json()['transactions'] == 2
+    assert count("SELECT COUNT(*) FROM transactions WHERE id IN (?, ?) AND member_id IS NULL", first, second) == 2
+    assert count("SELECT COUNT(*) FROM family_members WHERE id = ?", member) == 0
+
+def test_reassign_bank_moves_transactions(user):
+    source = user.create('/banks', name='Banco A')
+    target = user.create('/banks', name='Banco B')
+    transaction = user.transaction(75, bank_id=source)
+
+    response = user.delete(f'/banks/{source}', params={'mode': 'reassign', 'reassign_to': target})
+
+    assert response.json()['transactions'] == 1
+    assert sql("SELECT bank_id FROM transactions WHERE id = ?", transaction) == [(target,)]
+
+def test_reassign_requires_another_existing_row(user):
+    bank = user.create('/banks', name='Banco A')
+
+    assert user.delete(f'/banks/{bank}', params={'mode': 'reassign'}).status_code == 400
+    assert user.delete(f'/banks/{bank}', params={'mode': 'reassign', 'reassign_to': bank}).status_code == 400
+    assert user.delete(f'/banks/{bank}', params={'mode': 'bogus'}).status_code == 422
+    assert count("SELECT COUNT(*) FROM banks WHERE id = ?", bank) == 1
+
+def test_cascade_bank_deletes_transactions(user):
+    bank = user.create('/banks', name='Banco A')
+    kept = user.transaction(10)
+    user.transaction(30, bank_id=bank)
+
+    response = user.delete(f'/banks/{bank}', params={'mode': 'cascade'})
+
+    assert response.json()['transactions'] == 1
+    assert sql("SELECT id FROM transactions WHERE user_id = ?", user.id) == [(kept,)]
+
+def test_cascade_category_drops_rules_and_challenges(user):
+    category = user.create('/categories', name='Pets', type='despesa')
+    user.create('/categorization-rules', keyword='petshop', category_id=category)
+    tracked = challenge(user, category)
+    user.transaction(40, category_id=category)
+
+    user.delete(f'/categories/{category}', params={'mode': 'cascade'})
+    user.drain()
+
+    assert count("SELECT COUNT(*) FROM transactions WHERE user_id = ?", user.id) == 0
+    assert count("SELECT COUNT(*) FROM categorization_rules WHERE category_id = ?", category) == 0
+    assert count("SELECT COUNT(*) FROM challenges WHERE id = ?", tracked) == 0
+
+def test_reassign_category_counts_challenge_progress_once(user):
+    source = user.create('/categories', name='Pets', type='despesa')
+    target = user.create('/categories', name='Casa', type='despesa')
+    moved = challenge(user, source)
+    existing = challenge(user, target)
+    user.transaction(100, category_id=source)
+    user.drain()
+    assert challenge_row(moved)[1] == 100.0
+
+    user.delete(f'/categories/{source}', params={'mode': 'reassign', 'reassign_to': target})
+    user.drain()
+
+    # The source's challenge keeps its progress and is tracked by hand from now on;
+    # only the challenge already on the target picks up the moved amount
+    assert challenge_row(moved)[:2] == (None, 100.0)
+    assert challenge_row(existing)[:2] == (target, 100.0)
+
+def test_fixed_category_is_not_deleted(user):
+    fixed = user.create('/categories', name='Reserva', type='despesa')
+    sql("UPDATE categories SET is_fixed = 1 WHERE id = ?", fixed)
+
+    user.delete(f'/categories/{fixed}')
+
+    assert count("SELECT COUNT(*) FROM categories WHERE id = ?", fixed) == 1
+
+def test_unknown_reference_is_a_conflict(user):
+    response = user.post('/transactions', json={
+        'date': '2026-01-02', 'description': 'Compra', 'amount': 10, 'type': 'despesa', 'member_id': 'nao-existe'
+    })
+
+    assert response.status_code == 409
+    assert count("SELECT COUNT(*) FROM transactions WHERE user_id = ?", user.id) == 0
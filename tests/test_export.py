@@ -0,0 +1,64 @@
+"""Streaming CSV and NDJSON export of transactions"""
+import csv
+import io
+import json
+
+import server
+
+def test_csv_uses_the_import_dialect(user):
+    member = user.create('/family', name='Ana', profile='adulto')
+    category = user.create('/categories', name='Mercado', type='despesa')
+    user.transaction(1234.5, description='Compra; mercado', date='2026-02-03', category_id=category, member_id=member)
+    user.transaction(5000, type='receita', description='Salário', date='2026-02-05')
+
+    response = user.get('/transactions/export', params={'format': 'csv'})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/csv; charset=utf-8'
+    assert response.headers['content-disposition'].endswith('.csv"')
+    rows = list(csv.reader(io.StringIO(response.text), delimiter=';'))
+    assert rows == [
+        ['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria', 'Membro', 'Banco'],
+        ['03/02/2026', 'Compra; mercado', '-1234,50', 'despesa', 'Mercado', 'Ana', ''],
+        ['05/02/2026', 'Salário', '5000,00', 'receita', '', '', ''],
+    ]
+
+def test_ndjson_has_one_object_per_line(user):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    transaction = user.transaction(12.34, description='Padaria', category_id=category)
+
+    response = user.get('/transactions/export', params={'format': 'ndjson'})
+
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]['id'] == transaction
+    assert lines[0]['amount'] == 12.34
+    assert lines[0]['category'] == 'Mercado'
+    assert lines[0]['member'] is None
+    assert lines[0]['is_reserve_deposit'] is False
+
+def test_export_applies_filters(user):
+    user.transaction(10, description='Uber', date='2026-01-10')
+    user.transaction(20, description='Uber', date='2026-02-10')
+    user.transaction(30, description='Padaria', date='2026-02-11')
+
+    response = user.get('/transactions/export', params={'format': 'ndjson', 'q': 'uber', 'month': 2, 'year': 2026})
+
+    assert [json.loads(line)['amount'] for line in response.text.splitlines()] == [20]
+
+def test_export_streams_in_chunks(user, monkeypatch):
+    monkeypatch.setattr(server, 'EXPORT_CHUNK_ROWS', 2)
+    for day in range(1, 6):
+        user.transaction(day, date=f'2026-01-0{day}')
+    where, params = server.transaction_list_sql(user.id, None, None, None, None)
+
+    async def collect():
+        return [chunk async for chunk in server.export_ndjson(where, params, user.id)]
+    chunks = user.client.portal.call(collect)
+
+    assert len(chunks) == 3
+    assert [json.loads(line)['amount'] for line in b''.join(chunks).decode().splitlines()] == [1, 2, 3, 4, 5]
+
+def test_unknown_format_is_rejected(user):
+    assert user.get('/transactions/export', params={'format': 'xlsx'}).status_code == 422
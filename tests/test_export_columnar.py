@@ -0,0 +1,42 @@
+"""Parquet and Arrow IPC export of transactions"""
+import io
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import server
+
+def read_back(content: bytes, export_format: str) -> tuple:
+    """The exported table and the number of row groups or record batches it was written in"""
+    if export_format == 'parquet':
+        file = pq.ParquetFile(io.BytesIO(content))
+        return file.read(), file.num_row_groups
+    reader = pa.ipc.open_file(io.BytesIO(content))
+    return reader.read_all(), reader.num_record_batches
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_columnar_export_reads_back(user, monkeypatch, export_format):
+    monkeypatch.setattr(server, 'EXPORT_ROW_GROUP_ROWS', 2)
+    market = user.create('/categories', name='Mercado', type='despesa')
+    salary = user.create('/categories', name='Salário', type='receita')
+    user.transaction(12.34, date='2026-01-01', category_id=market)
+    user.transaction(5000, type='receita', date='2026-01-02', category_id=salary)
+    user.transaction(0.1, date='2026-01-03')
+    user.transaction(99.99, date='2026-01-04', category_id=market)
+    user.transaction(1234.5, date='2026-01-05', category_id=market)
+
+    response = user.get('/transactions/export', params={'format': export_format})
+
+    assert response.status_code == 200, response.text
+    table, batches = read_back(response.content, export_format)
+    assert table.num_rows == 5
+    assert batches == 3
+    assert table.schema.field('date').type == pa.date32()
+    assert table.schema.field('amount_cents').type == pa.int64()
+    assert pa.types.is_dictionary(table.schema.field('category').type)
+    assert table.column('date').to_pylist() == [date(2026, 1, day) for day in range(1, 6)]
+    assert table.column('amount_cents').to_pylist() == [1234, 500000, 10, 9999, 123450]
+    assert table.column('category').to_pylist() == ['Mercado', 'Salário', None, 'Mercado', 'Mercado']
+    assert table.column('type').to_pylist() == ['despesa', 'receita', 'despesa', 'despesa', 'despesa']
@@ -0,0 +1,76 @@
+"""Inputs of the batched health score"""
+from datetime import date
+
+import server
+from aggregates import month_key, shift_month
+from database import get_db_context
+from tests.conftest import TODAY, sql
+
+PREVIOUS_MONTH = month_key(*shift_month(date.today().year, date.today().month, -1))
+
+def reserves_of(user, *user_ids) -> dict:
+    async def load():
+        async with get_db_context() as db:
+            _, reserves, _ = await server.load_health_score_inputs(db, list(user_ids), '2000-01')
+        return reserves
+    return user.client.portal.call(load)
+
+def test_reserve_counts_each_user_once(user, client):
+    reserve = user.create('/categories', name=server.RESERVE_CATEGORY_NAME, type='receita')
+    # A second category with the reserve's name must not double the balance
+    user.create('/categories', name=server.RESERVE_CATEGORY_NAME, type='receita')
+    first = sql("SELECT id FROM categories WHERE user_id = ? AND name = ? LIMIT 1", user.id, server.RESERVE_CATEGORY_NAME)[0][0]
+    user.transaction(500, type='receita', category_id=first)
+    user.transaction(200, type='receita', is_reserve_deposit=True)
+    user.transaction(50, is_reserve_withdrawal=True)
+
+    assert reserve
+    assert reserves_of(user, user.id) == {user.id: 650}
+
+def batch_score(user) -> dict:
+    """The user's item from /admin/health-scores, following next_cursor"""
+    after = ''
+    while True:
+        page = user.get('/admin/health-scores', params={'after': after, 'limit': 500}).json()
+        for item in page['items']:
+            if item['user_id'] == user.id:
+                return item
+        after = page['next_cursor']
+        assert after, 'user missing from the batch scores'
+
+def test_reserve_without_reserve_category(user):
+    sql("UPDATE users SET is_admin = 1 WHERE id = ?", user.id)
+    user.transaction(300, type='receita', is_reserve_deposit=True)
+    user.transaction(100, is_reserve_withdrawal=True)
+
+    assert reserves_of(user, user.id).get(user.id, 0) == 0
+    single = user.get('/gamification/health-score').json()
+    batch = batch_score(user)
+    assert {k: batch[k] for k in single} == single
+
+def consistency(user, window: int) -> int:
+    response = user.get('/gamification/health-score', params={'window': window})
+    assert response.status_code == 200, response.text
+    return response.json()['consistency_score']
+
+def test_consistency_over_the_rolling_window(user):
+    # Savings this month and last month, nothing before
+    user.transaction(1000, type='receita', date=TODAY)
+    user.transaction(1000, type='receita', date=f'{PREVIOUS_MONTH}-10')
+
+    assert consistency(user, 1) == 20
+    assert consistency(user, 2) == 20
+    assert consistency(user, 4) == 10
+    assert consistency(user, 8) == 5
+    assert user.get('/gamification/health-score', params={'window': 0}).status_code == 422
+
+def test_score_is_recomputed_after_a_write(user):
+    user.transaction(1000, type='receita', date=TODAY)
+    before = user.get('/gamification/health-score').json()
+    assert consistency(user, 1) == 20
+
+    user.transaction(1500, date=TODAY)
+
+    assert consistency(user, 1) == 0
+    after = user.get('/gamification/health-score').json()
+    assert after['expense_ratio_score'] == 0 < before['expense_ratio_score']
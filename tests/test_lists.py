@@ -0,0 +1,25 @@
+"""List endpoints streamed as JSON rendered inside SQLite"""
+from tests.conftest import sql
+
+def test_amounts_render_like_python_at_cents(user):
+    for amount in (0.1 + 0.2, 1234.56, 100.0, 99999999.99):
+        user.transaction(amount)
+
+    listed = user.get('/transactions').json()
+    stored = [row[0] for row in sql("SELECT amount FROM transactions WHERE user_id = ?", user.id)]
+
+    assert sorted(t['amount'] for t in listed) == sorted(round(a, 2) for a in stored)
+    assert sorted(t['amount'] for t in listed) == [0.3, 100.0, 1234.56, 99999999.99]
+
+def test_streamed_rows_keep_every_column(user):
+    transaction = user.transaction(10, description='Padaria')
+
+    listed = user.get('/transactions').json()
+    columns = [row[1] for row in sql("PRAGMA table_info(transactions)")]
+
+    assert [t['id'] for t in listed] == [transaction]
+    assert list(listed[0]) == columns
+
+def test_empty_list_is_valid_json(user):
+    assert user.get('/transactions').json() == []
+    assert user.get('/categorization-rules').json() == []
@@ -0,0 +1,20 @@
+"""Prometheus metrics of requests and database time"""
+import metrics
+
+def test_metrics_expose_requests_and_db_time_by_route(user, client):
+    transaction = user.transaction(10)
+    user.client.put(f'/api/transactions/{transaction}', headers=user.headers, json={'description': 'Padaria'})
+
+    response = client.get('/api/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == metrics.CONTENT_TYPE
+    labels = 'method="PUT",route="/api/transactions/{transaction_id}"'
+    text = response.text
+    assert f'finfamily_http_requests_total{{{labels},status="200"}}' in text
+    assert f'finfamily_http_request_duration_seconds_count{{{labels}}}' in text
+    assert f'finfamily_http_request_db_seconds_count{{{labels}}}' in text
+    assert f'finfamily_http_request_db_seconds_bucket{{{labels},le="+Inf"}}' in text
+    # Unknown paths share one label instead of adding a series each
+    client.get('/api/does-not-exist-42')
+    assert 'does-not-exist-42' not in client.get('/api/metrics').text
@@ -0,0 +1,25 @@
+"""Copying an unsharded database into per-user shards"""
+import sqlite3
+from contextlib import closing
+
+import database
+from tests.conftest import sql
+
+def test_migration_detaches_dangling_references(user, client, monkeypatch, tmp_path):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    kept = user.transaction(10, category_id=category)
+    dangling = user.transaction(20)
+    # Left by versions that did not enforce foreign keys
+    sql("UPDATE transactions SET category_id = 'categoria-apagada', bank_id = 'banco-apagado' WHERE id = ?", dangling)
+    monkeypatch.setattr(database, 'STORAGE_MODE', 'sharded')
+    monkeypatch.setattr(database, 'SHARD_DIR', tmp_path)
+
+    assert client.portal.call(database.migrate_to_shards) >= 1
+
+    with closing(sqlite3.connect(database.shard_path(user.id))) as shard:
+        rows = dict(shard.execute("SELECT id, category_id FROM transactions"))
+        assert shard.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert rows == {kept: category, dangling: None}
+    # The main database is left as it was
+    assert sql("SELECT category_id FROM transactions WHERE id = ?", dangling) == [('categoria-apagada',)]
+    sql("UPDATE transactions SET category_id = NULL, bank_id = NULL WHERE id = ?", dangling)
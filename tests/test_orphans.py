@@ -0,0 +1,29 @@
+"""Cleaning up rows left behind while foreign keys were not enforced"""
+import database
+from backup import list_backups
+from tests.conftest import sql
+
+def test_detach_orphans_keeps_rows(user, client):
+    transaction = user.transaction(10)
+    # Raw connections do not enforce foreign keys, like the app before they were turned on
+    sql("UPDATE transactions SET member_id = 'apagado' WHERE id = ?", transaction)
+    sql("INSERT INTO family_members (id, user_id, name, created_at) VALUES ('m-orfao', 'conta-apagada', 'x', '2026')")
+
+    async def detach():
+        async with database.get_db_context() as db:
+            await database.detach_orphans(db)
+            await db.commit()
+    client.portal.call(detach)
+
+    assert sql("SELECT member_id FROM transactions WHERE id = ?", transaction) == [(None,)]
+    assert sql("SELECT COUNT(*) FROM family_members WHERE id = 'm-orfao'") == [(1,)]
+
+def test_remove_orphans_backs_up_first(client):
+    sql("INSERT INTO family_members (id, user_id, name, created_at) VALUES ('m-orfao-2', 'conta-apagada', 'x', '2026')")
+    backups = len(list_backups())
+
+    counts = client.portal.call(database.remove_orphans)
+
+    assert counts['family_members'] >= 1
+    assert sql("SELECT COUNT(*) FROM family_members WHERE user_id = 'conta-apagada'") == [(0,)]
+    assert len(list_backups()) == backups + 1
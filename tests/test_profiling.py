@@ -0,0 +1,42 @@
+"""On-demand profiling with the X-Profile header"""
+import asyncio
+
+from profiling import PROFILE_HEADER, PROFILE_ID_HEADER, ProfileMiddleware
+
+def test_concurrent_profile_requests_do_not_wait():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope['path'] == '/slow':
+            await release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def authorize(headers):
+        # The fast request is still being authorized when the slow one starts profiling
+        await asyncio.sleep(0.05 if headers.get('x-late') else 0)
+        return True
+
+    middleware = ProfileMiddleware(app, authorize)
+
+    async def call(path, *headers):
+        sent = []
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [(PROFILE_HEADER, b'1'), *headers]}
+
+        async def send(message):
+            sent.append(message)
+        await middleware(scope, None, send)
+        return dict(sent[0]['headers'])
+
+    async def main():
+        fast = asyncio.create_task(call('/fast', (b'x-late', b'1')))
+        slow = asyncio.create_task(call('/slow'))
+        # Served straight away, unprofiled, while the slow profile is running
+        fast = await asyncio.wait_for(fast, timeout=1)
+        release.set()
+        return await slow, fast
+
+    slow, fast = asyncio.run(main())
+
+    assert PROFILE_ID_HEADER in slow
+    assert PROFILE_ID_HEADER not in fast
@@ -0,0 +1,104 @@
+"""Full-text search and pagination of the transaction list"""
+import sqlite3
+from contextlib import closing
+
+import database
+import server
+from tests.conftest import sql
+
+def descriptions(response) -> list:
+    assert response.status_code == 200, response.text
+    return sorted(t['description'] for t in response.json())
+
+def test_search_matches_word_prefixes(user):
+    user.transaction(10, description='COMPRA CARTAO SUPERMERCADO ASSAI')
+    user.transaction(20, description='PIX ENVIADO PADARIA')
+
+    assert descriptions(user.get('/transactions', params={'q': 'assa'})) == ['COMPRA CARTAO SUPERMERCADO ASSAI']
+    assert descriptions(user.get('/transactions', params={'q': 'super assai'})) == ['COMPRA CARTAO SUPERMERCADO ASSAI']
+    assert descriptions(user.get('/transactions', params={'q': 'padaria assai'})) == []
+
+def test_search_ignores_accents_and_case(user):
+    user.transaction(35, description='Farmácia São João')
+
+    assert descriptions(user.get('/transactions', params={'q': 'farmacia sao'})) == ['Farmácia São João']
+    assert descriptions(user.get('/transactions', params={'q': 'FARMÁC'})) == ['Farmácia São João']
+
+def test_search_follows_edits_and_deletes(user):
+    transaction = user.transaction(10, description='Uber viagem')
+    user.client.put(f'/api/transactions/{transaction}', headers=user.headers, json={'description': '99 Taxi'})
+
+    assert descriptions(user.get('/transactions', params={'q': 'uber'})) == []
+    assert descriptions(user.get('/transactions', params={'q': 'taxi'})) == ['99 Taxi']
+
+    user.delete(f'/transactions/{transaction}')
+    assert descriptions(user.get('/transactions', params={'q': 'taxi'})) == []
+
+def test_search_combines_with_filters(user):
+    category = user.create('/categories', name='Mercado', type='despesa')
+    user.transaction(10, description='Mercado Central', category_id=category, date='2026-02-10')
+    user.transaction(20, description='Mercado Central', date='2026-02-11')
+    user.transaction(30, description='Mercado Central', category_id=category, date='2026-03-10')
+
+    by_category = user.get('/transactions', params={'q': 'mercado', 'category_id': category}).json()
+    by_month = user.get('/transactions', params={'q': 'mercado', 'month': 2, 'year': 2026}).json()
+
+    assert sorted(t['amount'] for t in by_category) == [10, 30]
+    assert sorted(t['amount'] for t in by_month) == [10, 20]
+
+def test_limit_and_offset_page_newest_first(user):
+    for day in range(1, 6):
+        user.transaction(day, description=f'Compra {day}', date=f'2026-01-0{day}')
+
+    first = user.get('/transactions', params={'limit': 2}).json()
+    second = user.get('/transactions', params={'limit': 2, 'offset': 2}).json()
+    last = user.get('/transactions', params={'limit': 2, 'offset': 4}).json()
+
+    assert [t['amount'] for t in first + second + last] == [5, 4, 3, 2, 1]
+    assert user.get('/transactions', params={'limit': 0}).status_code == 422
+    assert user.get('/transactions', params={'offset': -1}).status_code == 422
+
+def test_search_never_reads_other_households(user, other_user):
+    mine = user.transaction(10, description='PIX ENVIADO PADARIA')
+    theirs = other_user.transaction(20, description='PIX RECEBIDO')
+
+    assert [t['id'] for t in user.get('/transactions', params={'q': 'pix'}).json()] == [mine]
+    assert [t['id'] for t in other_user.get('/transactions', params={'q': 'pix'}).json()] == [theirs]
+    # The index itself only yields the searching user's rows
+    matched = sql("SELECT t.id FROM transactions_fts f JOIN transactions t ON t.rowid = f.rowid "
+                  "WHERE transactions_fts MATCH ?", server.fts_query('pix', user.id))
+    assert matched == [(mine,)]
+
+def test_search_table_from_before_user_id_is_rebuilt(client, tmp_path):
+    path = str(tmp_path / 'antigo.db')
+
+    async def upgrade():
+        db = await database.get_db(path)
+        try:
+            await database.create_auth_tables(db)
+            await database.create_financial_tables(db)
+            await db.execute("INSERT INTO users (id, email, name, password, created_at) VALUES ('u1', 'a@b.c', 'A', 'x', '2026')")
+            await db.execute("INSERT INTO transactions (id, user_id, date, description, amount, type, created_at) "
+                             "VALUES ('t1', 'u1', '2026-01-01', 'Farmácia', 10, 'despesa', '2026')")
+            # The search table as earlier versions created it
+            for trigger in ('insert', 'delete', 'update'):
+                await db.execute(f"DROP TRIGGER transactions_fts_{trigger}")
+            await db.execute("DROP TABLE transactions_fts")
+            await db.execute("CREATE VIRTUAL TABLE transactions_fts USING fts5(description, content='transactions', "
+                             "content_rowid='rowid')")
+            await db.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+            await db.commit()
+
+            await database.create_financial_tables(db)
+            await db.commit()
+        finally:
+            await db.close()
+    client.portal.call(upgrade)
+
+    with closing(sqlite3.connect(path)) as conn:
+        assert conn.execute("SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?",
+                            (server.fts_query('farmacia', 'u1'),)).fetchall() == [(1,)]
+        conn.execute("INSERT INTO transactions (id, user_id, date, description, amount, type, created_at) "
+                     "VALUES ('t2', 'u1', '2026-01-02', 'Farmácia Popular', 5, 'despesa', '2026')")
+        assert len(conn.execute("SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?",
+                                (server.fts_query('farmacia', 'u1'),)).fetchall()) == 2
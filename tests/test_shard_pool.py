@@ -0,0 +1,47 @@
+"""Eviction of pooled shard connections"""
+import asyncio
+
+import database
+
+class FakeShard:
+    in_transaction = False
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.closed = False
+
+    async def close(self):
+        # Yield a few times, like a real close handing off to the worker thread
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.closed = True
+
+def test_evict_skips_shard_acquired_during_eviction(monkeypatch):
+    async def open_shard(user_id):
+        return FakeShard(user_id)
+    monkeypatch.setattr(database, 'open_shard', open_shard)
+
+    async def main():
+        pool = database.ShardPool(3)
+        for uid in ('a', 'b'):
+            async with pool.connection(uid):
+                pass
+        pool.max_size = 1
+
+        async def evicting():
+            async with pool.connection('c'):
+                await asyncio.sleep(0.01)
+
+        async def reacquiring():
+            # Let the other task start closing 'a' first
+            await asyncio.sleep(0)
+            async with pool.connection('b') as db:
+                for _ in range(10):
+                    await asyncio.sleep(0)
+                return db.closed
+
+        _, closed_while_used = await asyncio.gather(evicting(), reacquiring())
+        await pool.close()
+        return closed_while_used
+
+    assert asyncio.run(main()) is False
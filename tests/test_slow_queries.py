@@ -0,0 +1,25 @@
+"""Slow-query log of the timed database connection"""
+import logging
+
+import database
+import metrics
+
+def test_slow_query_is_logged_with_its_plan(user, monkeypatch, caplog):
+    # Any statement counts as slow
+    monkeypatch.setattr(database, 'SLOW_QUERY_MS', 1e-9)
+    query = "SELECT id FROM transactions WHERE user_id = ? AND type = 'metrics-test'"
+
+    async def run():
+        async with database.get_db_context(user.id) as db:
+            cursor = await db.execute(query, (user.id,))
+            await cursor.fetchall()
+    with caplog.at_level(logging.WARNING, logger=database.logger.name):
+        user.client.portal.call(run)
+
+    slow = [r.getMessage() for r in caplog.records if 'Slow query' in r.getMessage()]
+    assert len(slow) == 1
+    assert "type = 'metrics-test'" in slow[0]
+    assert 'transactions' in slow[0].split('\n', 1)[1]
+    stats = metrics.statement_stats(query)
+    assert stats.slow_calls >= 1
+    assert stats.plan and any('transactions' in line for line in stats.plan)
@@ -0,0 +1,91 @@
+"""Precompressed frontend files, encoding negotiation and revalidation"""
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+import static_assets
+from static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticIndex
+
+BUNDLE = 'static/js/main.3f9a1c.js'
+BUNDLE_BODY = b'console.log("finfamily");\n' * 100
+INDEX_BODY = b'<!doctype html><html><body><div id="root"></div>' + b'<!-- padding -->' * 100 + b'</body></html>'
+
+needs_brotli = pytest.mark.skipif(static_assets.brotli is None, reason="brotli is not installed")
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / 'static' / 'js').mkdir(parents=True)
+    (tmp_path / BUNDLE).write_bytes(BUNDLE_BODY)
+    (tmp_path / 'index.html').write_bytes(INDEX_BODY)
+    (tmp_path / 'robots.txt').write_bytes(b'User-agent: *\n')
+    return tmp_path
+
+@pytest.fixture
+def frontend(build) -> TestClient:
+    index = StaticIndex(build)
+    index.load()
+    app = FastAPI()
+
+    @app.get("/{full_path:path}")
+    async def serve_frontend(full_path: str, request: Request):
+        response = index.response(full_path, request.headers)
+        if response is None:
+            raise HTTPException(status_code=404)
+        return response
+    return TestClient(app)
+
+def fetch(frontend, path, encoding, **headers):
+    return frontend.get(path, headers={'Accept-Encoding': encoding, **headers})
+
+def test_load_writes_variants_of_large_files_only(build):
+    StaticIndex(build).load()
+
+    assert (build / f'{BUNDLE}.gz').exists()
+    assert not (build / 'robots.txt.gz').exists()
+
+@needs_brotli
+def test_brotli_is_preferred(frontend):
+    response = fetch(frontend, f'/{BUNDLE}', 'gzip, br')
+
+    assert response.headers['content-encoding'] == 'br'
+    assert response.content == BUNDLE_BODY
+
+@pytest.mark.parametrize('accept', ['gzip', 'gzip, br;q=0', 'deflate, gzip;q=0.5'])
+def test_gzip_when_brotli_is_not_accepted(frontend, accept):
+    response = fetch(frontend, f'/{BUNDLE}', accept)
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.content == BUNDLE_BODY
+
+@pytest.mark.parametrize('accept', ['', 'identity', 'gzip;q=0, br;q=0'])
+def test_identity_when_nothing_is_accepted(frontend, accept):
+    response = fetch(frontend, f'/{BUNDLE}', accept)
+
+    assert 'content-encoding' not in response.headers
+    assert response.content == BUNDLE_BODY
+    assert response.headers['vary'] == 'Accept-Encoding'
+
+def test_cache_policy_by_path(frontend):
+    assert fetch(frontend, f'/{BUNDLE}', 'gzip').headers['cache-control'] == IMMUTABLE_CACHE
+    assert fetch(frontend, '/robots.txt', 'gzip').headers['cache-control'] == REVALIDATE_CACHE
+
+def test_spa_routes_get_index_html(frontend):
+    response = fetch(frontend, '/dashboard/familia', 'gzip')
+
+    assert response.status_code == 200
+    assert response.content == INDEX_BODY
+    assert response.headers['content-type'] == 'text/html; charset=utf-8'
+    assert fetch(frontend, '/static/js/missing.js', 'gzip').status_code == 404
+
+@pytest.mark.parametrize('path', [f'/{BUNDLE}', '/'])
+def test_if_none_match_returns_304(frontend, path):
+    etag = fetch(frontend, path, 'gzip').headers['etag']
+
+    response = fetch(frontend, path, 'gzip', **{'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert response.headers['vary'] == 'Accept-Encoding'
+    # Another encoding is another representation with its own ETag
+    assert fetch(frontend, path, 'identity', **{'If-None-Match': etag}).status_code == 200